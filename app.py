@@ -1,55 +1,70 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify, session, abort
-import psycopg2
-from datetime import date, timedelta, datetime
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify, session, abort, Response
+import logging
 import os
 import tempfile
 from dotenv import load_dotenv
-import numpy as np
-from dig import bp as dig_bp
-from dcot import bp as dcot_bp
-from dplam import bp as dplam_bp
-from diretor_tecnico import bp as diretor_tecnico_bp
-from relatorio import gerar_pdf
-from pdf_manager import salvar_relatorio_analise, mesclar_com_relatorio_analise
+from setores import registrar_setores
+from pdf_manager import salvar_relatorio_analise
+from db import get_db_connection, init_pool, estatisticas_pool
+from referencias import (obter_referencias, invalidar_referencias, versao_referencias,
+                         hierarquia_zonas as obter_hierarquia_zonas,
+                         CANAL_REFERENCIAS, SITUACOES_LOCALIZACAO, MANANCIAL)
+from notificacoes import registrar_canal, iniciar_escuta
+from eventos import CANAL_FILA_SETORES, publicar as publicar_evento_fila
+from migracoes import comando_migrar
+from fila_pdf import (enfileirar_pdf, status_pdf, iniciar_worker_embutido,
+                      comando_worker_pdf, TIPO_CADASTRO)
+from registro import configurar_logging, registrar_request_id, redigir_campos
+from metricas import instrumentar
+from consultas_lentas import listar as listar_consultas_lentas
+from regerar_pdfs import comando_regerar_pdfs
+from verificar_indices import comando_verificar_indices
+from recalcular_dias_uteis import comando_recalcular_dias_uteis
+from tecnicos import conferir_tecnico, tecnicos_do_setor
+from prazos import comando_recalcular_prazos
+from cadastro import CadastroInvalido, cadastrar, preparar_cadastro
+from importar import (EXTENSOES, PlanilhaInvalida, comando_importar_processos,
+                      importar_processos, relatorio_csv)
 
 load_dotenv()
 
 
-DB_HOST = os.getenv("DB_HOST")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-
-
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 app.config['DATABASE_URL'] = os.getenv('DATABASE_URL')
 
-def get_db_connection():
-    """Abre conexão nova com o banco de dados."""
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
+# Logs estruturados com id de requisição (LOG_NIVEL, LOG_NIVEIS, LOG_FORMATO)
+configurar_logging(app)
+registrar_request_id(app)
+logger = logging.getLogger(__name__)
 
-app.register_blueprint(dig_bp, url_prefix='/dig')
-app.register_blueprint(dcot_bp, url_prefix='/dcot')
-app.register_blueprint(dplam_bp, url_prefix='/dplam')
-app.register_blueprint(diretor_tecnico_bp, url_prefix='/diretor-tecnico')
+# Server-Timing em cada resposta e agregados em /metrics
+instrumentar(app)
 
+# Pool único de conexões usado pelo app, blueprints e relatorio.py
+init_pool(app)
+
+# Cache de referências invalidado por NOTIFY (ESCUTAR_NOTIFICACOES=1)
+registrar_canal(CANAL_REFERENCIAS, invalidar_referencias)
+# Eventos da fila dos setores para os painéis abertos (/<setor>/eventos)
+registrar_canal(CANAL_FILA_SETORES, publicar_evento_fila)
+iniciar_escuta()
+
+app.cli.add_command(comando_migrar)
+app.cli.add_command(comando_worker_pdf)
+app.cli.add_command(comando_regerar_pdfs)
+app.cli.add_command(comando_verificar_indices)
+app.cli.add_command(comando_recalcular_dias_uteis)
+app.cli.add_command(comando_recalcular_prazos)
+app.cli.add_command(comando_importar_processos)
+
+
+@app.before_request
+def garantir_worker_pdf():
+    # Worker da fila de PDFs na própria aplicação, criado na primeira
+    # requisição, só com FILA_PDF_WORKER_EMBUTIDO=1 (padrão: `flask worker-pdf`)
+    iniciar_worker_embutido()
 
-def calcular_dias_uteis(inicio_str, fim_str):
-    if not inicio_str or not fim_str:
-        return None
-    try:
-        inicio = datetime.strptime(inicio_str, "%Y-%m-%d").date()
-        fim = datetime.strptime(fim_str, "%Y-%m-%d").date()
-        return int(np.busday_count(inicio, fim))
-    except Exception as e:
-        print("Erro ao calcular dias úteis:", e)
-        return None
 
 SETOR_TO_BLUEPRINT = {
     "DIG": "dig",
@@ -58,6 +73,10 @@ SETOR_TO_BLUEPRINT = {
     "PRESIDENTE_DPUR": "diretor_tecnico"
 }
 
+# Mesmo blueprint para todos os setores: /dig, /dcot, /dplam, /diretor-tecnico
+registrar_setores(app, SETOR_TO_BLUEPRINT)
+
+
 @app.route("/")
 def raiz():
     # Se não escolheu setor, redireciona para escolher setor
@@ -74,78 +93,33 @@ def raiz():
 
 @app.route("/index")
 def index():
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # Enumerados fixos do formulário
-            cur.execute("SELECT tipo_solicitacao_resposta FROM solicitacao_resposta")
-            solicitacoes_respostas = [row[0] for row in cur.fetchall()]
-            
-            cur.execute("SELECT nome_tipo_tramitacao FROM tipo_tramitacao")
-            tramitacoes = [row[0] for row in cur.fetchall()]
-            
-            cur.execute("SELECT nome_tipologia FROM tipologia")
-            tipologias = [row[0] for row in cur.fetchall()]
-            
-            situacoes_localizacao = ['LOCALIZADA', 'NÃO PRECISA LOCALIZAR']
-
-            cur.execute("SELECT cpf_tecnico, nome_tecnico, setor_tecnico FROM tecnico")
-            tecnico = cur.fetchall()
-
-            cur.execute("SELECT nome_municipio FROM municipio")
-            municipio = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT classificacao_metropolitana FROM sistema_viario WHERE classificacao_metropolitana IS NOT NULL")
-            sistema_viario = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT tipo FROM faixa_servidao WHERE tipo IS NOT NULL")
-            faixa_servidao = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT tipo_curva FROM curva_inundacao WHERE tipo_curva IS NOT NULL")
-            curva_inundacao = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT nome_apa FROM apa WHERE nome_apa IS NOT NULL")
-            apa = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT nome_utp FROM utp WHERE nome_utp IS NOT NULL")
-            utp = [row[0] for row in cur.fetchall()]
-            
-            cur.execute("SELECT DISTINCT tipo_prioridade FROM prioridade WHERE tipo_prioridade IS NOT NULL")
-            prioridade = [row[0] for row in cur.fetchall()]
-            
-            cur.execute("SELECT DISTINCT nivel_complexidade FROM complexidade WHERE nivel_complexidade IS NOT NULL")
-            complexidade = [row[0] for row in cur.fetchall()]
-            
-            cur.execute("SELECT DISTINCT nome_setor FROM setor WHERE nome_setor IS NOT NULL")
-            setor = [row[0] for row in cur.fetchall()]
-            
-
-            manancial = ['SUPERFICIAL', 'SUBTERRÂNEA', 'SUPERFICIAL-SUBTERRÂNEA']
-
-            enums = {
-                "sistema_viario": sistema_viario,
-                "faixa_servidao": faixa_servidao,
-                "curva_inundacao": curva_inundacao,
-                "apa": apa,
-                "utp": utp,
-                "manancial": manancial
-            }
-
+    # Enumerados fixos do formulário (servidos do cache em memória)
+    ref = obter_referencias()
+
+    enums = {
+        "sistema_viario": ref["sistema_viario"],
+        "faixa_servidao": ref["faixa_servidao"],
+        "curva_inundacao": ref["curva_inundacao"],
+        "apa": ref["apa"],
+        "utp": ref["utp"],
+        "manancial": MANANCIAL
+    }
 
     return render_template(
         "formulario.html",
-        solicitacao_resposta=solicitacoes_respostas,
-        tramitacao=tramitacoes,
-        tipologia=tipologias,
-        situacoes_localizacao=situacoes_localizacao,
-        tecnico=tecnico,
-        municipio=municipio,
-        manancial=manancial,
-        curva_inundacao=curva_inundacao,
-        faixa_servidao=faixa_servidao,
-        sistema_viario=sistema_viario,
-        prioridade=prioridade,
-        complexidade=complexidade,
-        setor=setor,
+        solicitacao_resposta=ref["solicitacao_resposta"],
+        tramitacao=ref["tramitacao"],
+        tipologia=ref["tipologia"],
+        situacoes_localizacao=SITUACOES_LOCALIZACAO,
+        tecnico=ref["tecnico"],
+        municipio=ref["municipio"],
+        manancial=MANANCIAL,
+        curva_inundacao=ref["curva_inundacao"],
+        faixa_servidao=ref["faixa_servidao"],
+        sistema_viario=ref["sistema_viario"],
+        prioridade=ref["prioridade"],
+        complexidade=ref["complexidade"],
+        setor=ref["setor"],
         enums=enums,
     )
 
@@ -160,412 +134,136 @@ def inserir():
         if arquivo_pdf and arquivo_pdf.filename != '' and protocolo:
             caminho_salvo = salvar_relatorio_analise(arquivo_pdf, protocolo)
             if caminho_salvo:
-                print(f"✅ Relatório de análise salvo para protocolo {protocolo}: {caminho_salvo}")
+                logger.info("Relatório de análise salvo para protocolo %s: %s", protocolo, caminho_salvo)
             else:
-                print(f"⚠️  Arquivo PDF inválido ou muito grande para protocolo {protocolo}")
+                logger.warning("Arquivo PDF inválido ou muito grande para protocolo %s", protocolo)
     
-    acao_salvar = formulario.get("salvar")
     acao_finalizar = formulario.get("finalizar")
-    acao_encaminhar = formulario.get("encaminhar")
-    setor_destino = formulario.get("setor_destino")
-
-    interesse_social = formulario.get("interesse_social") == "on"
-    lei_inclui_perimetro_urbano = formulario.get("perimetro_urbano") == "on"
-
-    inicio_localizacao = formulario.get("inicio_localizacao") or None
-    fim_localizacao = formulario.get("fim_localizacao") or None
-    inicio_analise = datetime.now()
-    fim_analise = datetime.now() if formulario.get("finalizar") else None
+    setor_atual = session.get("setor")
 
-    dias_uteis_localizacao = calcular_dias_uteis(inicio_localizacao, fim_localizacao)
-    dias_uteis_analise = calcular_dias_uteis(inicio_analise.strftime("%Y-%m-%d"), fim_analise.strftime("%Y-%m-%d") if fim_analise else None)
+    try:
+        dados = preparar_cadastro(formulario, setor_atual, session.get("cpf_tecnico"), SETOR_TO_BLUEPRINT)
+    except CadastroInvalido as e:
+        return str(e), 400
 
-    data_entrada = date.today()
-    data_previsao_resposta = data_entrada + timedelta(days=40)
+    blueprint_redirect = SETOR_TO_BLUEPRINT.get(setor_atual)
+    if not blueprint_redirect:
+        return "Setor inválido para redirecionamento", 400
 
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                
-                cpf = formulario.get("cpf_requerente")
-                cnpj = formulario.get("cnpj_requerente")
-                cpf_cnpj_requerente = cpf or cnpj
-                nome_requerente = formulario.get("nome_requerente")
-                tipo_requerente = formulario.get("tipo_de_requerente")
-
-                requerente_id = None
-
-                if nome_requerente:
-                    cur.execute("""
-                        INSERT INTO requerente (cpf_cnpj_requerente, nome_requerente, tipo_requerente)
-                        VALUES (%s, %s, %s) 
-                        RETURNING id_requerente
-                    """, (cpf_cnpj_requerente or None, nome_requerente, tipo_requerente or None))
-                    
-                    result = cur.fetchone()
-                    requerente_id = result[0] if result else None
-                    print(f"✅ Requerente inserido. ID: {requerente_id}")
-
-                if not cpf_cnpj_requerente or not nome_requerente or not tipo_requerente:
-                    cpf_cnpj_requerente = None
-                    print("🔧 Requerente não preenchido - campo será NULL no processo")
-
-                proprietario_id = None
-                cpf_cnpj_proprietario = formulario.get("cpf_cnpj_proprietario")
-                nome_proprietario = formulario.get("nome_proprietario")
-
-                if nome_proprietario:
-                    cur.execute("""
-                        INSERT INTO proprietario (cpf_cnpj_proprietario, nome_proprietario)
-                        VALUES (%s, %s) 
-                        RETURNING id_proprietario
-                    """, (cpf_cnpj_proprietario or None, nome_proprietario))
-                    
-                    result = cur.fetchone()
-                    proprietario_id = result[0] if result else None
-                    print(f"✅ Proprietário inserido. ID: {proprietario_id}")
-              
-                # Inserir imóvel
-                
-                # Gerar matrícula aleatória que caiba em 20 caracteres
-                matricula_imovel = formulario.get("matricula_imovel")
-
-                if not matricula_imovel or not matricula_imovel.strip():
-                    # Gerar matrícula aleatória no formato: NOMAT-AAAAMMDD-RAND
-                    import random
-                    timestamp = datetime.now().strftime("%Y%m%d")
-                    random_suffix = random.randint(1000, 9999)
-                    matricula_imovel = f"NOMAT-{timestamp}-{random_suffix}"
-                    
-                    # Garantir que não ultrapasse 20 caracteres
-                    if len(matricula_imovel) > 20:
-                        matricula_imovel = matricula_imovel[:20]
-                    
-                    print(f"🏠 Gerada matrícula automática: {matricula_imovel} (tamanho: {len(matricula_imovel)})")
-
-                # AGORA SEMPRE TEMOS MATRÍCULA VÁLIDA - podemos inserir o imóvel
-                print(f"🏠 Inserindo dados do imóvel com matrícula: {matricula_imovel}")
-
-                # 1. PRIMEIRO: Obter os valores do formulário
-                apa_nome = formulario.get("apa")  # ← Nome da APA selecionada
-                utp_nome = formulario.get("utp")  # ← Nome da UTP selecionada
-                zona_apa_nome = formulario.get("zona_apa")
-                zona_utp_nome = formulario.get("zona_utp")
-
-                print(f"🔍 DEBUG inserir - APA: '{apa_nome}', Zona APA: '{zona_apa_nome}'")
-                print(f"🔍 DEBUG inserir - UTP: '{utp_nome}', Zona UTP: '{zona_utp_nome}'")
-
-                # 2. BUSCAR ID DA ZONA APA (COM FILTRO POR APA)
-                zona_apa_id = None
-                if apa_nome and zona_apa_nome:
-                    # CORREÇÃO: Adicionar TRIM(apa) = %s na condição
-                    cur.execute("""
-                        SELECT id_zona_apa 
-                        FROM zona_apa 
-                        WHERE TRIM(apa) = %s AND nome_zona_apa = %s
-                    """, (apa_nome, zona_apa_nome))
-                    
-                    result = cur.fetchone()
-                    if result:
-                        zona_apa_id = result[0]
-                        print(f"✅ Zona APA encontrada: ID={zona_apa_id} (APA: '{apa_nome}', Zona: '{zona_apa_nome}')")
-                    else:
-                        print(f"❌ Zona APA não encontrada: APA='{apa_nome}', Zona='{zona_apa_nome}'")
-                else:
-                    print("ℹ️ Zona APA não buscada: faltam dados")
-
-                # 3. BUSCAR ID DA ZONA UTP (COM FILTRO POR UTP)
-                zona_utp_id = None
-                if utp_nome and zona_utp_nome:
-                    # CORREÇÃO: Adicionar TRIM(utp) = %s na condição
-                    cur.execute("""
-                        SELECT id_zona_utp 
-                        FROM zona_utp 
-                        WHERE TRIM(utp) = %s AND nome_zona_utp = %s
-                    """, (utp_nome, zona_utp_nome))
-                    
-                    result = cur.fetchone()
-                    if result:
-                        zona_utp_id = result[0]
-                        print(f"✅ Zona UTP encontrada: ID={zona_utp_id} (UTP: '{utp_nome}', Zona: '{zona_utp_nome}')")
-                    else:
-                        print(f"❌ Zona UTP não encontrada: UTP='{utp_nome}', Zona='{zona_utp_nome}'")
-                else:
-                    print("ℹ️ Zona UTP não buscada: faltam dados")
-
-                latitude = formulario.get("latitude")
-                longitude = formulario.get("longitude")
-                area = formulario.get("area")
-
-                if latitude:
-                    latitude = latitude.replace(',', '.')
-                if longitude:
-                    longitude = longitude.replace(',', '.')
-                if area:
-                    area = area.replace(',', '.')
-                    
-                cur.execute("""
-                    INSERT INTO imovel (matricula_imovel, zona_apa, zona_utp, classificacao_viaria, curva_inundacao, manancial, area, localidade_imovel, latitude, longitude, faixa_servidao)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (matricula_imovel) DO NOTHING
-                """, (
-                    matricula_imovel,
-                    zona_apa_id,
-                    zona_utp_id,
-                    formulario.get("sistema_viario") or None,
-                    formulario.get("curva_inundacao") or None,
-                    formulario.get("manancial") or None,
-                    area or None,
-                    formulario.get("localidade_imovel") or None,
-                    latitude or None,
-                    longitude or None,
-                    formulario.get("faixa_servidao") or None,
-                ))
-
-                if matricula_imovel and formulario.get("municipio"):
-                    cur.execute("""
-                        INSERT INTO imovel_municipio (imovel_matricula, municipio_nome)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (matricula_imovel, formulario["municipio"]))
-
-                if matricula_imovel and proprietario_id:
-                    cur.execute("""
-                        INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id)
-                        VALUES (%s, %s)
-                    """, (matricula_imovel, proprietario_id))
-                    
-                sigla_zona_urbana = formulario.get("zona_urbana")
-                sigla_macrozona = formulario.get("macrozona_municipal")
-
-                cur.execute("SELECT id_zona_urbana FROM zona_urbana WHERE sigla_zona_urbana = %s", (sigla_zona_urbana,))
-                zona_urbana_id = cur.fetchone()
-                zona_urbana_id = zona_urbana_id[0] if zona_urbana_id else None
-
-                cur.execute("SELECT id_macrozona FROM macrozona_municipal WHERE sigla_macrozona = %s", (sigla_macrozona,))
-                macrozona_id = cur.fetchone()
-                macrozona_id = macrozona_id[0] if macrozona_id else None
-
-                if matricula_imovel and (zona_urbana_id or macrozona_id):
-                    print(f"TENTANDO INSERT: matricula='{formulario.get('matricula_imovel')}', zona_id={zona_urbana_id}, macro_id={macrozona_id}")
-                    
-                    try:
-                        cur.execute("""
-                            INSERT INTO imovel_zona_macrozona (imovel_matricula, zona_urbana_id, macrozona_id)
-                            VALUES (%s, %s, %s)
-                            ON CONFLICT (imovel_matricula) 
-                            DO UPDATE SET 
-                                zona_urbana_id = EXCLUDED.zona_urbana_id,
-                                macrozona_id = EXCLUDED.macrozona_id
-                        """, (matricula_imovel, zona_urbana_id, macrozona_id))
-                    except Exception as e:
-                        print(f"❌ ERRO NO INSERT: {e}")
-                        conn.rollback()
-
-                if formulario.get("numero_pasta"):
-                    cur.execute("""
-                        INSERT INTO pasta (numero_pasta)
-                        VALUES (%s) ON CONFLICT (numero_pasta) DO NOTHING
-                    """, (formulario["numero_pasta"],))
-
-                # Inserir processo principal
-                cur.execute("""
-                    INSERT INTO processo (
-                        protocolo, observacoes, imovel_matricula, pasta_numero, solicitacao_requerente,
-                        resposta_departamento, tramitacao, setor_nome, tipologia, situacao_localizacao,
-                        responsavel_localizacao, inicio_localizacao, fim_localizacao,
-                        dias_uteis_localizacao, requerente, 
-                        nome_ou_loteamento_do_condominio_a_ser_aprovado, interesse_social,
-                        data_entrada, perimetro_urbano
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    formulario.get("protocolo"),
-                    formulario.get("observacoes"),
-                    matricula_imovel,
-                    formulario.get("numero_pasta") or None,
-                    formulario.get("solicitacao_requerente") or None,
-                    formulario.get("resposta_departamento") or None,
-                    formulario.get("tramitacao") or None,
-                    session.get("setor") or None,
-                    formulario.get("tipologia") or None,
-                    formulario.get("situacao_localizacao") or None,
-                    formulario.get("responsavel_localizacao_cpf") or None,
-                    inicio_localizacao,
-                    fim_localizacao,
-                    dias_uteis_localizacao,
-                    requerente_id,
-                    formulario.get("nome_ou_loteamento_do_condominio_a_ser_aprovado"),
-                    interesse_social,
-                    data_entrada,
-                    lei_inclui_perimetro_urbano
-                ))
-
-                # Inserir análise 
-                cur.execute("""
-                    INSERT INTO analise (situacao_analise, responsavel_analise, inicio_analise, fim_analise, dias_uteis_analise, ultima_movimentacao, processo_protocolo, prioridade, complexidade)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    "NÃO FINALIZADA" if not formulario.get("finalizar") else "FINALIZADA",
-                    session.get("cpf_tecnico") or None,
-                    inicio_analise,
-                    fim_analise,
-                    dias_uteis_analise,
-                    datetime.now().date(),
-                    formulario.get("protocolo"),
-                    formulario.get("prioridade") or None,
-                    formulario.get("complexidade") or None,
-                ))
-
-                protocolo = formulario.get("protocolo")
-
-                # PROCESSAR ENCAMINHAMENTO
-                if acao_encaminhar:
-                    if not setor_destino:
-                        return "Setor destino não informado", 400
-                    
-                    blueprint_redirect = SETOR_TO_BLUEPRINT.get(setor_destino)
-                    if not blueprint_redirect:
-                        return "Setor inválido para redirecionamento", 400
-                    
-                    # Atualizar setor do processo
-                    cur.execute("UPDATE processo SET setor_nome = %s WHERE protocolo = %s", (setor_destino, protocolo))
-                    
-                    # Registrar no histórico
-                    cur.execute("""
-                        INSERT INTO historico (
-                            processo_protocolo, setor_origem, setor_destino,
-                            tecnico_responsavel_anterior, tecnico_novo_responsavel,
-                            data_encaminhamento
-                        ) VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (
-                        protocolo,
-                        session.get("setor"),
-                        setor_destino,
-                        session.get("cpf_tecnico"),
-                        None,
-                    ))
+                # Requerente, proprietário, imóvel, zonas, pasta, processo,
+                # análise e histórico numa única instrução (cadastro.py)
+                ids = cadastrar(cur, dados)
+                protocolo = ids["protocolo"]
+                logger.debug("Cadastro do processo %s: %s", protocolo, ids)
 
                 # PROCESSAR FINALIZAÇÃO (PDF)
+                # O PDF é gerado pelo worker da fila (fila_pdf.py) depois do
+                # commit, fora da requisição e sem segurar a transação.
                 if acao_finalizar:
-                    
                     formulario['responsavel_analise'] = session.get("cpf_tecnico")
-                    
-                    nome_arquivo = f"{protocolo}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-                    caminho_pdf = os.path.join("PDFS", nome_arquivo)
-                    os.makedirs("PDFS", exist_ok=True)
-
-                    try:
-                        # 1. Gerar PDF principal (como antes)
-                        gerar_pdf(formulario, caminho_pdf)
-                        print(f"✅ PDF principal gerado: {caminho_pdf}")
-                        
-                        # 2. ✅ PASSO 3: MESCLAR COM RELATÓRIO DE ANÁLISE (se existir)
-                        caminho_pdf_final = mesclar_com_relatorio_analise(caminho_pdf, protocolo)
-                        
-                        # 3. Registrar no banco o PDF FINAL (mesclado ou não)
-                        cur.execute("""
-                            INSERT INTO pdf_gerados (processo_protocolo, setor_nome, caminho_pdf, data_geracao)
-                            VALUES (%s, %s, %s, %s)
-                        """, (protocolo, session.get("setor"), caminho_pdf_final, datetime.now()))
-                        
-                        print(f"✅ PDF final registrado no banco: {caminho_pdf_final}")
-                        
-                    except Exception as e_pdf:
-                        print(f"❌ Erro ao gerar PDF: {e_pdf}")
-                        return "Erro ao gerar PDF", 500
+                    id_job = enfileirar_pdf(cur, protocolo, setor_atual, TIPO_CADASTRO, formulario)
+                    logger.info("PDF do protocolo %s enfileirado (job %s)", protocolo, id_job)
 
                 # COMMIT PRINCIPAL (ÚNICO)
                 conn.commit()
-                print(f"✅ Processo {protocolo} criado com sucesso!")
+                logger.info("Processo %s criado com sucesso!", protocolo)
 
-                # REDIRECIONAMENTO
-                setor_atual = session.get("setor")
-                blueprint_redirect = SETOR_TO_BLUEPRINT.get(setor_atual)
-                
-                if not blueprint_redirect:
-                    return "Setor inválido para redirecionamento", 400
-                
-                return redirect(url_for(f"{blueprint_redirect}.ambiente"))
+        return redirect(url_for(f"{blueprint_redirect}.ambiente"))
 
     except Exception as e:
-        import traceback
-        print("Erro completo:")
-        traceback.print_exc()
-        print("Dados do formulário:")
-        for k, v in formulario.items():
-            print(f"{k} = {v} ({len(v) if v else 0})")
+        logger.exception("Erro ao inserir processo %s", formulario.get("protocolo"))
+        # Formulário completo só com DEBUG ligado (CPF/CNPJ mascarados)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Dados do formulário", extra={"formulario": redigir_campos(formulario)})
         return f"Erro ao inserir/atualizar dados: {e}", 500
+
+
+# Linhas recusadas mostradas na página; o relatório completo sai em CSV
+LIMITE_ERROS_IMPORTACAO = 500
+
+
+@app.route("/importar", methods=["GET", "POST"])
+def importar():
+    # Cadastro em lote a partir de planilha do protocolo (importar.py)
+    if "cpf_tecnico" not in session:
+        return redirect(url_for("login"))
+
+    contexto = {"extensoes": EXTENSOES, "limite_erros": LIMITE_ERROS_IMPORTACAO,
+                "blueprint": SETOR_TO_BLUEPRINT.get(session.get("setor"))}
+    if request.method == "GET":
+        return render_template("importar.html", **contexto)
+
+    planilha = request.files.get("planilha")
+    if not planilha or not planilha.filename:
+        return render_template("importar.html", erro="Escolha uma planilha", **contexto), 400
+
+    try:
+        resultado = importar_processos(
+            planilha.stream, planilha.filename, session.get("setor"), session.get("cpf_tecnico"),
+            SETOR_TO_BLUEPRINT, simular=bool(request.form.get("simular")),
+        )
+    except PlanilhaInvalida as e:
+        return render_template("importar.html", erro=str(e), **contexto), 400
+    except Exception as e:
+        logger.exception("Erro ao importar planilha %s", planilha.filename)
+        return f"Erro ao importar planilha: {e}", 500
+
+    if request.form.get("relatorio_csv") and resultado.erros:
+        nome = os.path.splitext(os.path.basename(planilha.filename))[0]
+        return Response(
+            relatorio_csv(resultado.erros).encode("utf-8-sig"),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{nome}_recusadas.csv"'},
+        )
+    return render_template("importar.html", resultado=resultado, **contexto)
     
+@app.route("/referencias/zonas.json")
+def hierarquia_zonas():
+    # Documento único com município -> zonas urbanas/macrozonas, APA -> zonas e
+    # UTP -> zonas. Com ?v=<etag> é imutável; sem versão, o navegador revalida
+    # pelo ETag e recebe 304 enquanto nada mudar.
+    _, corpo, etag = obter_hierarquia_zonas()
+    resposta = app.response_class(corpo, mimetype="application/json")
+    resposta.set_etag(etag)
+    if request.args.get("v") == etag:
+        resposta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        resposta.headers["Cache-Control"] = "no-cache"
+    return resposta.make_conditional(request)
+
+
+@app.context_processor
+def injetar_versao_zonas():
+    def versao_zonas():
+        return obter_hierarquia_zonas()[2]
+    return {"versao_zonas": versao_zonas}
+
+
+# Rotas antigas da cascata, mantidas por compatibilidade: respondem a partir da
+# hierarquia em memória, sem consultar o banco.
 @app.route("/get_zonas_urbanas/<municipio>")
 def get_zonas_urbanas(municipio):
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DISTINCT sigla_zona_urbana
-        FROM zona_urbana
-        WHERE TRIM(municipio_nome) = %s
-        ORDER BY sigla_zona_urbana
-    """, (municipio,))
-    dados = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return jsonify(dados)
+    municipios = obter_hierarquia_zonas()[0]["municipios"]
+    return jsonify(municipios.get(municipio, {}).get("zonas_urbanas", []))
 
 
 @app.route("/get_macrozonas/<municipio>")
 def get_macrozonas(municipio):
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DISTINCT sigla_macrozona
-        FROM macrozona_municipal
-        WHERE TRIM(municipio_nome) = %s
-        ORDER BY sigla_macrozona
-    """, (municipio,))
-    dados = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return jsonify(dados)
+    municipios = obter_hierarquia_zonas()[0]["municipios"]
+    return jsonify(municipios.get(municipio, {}).get("macrozonas", []))
 
 
 @app.route("/get_zonas_apa/<apa>")
 def get_zonas_apa(apa):
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DISTINCT nome_zona_apa
-        FROM zona_apa
-        WHERE TRIM(apa) = %s
-        ORDER BY nome_zona_apa
-    """, (apa,))
-    dados = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return jsonify(dados)
+    return jsonify(obter_hierarquia_zonas()[0]["apas"].get(apa, []))
 
 
 @app.route("/get_zonas_utp/<utp>")
 def get_zonas_utp(utp):
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DISTINCT nome_zona_utp
-        FROM zona_utp
-        WHERE TRIM(utp) = %s
-        ORDER BY nome_zona_utp
-    """, (utp,))
-    dados = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return jsonify(dados)
+    return jsonify(obter_hierarquia_zonas()[0]["utps"].get(utp, []))
 
 from flask import send_from_directory
 
@@ -574,6 +272,19 @@ def baixar_pdf(filename):
     return send_from_directory('PDFS', filename, as_attachment=True)
 
         
+@app.route('/pdf/status/<protocolo>')
+def status_pdf_protocolo(protocolo):
+    # Situação do último PDF pedido para o protocolo (PENDENTE/EM_ANDAMENTO/CONCLUIDO/ERRO)
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            job = status_pdf(cur, protocolo)
+    if not job:
+        return jsonify({"status": None}), 404
+    if job["caminho_pdf"]:
+        job["arquivo"] = os.path.basename(job["caminho_pdf"])
+    return jsonify(job)
+
+        
 @app.route("/setor", methods=["GET", "POST"])
 def escolher_setor():
     setores = ["DOT", "DPM", "DIG", "PRESIDENTE_DPUR"]
@@ -592,16 +303,13 @@ def login():
     if not setor:
         return redirect(url_for("escolher_setor"))
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT cpf_tecnico, nome_tecnico FROM tecnico WHERE setor_tecnico = %s", (setor,))
-            tecnicos = cur.fetchall()  # lista de tuplas (cpf, nome)
-
     if request.method == "POST":
+        # Conferido no banco: o cache de técnicos pode estar desatualizado
         cpf_selecionado = request.form.get("cpf_tecnico")
-        if cpf_selecionado and any(cpf_selecionado == t[0] for t in tecnicos):
+        nome = conferir_tecnico(cpf_selecionado, setor)
+        if nome is not None:
             session["cpf_tecnico"] = cpf_selecionado
-            session["nome_tecnico"] = next(t[1] for t in tecnicos if t[0] == cpf_selecionado)
+            session["nome_tecnico"] = nome
 
             setor_sessao = session.get("setor")
             blueprint_nome = SETOR_TO_BLUEPRINT.get(setor_sessao)
@@ -612,8 +320,30 @@ def login():
         else:
             return "Técnico inválido para este setor", 400
 
+    tecnicos = tecnicos_do_setor(setor)  # lista de tuplas (cpf, nome), em memória, só para exibir
     return render_template("login.html", setor=setor, tecnicos=tecnicos)
 
+@app.route("/status/pool")
+def status_pool():
+    # Estatísticas do pool de conexões para monitoramento
+    return jsonify(estatisticas_pool())
+
+@app.route("/status/consultas-lentas")
+def status_consultas_lentas():
+    # Consultas acima de CONSULTAS_LENTAS_MS com o plano capturado
+    if "cpf_tecnico" not in session:
+        return "Usuário sem sessão ativa", 401
+    return jsonify(listar_consultas_lentas())
+
+@app.route("/admin/referencias/invalidar", methods=["POST"])
+def admin_invalidar_referencias():
+    # Força a recarga das listas de enumerados após alterar as tabelas
+    if "cpf_tecnico" not in session:
+        return "Usuário sem sessão ativa", 401
+    invalidar_referencias()
+    obter_referencias()
+    return jsonify({"versao": versao_referencias()})
+
 @app.route("/logout")
 def logout():
     session.clear()
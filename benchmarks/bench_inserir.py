@@ -0,0 +1,174 @@
+# benchmarks/bench_inserir.py
+# Cadastro de processo: instrução única (cadastro.SQL_CADASTRAR) contra a
+# sequência de instruções que o /inserir fazia antes (uma ida ao banco cada)
+#
+# Usa valores reais de zonas/município da base e protocolos BENCH-INS-*;
+# tudo roda numa transação desfeita no final.
+#
+# Uso (na raiz do projeto):
+#   python -m benchmarks.bench_inserir --repeticoes 200
+# A diferença cresce com a latência até o banco: compare também com o
+# PostgreSQL em outra máquina (DATABASE_URL remoto).
+import argparse
+import statistics
+import time
+
+from cadastro import cadastrar, preparar_cadastro
+from db import get_db_connection
+
+SETOR = "DIG"
+CPF_TECNICO = "00000000000"
+
+
+def formulario_exemplo(cur, n):
+    cur.execute("SELECT apa, nome_zona_apa FROM zona_apa WHERE apa IS NOT NULL LIMIT 1")
+    apa, zona_apa = cur.fetchone() or (None, None)
+    cur.execute("SELECT utp, nome_zona_utp FROM zona_utp WHERE utp IS NOT NULL LIMIT 1")
+    utp, zona_utp = cur.fetchone() or (None, None)
+    cur.execute("SELECT sigla_zona_urbana, municipio_nome FROM zona_urbana LIMIT 1")
+    zona_urbana, municipio = cur.fetchone() or (None, None)
+    cur.execute("SELECT sigla_macrozona FROM macrozona_municipal LIMIT 1")
+    macrozona = (cur.fetchone() or (None,))[0]
+    return {
+        "protocolo": f"BENCH-INS-{n:06d}",
+        "observacoes": "benchmark",
+        "numero_pasta": f"BP{n:06d}",
+        "nome_requerente": "Requerente Bench",
+        "tipo_de_requerente": "PESSOA FÍSICA",
+        "cpf_requerente": "000.000.000-00",
+        "nome_proprietario": "Proprietário Bench",
+        "cpf_cnpj_proprietario": "00000000000",
+        "matricula_imovel": f"BM{n:06d}",
+        "municipio": municipio,
+        "apa": apa, "zona_apa": zona_apa,
+        "utp": utp, "zona_utp": zona_utp,
+        "zona_urbana": zona_urbana,
+        "macrozona_municipal": macrozona,
+        "area": "1234,5",
+        "encaminhar": "1",
+        "setor_destino": "DOT",
+    }
+
+
+def cadastrar_sequencial(cur, d):
+    """As instruções do /inserir anterior, na mesma ordem. Retorna quantas executou."""
+    execucoes = 0
+
+    def executar(sql, params):
+        nonlocal execucoes
+        execucoes += 1
+        cur.execute(sql, params)
+
+    requerente_id = proprietario_id = None
+    if d["nome_requerente"]:
+        executar("""INSERT INTO requerente (cpf_cnpj_requerente, nome_requerente, tipo_requerente)
+                    VALUES (%s, %s, %s) RETURNING id_requerente""",
+                 (d["cpf_cnpj_requerente"], d["nome_requerente"], d["tipo_requerente"]))
+        requerente_id = cur.fetchone()[0]
+    if d["nome_proprietario"]:
+        executar("""INSERT INTO proprietario (cpf_cnpj_proprietario, nome_proprietario)
+                    VALUES (%s, %s) RETURNING id_proprietario""",
+                 (d["cpf_cnpj_proprietario"], d["nome_proprietario"]))
+        proprietario_id = cur.fetchone()[0]
+
+    zona_apa_id = zona_utp_id = None
+    if d["apa"] and d["zona_apa"]:
+        executar("SELECT id_zona_apa FROM zona_apa WHERE apa = %s AND nome_zona_apa = %s",
+                 (d["apa"], d["zona_apa"]))
+        zona_apa_id = (cur.fetchone() or (None,))[0]
+    if d["utp"] and d["zona_utp"]:
+        executar("SELECT id_zona_utp FROM zona_utp WHERE utp = %s AND nome_zona_utp = %s",
+                 (d["utp"], d["zona_utp"]))
+        zona_utp_id = (cur.fetchone() or (None,))[0]
+
+    executar("""INSERT INTO imovel (matricula_imovel, zona_apa, zona_utp, classificacao_viaria, curva_inundacao,
+                                    manancial, area, localidade_imovel, latitude, longitude, faixa_servidao)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (matricula_imovel) DO NOTHING""",
+             (d["matricula_imovel"], zona_apa_id, zona_utp_id, d["sistema_viario"], d["curva_inundacao"],
+              d["manancial"], d["area"], d["localidade_imovel"], d["latitude"], d["longitude"],
+              d["faixa_servidao"]))
+    if d["municipio"]:
+        executar("""INSERT INTO imovel_municipio (imovel_matricula, municipio_nome)
+                    VALUES (%s, %s) ON CONFLICT DO NOTHING""", (d["matricula_imovel"], d["municipio"]))
+    if proprietario_id:
+        executar("INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id) VALUES (%s, %s)",
+                 (d["matricula_imovel"], proprietario_id))
+
+    executar("SELECT id_zona_urbana FROM zona_urbana WHERE sigla_zona_urbana = %s", (d["zona_urbana"],))
+    zona_urbana_id = (cur.fetchone() or (None,))[0]
+    executar("SELECT id_macrozona FROM macrozona_municipal WHERE sigla_macrozona = %s", (d["macrozona_municipal"],))
+    macrozona_id = (cur.fetchone() or (None,))[0]
+    if zona_urbana_id or macrozona_id:
+        executar("""INSERT INTO imovel_zona_macrozona (imovel_matricula, zona_urbana_id, macrozona_id)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (imovel_matricula) DO UPDATE SET
+                        zona_urbana_id = EXCLUDED.zona_urbana_id, macrozona_id = EXCLUDED.macrozona_id""",
+                 (d["matricula_imovel"], zona_urbana_id, macrozona_id))
+    if d["numero_pasta"]:
+        executar("INSERT INTO pasta (numero_pasta) VALUES (%s) ON CONFLICT (numero_pasta) DO NOTHING",
+                 (d["numero_pasta"],))
+
+    executar("""INSERT INTO processo (
+                    protocolo, observacoes, imovel_matricula, pasta_numero, solicitacao_requerente,
+                    resposta_departamento, tramitacao, setor_nome, tipologia, situacao_localizacao,
+                    responsavel_localizacao, inicio_localizacao, fim_localizacao,
+                    dias_uteis_localizacao, requerente,
+                    nome_ou_loteamento_do_condominio_a_ser_aprovado, interesse_social,
+                    data_entrada, perimetro_urbano, data_previsao_resposta
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+             (d["protocolo"], d["observacoes"], d["matricula_imovel"], d["numero_pasta"],
+              d["solicitacao_requerente"], d["resposta_departamento"], d["tramitacao"], d["setor_origem"],
+              d["tipologia"], d["situacao_localizacao"], d["responsavel_localizacao"], d["inicio_localizacao"],
+              d["fim_localizacao"], d["dias_uteis_localizacao"], requerente_id,
+              d["nome_ou_loteamento_do_condominio_a_ser_aprovado"], d["interesse_social"], d["data_entrada"],
+              d["perimetro_urbano"], d["data_previsao_resposta"]))
+    executar("""INSERT INTO analise (situacao_analise, responsavel_analise, inicio_analise, fim_analise,
+                                     dias_uteis_analise, ultima_movimentacao, processo_protocolo,
+                                     prioridade, complexidade)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+             (d["situacao_analise"], d["responsavel_analise"], d["inicio_analise"], d["fim_analise"],
+              d["dias_uteis_analise"], d["data_entrada"], d["protocolo"], d["prioridade"], d["complexidade"]))
+    if d["setor_destino"]:
+        executar("UPDATE processo SET setor_nome = %s WHERE protocolo = %s", (d["setor_destino"], d["protocolo"]))
+        executar("""INSERT INTO historico (processo_protocolo, setor_origem, setor_destino,
+                                           tecnico_responsavel_anterior, tecnico_novo_responsavel,
+                                           data_encaminhamento)
+                    VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)""",
+                 (d["protocolo"], d["setor_origem"], d["setor_destino"], d["responsavel_analise"], None))
+    return execucoes
+
+
+def medir(cur, funcao, inicio_numeracao, repeticoes):
+    tempos = []
+    for n in range(inicio_numeracao, inicio_numeracao + repeticoes):
+        dados = preparar_cadastro(formulario_exemplo(cur, n), SETOR, CPF_TECNICO, {"DIG", "DOT"})
+        comeco = time.perf_counter()
+        funcao(cur, dados)
+        tempos.append((time.perf_counter() - comeco) * 1000)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cadastro: CTE única x instruções em sequência")
+    parser.add_argument("--repeticoes", type=int, default=100)
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            dados = preparar_cadastro(formulario_exemplo(cur, 0), SETOR, CPF_TECNICO, {"DIG", "DOT"})
+            instrucoes = cadastrar_sequencial(cur, dados)
+
+            sequencial = medir(cur, cadastrar_sequencial, 1, args.repeticoes)
+            unica = medir(cur, cadastrar, 1 + args.repeticoes, args.repeticoes)
+        conn.rollback()
+
+    print(f"{'caminho':<12} {'instruções':>10} {'mediana ms':>11} {'p95 ms':>8}")
+    for nome, tempos, n in (("sequencial", sequencial, instrucoes), ("cte", unica, 1)):
+        p95 = statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0]
+        print(f"{nome:<12} {n:>10} {statistics.median(tempos):>11.2f} {p95:>8.2f}")
+    print(f"Ganho na mediana: {statistics.median(sequencial) / statistics.median(unica):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
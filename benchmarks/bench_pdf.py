@@ -0,0 +1,171 @@
+# benchmarks/bench_pdf.py
+# Micro-benchmarks da renderização (relatorio.py) e da mesclagem (pdf_manager.py)
+#
+# Não usa o banco: renderiza a partir de dicts prontos (renderizar_pdf*) e
+# mescla com anexos de 1/10/100 páginas gerados na hora.
+#
+# Uso (na raiz do projeto):
+#   python -m benchmarks.bench_pdf --salvar base.json
+#   python -m benchmarks.bench_pdf --comparar base.json --limite 1.25
+# Com --comparar, sai com código 1 se algum caso ficar mais lento (mediana)
+# ou usar mais memória (pico) que a base multiplicada por --limite.
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fpdf import FPDF
+
+import pdf_manager
+from relatorio import (LEGENDAS_AMIGAVEIS, LEGENDAS_AMIGAVEIS_2, renderizar_pdf,
+                       renderizar_pdf_segundo_preenchimento)
+
+PROTOCOLO = "BENCH-0001"
+TEXTO_LONGO = "Texto de observação do técnico com bastante conteúdo para quebrar linhas. " * 12
+
+
+def formulario_pequeno():
+    return {
+        "protocolo": PROTOCOLO,
+        "tipologia": "LOTEAMENTO",
+        "municipio": "CURITIBA",
+        "nome_requerente": "Requerente de Teste",
+        "responsavel_analise": "Técnico de Teste",
+        "interesse_social": "on",
+    }
+
+
+def formulario_grande():
+    dados = {chave: f"Valor de {chave}" for chave in LEGENDAS_AMIGAVEIS}
+    dados.update({"protocolo": PROTOCOLO, "observacoes": TEXTO_LONGO,
+                  "nome_ou_loteamento_do_condominio_a_ser_aprovado": TEXTO_LONGO[:300]})
+    return dados
+
+
+def edicao_grande():
+    dados = {chave: f"Valor de {chave}" for chave in LEGENDAS_AMIGAVEIS_2}
+    dados.update({"protocolo": PROTOCOLO, "observacoes": TEXTO_LONGO, "situacao_analise": "FINALIZADA"})
+    return dados
+
+
+def criar_anexo(caminho, paginas):
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 11)
+    for n in range(paginas):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Anexo - página {n + 1}", ln=True)
+        pdf.multi_cell(0, 6, TEXTO_LONGO)
+    pdf.output(str(caminho))
+
+
+def montar_casos(diretorio):
+    """Nome do caso -> função sem argumentos que executa uma vez."""
+    casos = {}
+    saida = str(diretorio / "saida.pdf")
+
+    for nome, fabrica in (("pequeno", formulario_pequeno), ("grande", formulario_grande)):
+        casos[f"render_cadastro_{nome}"] = lambda f=fabrica: renderizar_pdf(f(), saida)
+    for nome, fabrica in (("pequeno", formulario_pequeno), ("grande", edicao_grande)):
+        casos[f"render_edicao_{nome}"] = lambda f=fabrica: renderizar_pdf_segundo_preenchimento(f(), saida)
+
+    # Mesclagem: principal fixo + anexo do protocolo com N páginas
+    principal = diretorio / "principal.pdf"
+    renderizar_pdf(formulario_grande(), str(principal))
+    for paginas in (1, 10, 100):
+        anexos = diretorio / f"anexos_{paginas}"
+        anexos.mkdir()
+        criar_anexo(anexos / f"{PROTOCOLO}_relatorio.pdf", paginas)
+
+        def mesclar(anexos=anexos):
+            pdf_manager.RELATORIOS_DIR = anexos
+            pdf_manager.mesclar_com_relatorio_analise(str(principal), PROTOCOLO)
+
+        casos[f"mesclar_anexo_{paginas}p"] = mesclar
+    return casos
+
+
+def medir(funcao, repeticoes, aquecimento):
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    # Pico de memória numa execução à parte (tracemalloc distorce o tempo)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mediana_ms": statistics.median(tempos),
+        "min_ms": min(tempos),
+        "p95_ms": statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0],
+        "pico_kb": pico / 1024,
+    }
+
+
+def comparar(resultados, base, limite):
+    """Lista de regressões (caso, métrica, atual, base)."""
+    regressoes = []
+    for caso, atual in resultados.items():
+        anterior = base.get(caso)
+        if not anterior:
+            continue
+        for metrica in ("mediana_ms", "pico_kb"):
+            if anterior[metrica] and atual[metrica] > anterior[metrica] * limite:
+                regressoes.append((caso, metrica, atual[metrica], anterior[metrica]))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de renderização e mesclagem de PDF")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=2)
+    parser.add_argument("--casos", help="filtra casos por substring, ex.: mesclar")
+    parser.add_argument("--salvar", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--limite", type=float, default=1.25,
+                        help="fator tolerado sobre a base antes de acusar regressão")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        diretorio = Path(tmp)
+        pdf_manager.PDFS_DIR = diretorio / "PDFS"
+        pdf_manager.PDFS_DIR.mkdir()
+
+        casos = montar_casos(diretorio)
+        resultados = {}
+        print(f"{'caso':<26} {'mediana ms':>11} {'min ms':>9} {'p95 ms':>9} {'pico KB':>9}")
+        for nome, funcao in casos.items():
+            if args.casos and args.casos not in nome:
+                continue
+            r = medir(funcao, args.repeticoes, args.aquecimento)
+            resultados[nome] = r
+            print(f"{nome:<26} {r['mediana_ms']:>11.2f} {r['min_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['pico_kb']:>9.0f}")
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Resultados gravados em {os.path.abspath(args.salvar)}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(resultados, base, args.limite)
+        for caso, metrica, atual, anterior in regressoes:
+            print(f"REGRESSÃO {caso} {metrica}: {atual:.2f} (base {anterior:.2f}, limite x{args.limite})")
+        if regressoes:
+            sys.exit(1)
+        print(f"Sem regressões acima de x{args.limite}")
+
+
+if __name__ == "__main__":
+    main()
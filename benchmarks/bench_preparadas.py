@@ -0,0 +1,96 @@
+# benchmarks/bench_preparadas.py
+# Compara o SQL fixo do preparadas.py executado como texto (parse + plano a
+# cada chamada) e como prepared statement (EXECUTE por nome)
+#
+# Para cada declaração registrada mede o tempo por chamada nos dois modos e o
+# "Planning Time" informado pelo EXPLAIN (SUMMARY). Tudo roda numa transação
+# desfeita no final: os UPDATEs não ficam gravados.
+#
+# Uso (na raiz do projeto, de preferência com dados de benchmarks.semear):
+#   python -m benchmarks.bench_preparadas --repeticoes 500
+import argparse
+import re
+import statistics
+import time
+
+import setores.routes  # noqa: F401  (registra as declarações do preencher_tecnico)
+from db import get_db_connection
+from preparadas import declaracoes, executar
+
+_RE_PLANEJAMENTO = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def amostras(cur):
+    """Valores reais para os parâmetros de cada declaração."""
+    cur.execute("""
+        SELECT p.protocolo, COALESCE(a.responsavel_analise, '')
+        FROM processo p JOIN analise a ON a.processo_protocolo = p.protocolo
+        ORDER BY p.protocolo DESC LIMIT 1
+    """)
+    protocolo, cpf = cur.fetchone() or ("", "")
+    cur.execute("SELECT apa, nome_zona_apa FROM zona_apa WHERE apa IS NOT NULL LIMIT 1")
+    zona_apa = cur.fetchone() or ("", "")
+    cur.execute("SELECT utp, nome_zona_utp FROM zona_utp WHERE utp IS NOT NULL LIMIT 1")
+    zona_utp = cur.fetchone() or ("", "")
+    return {
+        "zona_apa_id": zona_apa,
+        "zona_utp_id": zona_utp,
+        "finalizar_analise": (None, None, cpf, protocolo),
+        "finalizar_analise_sem_inicio": (cpf, protocolo),
+        "atribuir_responsavel": (cpf, protocolo),
+        "formulario_edicao": (protocolo,),
+    }
+
+
+def medir(cur, declaracao, params, preparar, repeticoes, aquecimento):
+    for _ in range(aquecimento):
+        executar(cur, declaracao, params, preparar=preparar)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        executar(cur, declaracao, params, preparar=preparar)
+        if cur.description:
+            cur.fetchall()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def planejamento(cur, declaracao, params, preparar):
+    sql = declaracao.sql_executar if preparar else declaracao.sql
+    cur.execute("EXPLAIN (SUMMARY) " + sql, params)
+    plano = "\n".join(row[0] for row in cur.fetchall())
+    encontrado = _RE_PLANEJAMENTO.search(plano)
+    return float(encontrado.group(1)) if encontrado else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Texto x prepared statement para o SQL de preparadas.py")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--aquecimento", type=int, default=10,
+                        help="execuções antes de medir (o plano genérico só vale após 5)")
+    parser.add_argument("--declaracoes", help="filtra por substring do nome, ex.: zona")
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            parametros = amostras(cur)
+            print(f"{'declaração':<30} {'texto ms':>9} {'prep. ms':>9} {'ganho':>7} "
+                  f"{'plano texto':>12} {'plano prep.':>12}")
+            for nome, declaracao in sorted(declaracoes().items()):
+                if args.declaracoes and args.declaracoes not in nome:
+                    continue
+                params = parametros.get(nome)
+                if params is None:
+                    print(f"{nome:<30} (sem amostra de parâmetros, ignorada)")
+                    continue
+                texto = medir(cur, declaracao, params, False, args.repeticoes, args.aquecimento)
+                preparada = medir(cur, declaracao, params, True, args.repeticoes, args.aquecimento)
+                plano_texto = planejamento(cur, declaracao, params, False)
+                plano_preparada = planejamento(cur, declaracao, params, True)
+                print(f"{nome:<30} {texto:>9.3f} {preparada:>9.3f} {texto / preparada:>6.2f}x "
+                      f"{plano_texto:>12.3f} {plano_preparada:>12.3f}")
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
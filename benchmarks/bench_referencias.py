@@ -0,0 +1,58 @@
+# benchmarks/bench_referencias.py
+# Compara a carga das listas de referência: consultas em sequência x consulta agrupada
+#
+# Uso (na raiz do projeto, com o .env apontando para o banco):
+#   python -m benchmarks.bench_referencias --repeticoes 50
+import argparse
+import statistics
+import time
+
+from db import get_db_connection
+from referencias import (CONSULTAS_REFERENCIA, carregar_referencias,
+                         carregar_referencias_sequencial)
+
+
+def medir(cur, funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(cur)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def ping(cur):
+    cur.execute("SELECT 1")
+    cur.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas em sequência x consulta agrupada")
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # Aquece caches do servidor e confere que os dois formatos batem
+            sequencial = carregar_referencias_sequencial(cur)
+            agrupado = carregar_referencias(cur)
+            divergentes = [nome for nome in sequencial if sorted(map(str, sequencial[nome])) != sorted(map(str, agrupado[nome]))]
+            if divergentes:
+                print(f"⚠️  Listas divergentes entre os carregadores: {divergentes}")
+
+            rtt = statistics.median(medir(cur, ping, args.repeticoes))
+            t_seq = medir(cur, carregar_referencias_sequencial, args.repeticoes)
+            t_agr = medir(cur, carregar_referencias, args.repeticoes)
+
+    idas_seq = len(CONSULTAS_REFERENCIA)
+    print(f"Ida ao banco (SELECT 1), mediana: {rtt:.2f} ms")
+    print(f"{'carregador':<12} {'idas':>5} {'mediana ms':>11} {'p95 ms':>9}")
+    for nome, idas, tempos in (("sequencial", idas_seq, t_seq), ("agrupado", 1, t_agr)):
+        p95 = statistics.quantiles(tempos, n=20)[-1] if len(tempos) > 1 else tempos[0]
+        print(f"{nome:<12} {idas:>5} {statistics.median(tempos):>11.2f} {p95:>9.2f}")
+    print(f"Idas ao banco economizadas por carga: {idas_seq - 1} "
+          f"(~{(idas_seq - 1) * rtt:.2f} ms só de latência de rede)")
+
+
+if __name__ == "__main__":
+    main()
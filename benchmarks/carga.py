@@ -0,0 +1,157 @@
+# benchmarks/carga.py
+# Teste de carga do fluxo do técnico contra uma instância rodando (só stdlib)
+#
+# Cada usuário virtual escolhe setor, faz login com um técnico do setor e repete:
+#   ambiente -> captar_processo -> preencher_tecnico (GET e POST salvar)
+#   -> finalizar ou encaminhar_processo
+#
+# Uso (app rodando, de preferência com dados de benchmarks.semear):
+#   python -m benchmarks.carga --url http://127.0.0.1:5000 --usuarios 20 --duracao 60
+import argparse
+import http.cookiejar
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+# Setor -> prefixo do blueprint (ver SETOR_TO_BLUEPRINT em app.py)
+PREFIXOS = {"DIG": "/dig", "DOT": "/dcot", "DPM": "/dplam", "PRESIDENTE_DPUR": "/diretor-tecnico"}
+
+_RE_TECNICO = re.compile(r'<option value="([^"]+)">')
+_RE_CAPTAR = re.compile(r'/captar_processo/([^"?]+)"')
+
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    # Cada passo é medido sozinho: o 302 conta como resposta da própria rota
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tempos = defaultdict(list)
+        self.erros = defaultdict(int)
+
+    def registrar(self, rota, duracao, ok):
+        with self._lock:
+            self.tempos[rota].append(duracao)
+            if not ok:
+                self.erros[rota] += 1
+
+
+class UsuarioVirtual:
+    def __init__(self, base, setor, resultados, timeout):
+        self.base = base.rstrip("/")
+        self.setor = setor
+        self.prefixo = PREFIXOS[setor]
+        self.resultados = resultados
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _SemRedirecionar,
+        )
+
+    def _requisitar(self, rota, caminho, dados=None):
+        """Faz a requisição e registra o tempo sob o nome `rota`. Retorna (status, corpo)."""
+        corpo_envio = urllib.parse.urlencode(dados).encode() if dados is not None else None
+        requisicao = urllib.request.Request(self.base + caminho, data=corpo_envio)
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(requisicao, timeout=self.timeout) as resposta:
+                status, corpo = resposta.status, resposta.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as e:
+            status, corpo = e.code, ""
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            status, corpo = 0, ""
+        self.resultados.registrar(rota, time.perf_counter() - inicio, 0 < status < 400)
+        return status, corpo
+
+    def login(self):
+        self._requisitar("POST /setor", "/setor", {"setor": self.setor})
+        _, pagina = self._requisitar("GET /login", "/login")
+        tecnicos = _RE_TECNICO.findall(pagina)
+        if not tecnicos:
+            return False
+        status, _ = self._requisitar("POST /login", "/login", {"cpf_tecnico": random.choice(tecnicos)})
+        return 0 < status < 400
+
+    def iteracao(self, fracao_finalizar):
+        p = self.prefixo
+        _, pagina = self._requisitar("GET /<setor>/ambiente", f"{p}/ambiente")
+        livres = _RE_CAPTAR.findall(pagina)
+        if not livres:
+            return
+        protocolo = urllib.parse.unquote(random.choice(livres))
+        q = urllib.parse.quote(protocolo, safe="")
+
+        self._requisitar("GET /<setor>/captar_processo", f"{p}/captar_processo/{q}")
+        self._requisitar("GET /<setor>/preencher_tecnico", f"{p}/preencher_tecnico/{q}")
+        self._requisitar("POST /<setor>/preencher_tecnico (salvar)", f"{p}/preencher_tecnico/{q}",
+                         {"observacoes": f"carga {time.time():.0f}", "salvar": "1"})
+
+        if random.random() < fracao_finalizar:
+            self._requisitar("POST /<setor>/preencher_tecnico (finalizar)", f"{p}/preencher_tecnico/{q}",
+                             {"finalizar": "1"})
+        else:
+            destino = random.choice([s for s in PREFIXOS if s != self.setor])
+            self._requisitar("GET /<setor>/encaminhar_processo",
+                             f"{p}/encaminhar_processo/{q}/{urllib.parse.quote(destino)}")
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def relatorio(resultados, duracao):
+    print(f"\n{'rota':<46} {'req':>6} {'erros':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for rota in sorted(resultados.tempos):
+        tempos = resultados.tempos[rota]
+        print(f"{rota:<46} {len(tempos):>6} {resultados.erros[rota]:>6} {len(tempos) / duracao:>7.1f} "
+              f"{statistics.median(tempos) * 1000:>8.1f} {_percentil(tempos, 95) * 1000:>8.1f} "
+              f"{_percentil(tempos, 99) * 1000:>8.1f}")
+    total = sum(len(t) for t in resultados.tempos.values())
+    print(f"\nTotal: {total} requisições em {duracao:.1f}s ({total / duracao:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do fluxo do técnico")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--duracao", type=float, default=60, help="segundos")
+    parser.add_argument("--fracao-finalizar", type=float, default=0.3,
+                        help="parte das iterações que finaliza em vez de encaminhar")
+    parser.add_argument("--setores", default=",".join(PREFIXOS), help="ex.: DIG,DOT")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    setores = [s for s in args.setores.split(",") if s in PREFIXOS]
+    resultados = Resultados()
+    fim = time.monotonic() + args.duracao
+
+    def executar(indice):
+        usuario = UsuarioVirtual(args.url, setores[indice % len(setores)], resultados, args.timeout)
+        if not usuario.login():
+            print(f"Usuário {indice}: login falhou no setor {usuario.setor}")
+            return
+        while time.monotonic() < fim:
+            usuario.iteracao(args.fracao_finalizar)
+
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=executar, args=(i,), daemon=True) for i in range(args.usuarios)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    relatorio(resultados, time.monotonic() - inicio)
+
+
+if __name__ == "__main__":
+    main()
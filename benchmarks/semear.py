@@ -0,0 +1,286 @@
+# benchmarks/semear.py
+# Popula um banco LOCAL com volumes sintéticos para testes de carga
+#
+# Uso (na raiz do projeto, com o .env apontando para um banco de teste):
+#   python -m benchmarks.semear --processos 100000 --historico-por-processo 10
+#   python -m benchmarks.semear --limpar
+#
+# Tudo o que é criado leva o prefixo SEED (protocolos, matrículas, CPFs dos
+# técnicos, nomes), então --limpar remove só os dados sintéticos. As linhas são
+# geradas no próprio servidor com generate_series, em lotes. Rodar de novo sem
+# --limpar só cria os protocolos que ainda não existem (ex.: --processos maior).
+import argparse
+import time
+
+from db import get_db_connection
+
+SETORES = ["DIG", "DOT", "DPM", "PRESIDENTE_DPUR"]
+PREFIXO_PROTOCOLO = "SEED-"
+PREFIXO_MATRICULA = "SEEDM-"
+PREFIXO_CPF = "SD"
+
+# Listas existentes usadas para sortear valores (tabela, coluna)
+LISTAS = {
+    "tipologias": ("tipologia", "nome_tipologia"),
+    "municipios": ("municipio", "nome_municipio"),
+    "prioridades": ("prioridade", "tipo_prioridade"),
+    "complexidades": ("complexidade", "nivel_complexidade"),
+}
+
+
+def _sorteio(lista):
+    # Elemento aleatório de um array (NULL se a lista estiver vazia)
+    return f"(%({lista})s::text[])[1 + floor(random() * cardinality(%({lista})s::text[]))::int]"
+
+
+# Números do lote cujo protocolo ainda não existe; o resto já foi semeado
+SQL_NOVOS = """
+    SELECT n
+    FROM generate_series(%(inicio)s, %(fim)s) n
+    WHERE NOT EXISTS (
+        SELECT 1 FROM processo p WHERE p.protocolo = %(prefixo_protocolo)s || lpad(n::text, 8, '0')
+    )
+    ORDER BY n
+"""
+
+SQL_TECNICOS = """
+    INSERT INTO tecnico (cpf_tecnico, nome_tecnico, setor_tecnico)
+    SELECT %(prefixo_cpf)s || lpad(n::text, 9, '0'),
+           'Técnico Seed ' || n,
+           (%(setores)s::text[])[1 + (n - 1) %% cardinality(%(setores)s::text[])]
+    FROM generate_series(1, %(total)s) n
+    ON CONFLICT (cpf_tecnico) DO NOTHING
+"""
+
+SQL_REQUERENTES = """
+    INSERT INTO requerente (cpf_cnpj_requerente, tipo_requerente, nome_requerente)
+    SELECT lpad((random() * 99999999999)::bigint::text, 11, '0'),
+           CASE WHEN random() < 0.7 THEN 'PESSOA FÍSICA' ELSE 'PESSOA JURÍDICA' END,
+           'Seed Requerente ' || n
+    FROM unnest(%(novos)s::int[]) n
+"""
+
+SQL_PROPRIETARIOS = """
+    INSERT INTO proprietario (cpf_cnpj_proprietario, nome_proprietario)
+    SELECT lpad((random() * 99999999999)::bigint::text, 11, '0'), 'Seed Proprietário ' || n
+    FROM unnest(%(novos)s::int[]) n
+"""
+
+SQL_IMOVEIS = """
+    INSERT INTO imovel (matricula_imovel, area, localidade_imovel, latitude, longitude)
+    SELECT %(prefixo_matricula)s || n,
+           round((200 + random() * 50000)::numeric, 2),
+           'Localidade seed ' || (n %% 500),
+           -25.4 + random() * 0.8,
+           -49.6 + random() * 0.8
+    FROM unnest(%(novos)s::int[]) n
+    ON CONFLICT (matricula_imovel) DO NOTHING
+"""
+
+SQL_IMOVEL_MUNICIPIO = f"""
+    INSERT INTO imovel_municipio (imovel_matricula, municipio_nome)
+    SELECT %(prefixo_matricula)s || n, {_sorteio("municipios")}
+    FROM unnest(%(novos)s::int[]) n
+    ON CONFLICT DO NOTHING
+"""
+
+SQL_PROPRIETARIO_IMOVEL = """
+    INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id)
+    SELECT %(prefixo_matricula)s || n, p.id_proprietario
+    FROM unnest(%(novos)s::int[]) n
+    JOIN proprietario p ON p.nome_proprietario = 'Seed Proprietário ' || n
+"""
+
+SQL_PROCESSOS = f"""
+    INSERT INTO processo (protocolo, observacoes, imovel_matricula, data_entrada,
+                          setor_nome, tipologia, requerente, interesse_social, perimetro_urbano)
+    SELECT %(prefixo_protocolo)s || lpad(n::text, 8, '0'),
+           'Processo sintético ' || n,
+           %(prefixo_matricula)s || n,
+           (CURRENT_DATE - (random() * 730)::int),
+           (%(setores)s::text[])[1 + floor(random() * cardinality(%(setores)s::text[]))::int],
+           {_sorteio("tipologias")},
+           r.id_requerente,
+           random() < 0.1,
+           random() < 0.5
+    FROM unnest(%(novos)s::int[]) n
+    LEFT JOIN requerente r ON r.nome_requerente = 'Seed Requerente ' || n
+    ON CONFLICT (protocolo) DO NOTHING
+"""
+
+# ~40% livres, o resto com um técnico do próprio setor; metade dos atribuídos finalizados
+SQL_ANALISES = f"""
+    INSERT INTO analise (situacao_analise, responsavel_analise, inicio_analise, fim_analise,
+                         dias_uteis_analise, ultima_movimentacao, processo_protocolo,
+                         prioridade, complexidade)
+    SELECT CASE WHEN s.finalizada THEN 'FINALIZADA' ELSE 'NÃO FINALIZADA' END,
+           s.responsavel,
+           p.data_entrada,
+           CASE WHEN s.finalizada THEN p.data_entrada + (random() * 60)::int END,
+           CASE WHEN s.finalizada THEN (random() * 40)::int END,
+           p.data_entrada,
+           p.protocolo,
+           {_sorteio("prioridades")},
+           {_sorteio("complexidades")}
+    FROM processo p
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN random() < 0.4 THEN NULL ELSE (
+                   SELECT t.cpf_tecnico FROM tecnico t
+                   WHERE t.setor_tecnico = p.setor_nome AND t.cpf_tecnico LIKE %(prefixo_cpf)s || '%%'
+                   ORDER BY random() LIMIT 1
+               ) END AS responsavel,
+               random() < 0.5 AS finalizada
+    ) s
+    WHERE p.protocolo = ANY(%(protocolos)s)
+"""
+
+SQL_HISTORICO = """
+    INSERT INTO historico (processo_protocolo, setor_origem, setor_destino,
+                           tecnico_responsavel_anterior, tecnico_novo_responsavel,
+                           data_encaminhamento, observacoes)
+    SELECT p.protocolo,
+           (%(setores)s::text[])[1 + floor(random() * cardinality(%(setores)s::text[]))::int],
+           (%(setores)s::text[])[1 + floor(random() * cardinality(%(setores)s::text[]))::int],
+           %(prefixo_cpf)s || lpad((1 + floor(random() * %(tecnicos)s))::text, 9, '0'),
+           %(prefixo_cpf)s || lpad((1 + floor(random() * %(tecnicos)s))::text, 9, '0'),
+           p.data_entrada + make_interval(days => h),
+           'Encaminhamento sintético ' || h
+    FROM processo p
+    CROSS JOIN generate_series(1, %(historico)s) h
+    WHERE p.protocolo = ANY(%(protocolos)s)
+"""
+
+SQL_PDFS = """
+    INSERT INTO pdf_gerados (processo_protocolo, setor_nome, caminho_pdf, data_geracao)
+    SELECT p.protocolo, p.setor_nome,
+           'PDFS/' || p.protocolo || '_' || v || '.pdf',
+           p.data_entrada + make_interval(days => v * 7)
+    FROM processo p
+    CROSS JOIN generate_series(1, %(pdfs)s) v
+    WHERE p.protocolo = ANY(%(protocolos)s)
+"""
+
+# Ordem respeita as chaves estrangeiras
+SQL_LIMPAR = [
+    "DELETE FROM pdf_gerados WHERE processo_protocolo LIKE %(prefixo_protocolo)s || '%%'",
+    "DELETE FROM fila_pdf WHERE processo_protocolo LIKE %(prefixo_protocolo)s || '%%'",
+    "DELETE FROM historico WHERE processo_protocolo LIKE %(prefixo_protocolo)s || '%%'",
+    "DELETE FROM analise WHERE processo_protocolo LIKE %(prefixo_protocolo)s || '%%'",
+    "DELETE FROM processo WHERE protocolo LIKE %(prefixo_protocolo)s || '%%'",
+    "DELETE FROM proprietario_imovel WHERE imovel_matricula LIKE %(prefixo_matricula)s || '%%'",
+    "DELETE FROM imovel_municipio WHERE imovel_matricula LIKE %(prefixo_matricula)s || '%%'",
+    "DELETE FROM imovel_zona_macrozona WHERE imovel_matricula LIKE %(prefixo_matricula)s || '%%'",
+    "DELETE FROM imovel WHERE matricula_imovel LIKE %(prefixo_matricula)s || '%%'",
+    "DELETE FROM proprietario WHERE nome_proprietario LIKE 'Seed Proprietário %%'",
+    "DELETE FROM requerente WHERE nome_requerente LIKE 'Seed Requerente %%'",
+    "DELETE FROM tecnico WHERE cpf_tecnico LIKE %(prefixo_cpf)s || '%%'",
+]
+
+# (descrição, sql) executados por lote de processos
+ETAPAS_POR_LOTE = [
+    ("requerentes", SQL_REQUERENTES),
+    ("proprietários", SQL_PROPRIETARIOS),
+    ("imóveis", SQL_IMOVEIS),
+    ("imovel_municipio", SQL_IMOVEL_MUNICIPIO),
+    ("proprietario_imovel", SQL_PROPRIETARIO_IMOVEL),
+    ("processos", SQL_PROCESSOS),
+    ("análises", SQL_ANALISES),
+    ("histórico", SQL_HISTORICO),
+    ("pdf_gerados", SQL_PDFS),
+]
+
+
+def _parametros_base(args):
+    return {
+        "prefixo_protocolo": PREFIXO_PROTOCOLO,
+        "prefixo_matricula": PREFIXO_MATRICULA,
+        "prefixo_cpf": PREFIXO_CPF,
+        "setores": SETORES,
+        "total": args.tecnicos_por_setor * len(SETORES),
+        "tecnicos": args.tecnicos_por_setor * len(SETORES),
+        "historico": args.historico_por_processo,
+        "pdfs": args.pdfs_por_processo,
+    }
+
+
+def _carregar_listas(cur):
+    listas = {}
+    for nome, (tabela, coluna) in LISTAS.items():
+        cur.execute(f"SELECT {coluna} FROM {tabela} WHERE {coluna} IS NOT NULL")
+        listas[nome] = [row[0] for row in cur.fetchall()]
+    return listas
+
+
+def limpar():
+    params = {
+        "prefixo_protocolo": PREFIXO_PROTOCOLO,
+        "prefixo_matricula": PREFIXO_MATRICULA,
+        "prefixo_cpf": PREFIXO_CPF,
+    }
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for sql in SQL_LIMPAR:
+                cur.execute(sql, params)
+                print(f"{cur.rowcount:>10}  {sql.split(' WHERE ')[0]}")
+
+
+def semear(args):
+    params = _parametros_base(args)
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for setor in SETORES:
+                cur.execute("INSERT INTO setor (nome_setor) VALUES (%s) ON CONFLICT DO NOTHING", (setor,))
+            cur.execute(SQL_TECNICOS, params)
+            params.update(_carregar_listas(cur))
+
+    vazias = [nome for nome in LISTAS if not params[nome]]
+    if vazias:
+        print(f"Aviso: listas vazias no banco ({', '.join(vazias)}); as colunas ficarão NULL")
+
+    inicio_total = time.perf_counter()
+    for inicio in range(1, args.processos + 1, args.lote):
+        fim = min(inicio + args.lote - 1, args.processos)
+        lote = dict(params, inicio=inicio, fim=fim)
+        tempos = []
+        # Um commit por lote: uma falha no meio não perde o que já foi gravado
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_NOVOS, lote)
+                lote["novos"] = [row[0] for row in cur.fetchall()]
+                if not lote["novos"]:
+                    print(f"processos {inicio}-{fim}: já semeados")
+                    continue
+                lote["protocolos"] = [f"{PREFIXO_PROTOCOLO}{n:08d}" for n in lote["novos"]]
+                for nome, sql in ETAPAS_POR_LOTE:
+                    t0 = time.perf_counter()
+                    cur.execute(sql, lote)
+                    tempos.append(f"{nome}={time.perf_counter() - t0:.1f}s")
+        print(f"processos {inicio}-{fim}: " + " ".join(tempos))
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for tabela in ("processo", "analise", "historico", "pdf_gerados", "imovel"):
+                cur.execute(f"ANALYZE {tabela}")
+
+    print(f"Concluído em {time.perf_counter() - inicio_total:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos (prefixo SEED) para testes de carga")
+    parser.add_argument("--processos", type=int, default=100_000)
+    parser.add_argument("--historico-por-processo", type=int, default=10)
+    parser.add_argument("--pdfs-por-processo", type=int, default=2)
+    parser.add_argument("--tecnicos-por-setor", type=int, default=10)
+    parser.add_argument("--lote", type=int, default=10_000, help="processos por transação")
+    parser.add_argument("--limpar", action="store_true", help="remove os dados sintéticos e sai")
+    args = parser.parse_args()
+
+    if args.limpar:
+        limpar()
+    else:
+        semear(args)
+
+
+if __name__ == "__main__":
+    main()
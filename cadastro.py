@@ -0,0 +1,270 @@
+# cadastro.py
+# Cadastro de um processo novo (formulário de /inserir) numa única instrução
+#
+# preparar_cadastro() faz em Python o que não depende do banco (validação,
+# matrícula gerada, números com vírgula, dias úteis, prazo); SQL_CADASTRAR
+# resolve as zonas e grava requerente, proprietário, imóvel, vínculos,
+# pasta, processo, análise e histórico num só round trip, com CTEs que
+# modificam dados. As chaves estrangeiras entre essas tabelas são conferidas
+# no fim da instrução, então a ordem dos CTEs não importa para elas.
+import random
+from datetime import datetime
+
+from calendario import contar_dias_uteis
+from prazos import calcular_prazo
+
+
+class CadastroInvalido(ValueError):
+    """Dados do formulário que impedem o cadastro (mensagem vai para o usuário)."""
+
+
+SQL_CADASTRAR = """
+    WITH
+    zona_apa_id AS (
+        SELECT id_zona_apa FROM zona_apa
+        WHERE apa = %(apa)s AND nome_zona_apa = %(zona_apa)s
+        LIMIT 1
+    ),
+    zona_utp_id AS (
+        SELECT id_zona_utp FROM zona_utp
+        WHERE utp = %(utp)s AND nome_zona_utp = %(zona_utp)s
+        LIMIT 1
+    ),
+    zona_urbana_id AS (
+        SELECT id_zona_urbana FROM zona_urbana WHERE sigla_zona_urbana = %(zona_urbana)s LIMIT 1
+    ),
+    macrozona_id AS (
+        SELECT id_macrozona FROM macrozona_municipal WHERE sigla_macrozona = %(macrozona_municipal)s LIMIT 1
+    ),
+    novo_requerente AS (
+        INSERT INTO requerente (cpf_cnpj_requerente, nome_requerente, tipo_requerente)
+        SELECT %(cpf_cnpj_requerente)s, %(nome_requerente)s, %(tipo_requerente)s
+        WHERE %(nome_requerente)s IS NOT NULL
+        RETURNING id_requerente
+    ),
+    novo_proprietario AS (
+        INSERT INTO proprietario (cpf_cnpj_proprietario, nome_proprietario)
+        SELECT %(cpf_cnpj_proprietario)s, %(nome_proprietario)s
+        WHERE %(nome_proprietario)s IS NOT NULL
+        RETURNING id_proprietario
+    ),
+    novo_imovel AS (
+        INSERT INTO imovel (matricula_imovel, zona_apa, zona_utp, classificacao_viaria, curva_inundacao,
+                            manancial, area, localidade_imovel, latitude, longitude, faixa_servidao)
+        VALUES (%(matricula_imovel)s, (SELECT id_zona_apa FROM zona_apa_id), (SELECT id_zona_utp FROM zona_utp_id),
+                %(sistema_viario)s, %(curva_inundacao)s, %(manancial)s, %(area)s, %(localidade_imovel)s,
+                %(latitude)s, %(longitude)s, %(faixa_servidao)s)
+        ON CONFLICT (matricula_imovel) DO NOTHING
+    ),
+    novo_imovel_municipio AS (
+        INSERT INTO imovel_municipio (imovel_matricula, municipio_nome)
+        SELECT %(matricula_imovel)s, %(municipio)s
+        WHERE %(municipio)s IS NOT NULL
+        ON CONFLICT DO NOTHING
+    ),
+    novo_proprietario_imovel AS (
+        INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id)
+        SELECT %(matricula_imovel)s, id_proprietario FROM novo_proprietario
+    ),
+    nova_zona_macrozona AS (
+        INSERT INTO imovel_zona_macrozona (imovel_matricula, zona_urbana_id, macrozona_id)
+        SELECT %(matricula_imovel)s, (SELECT id_zona_urbana FROM zona_urbana_id), (SELECT id_macrozona FROM macrozona_id)
+        WHERE EXISTS (SELECT 1 FROM zona_urbana_id) OR EXISTS (SELECT 1 FROM macrozona_id)
+        ON CONFLICT (imovel_matricula)
+        DO UPDATE SET
+            zona_urbana_id = EXCLUDED.zona_urbana_id,
+            macrozona_id = EXCLUDED.macrozona_id
+    ),
+    nova_pasta AS (
+        INSERT INTO pasta (numero_pasta)
+        SELECT %(numero_pasta)s
+        WHERE %(numero_pasta)s IS NOT NULL
+        ON CONFLICT (numero_pasta) DO NOTHING
+    ),
+    novo_processo AS (
+        INSERT INTO processo (
+            protocolo, observacoes, imovel_matricula, pasta_numero, solicitacao_requerente,
+            resposta_departamento, tramitacao, setor_nome, tipologia, situacao_localizacao,
+            responsavel_localizacao, inicio_localizacao, fim_localizacao,
+            dias_uteis_localizacao, requerente,
+            nome_ou_loteamento_do_condominio_a_ser_aprovado, interesse_social,
+            data_entrada, perimetro_urbano, data_previsao_resposta
+        ) VALUES (
+            %(protocolo)s, %(observacoes)s, %(matricula_imovel)s, %(numero_pasta)s, %(solicitacao_requerente)s,
+            %(resposta_departamento)s, %(tramitacao)s, %(setor_processo)s, %(tipologia)s, %(situacao_localizacao)s,
+            %(responsavel_localizacao)s, %(inicio_localizacao)s, %(fim_localizacao)s,
+            %(dias_uteis_localizacao)s, (SELECT id_requerente FROM novo_requerente),
+            %(nome_ou_loteamento_do_condominio_a_ser_aprovado)s, %(interesse_social)s,
+            %(data_entrada)s, %(perimetro_urbano)s, %(data_previsao_resposta)s
+        )
+        RETURNING protocolo
+    ),
+    nova_analise AS (
+        INSERT INTO analise (situacao_analise, responsavel_analise, inicio_analise, fim_analise,
+                             dias_uteis_analise, ultima_movimentacao, processo_protocolo,
+                             prioridade, complexidade)
+        VALUES (%(situacao_analise)s, %(responsavel_analise)s, %(inicio_analise)s, %(fim_analise)s,
+                %(dias_uteis_analise)s, %(data_entrada)s, %(protocolo)s,
+                %(prioridade)s, %(complexidade)s)
+    ),
+    novo_historico AS (
+        INSERT INTO historico (
+            processo_protocolo, setor_origem, setor_destino,
+            tecnico_responsavel_anterior, tecnico_novo_responsavel,
+            data_encaminhamento
+        )
+        SELECT %(protocolo)s, %(setor_origem)s, %(setor_destino)s, %(responsavel_analise)s, NULL, CURRENT_TIMESTAMP
+        WHERE %(setor_destino)s IS NOT NULL
+    )
+    SELECT (SELECT protocolo FROM novo_processo),
+           (SELECT id_requerente FROM novo_requerente),
+           (SELECT id_proprietario FROM novo_proprietario),
+           (SELECT id_zona_apa FROM zona_apa_id),
+           (SELECT id_zona_utp FROM zona_utp_id),
+           (SELECT id_zona_urbana FROM zona_urbana_id),
+           (SELECT id_macrozona FROM macrozona_id)
+"""
+
+COLUNAS_RESULTADO = ["protocolo", "id_requerente", "id_proprietario", "id_zona_apa",
+                     "id_zona_utp", "id_zona_urbana", "id_macrozona"]
+
+
+def _texto(formulario, campo):
+    valor = formulario.get(campo)
+    return valor if valor else None
+
+
+def _numero(formulario, campo):
+    # Área e coordenadas podem vir com vírgula decimal
+    valor = formulario.get(campo)
+    return valor.replace(",", ".") if valor else None
+
+
+def gerar_matricula():
+    """Matrícula provisória (NOMAT-AAAAMMDD-NNNN) para imóvel sem matrícula."""
+    return f"NOMAT-{datetime.now():%Y%m%d}-{random.randint(1000, 9999)}"[:20]
+
+
+def _montar_cadastro(formulario, setor, cpf_tecnico, setores_validos, agora):
+    # Tudo menos dias úteis e prazo (ver _preencher_datas)
+    if not formulario.get("protocolo"):
+        raise CadastroInvalido("Protocolo não informado")
+
+    setor_destino = None
+    if formulario.get("encaminhar"):
+        setor_destino = formulario.get("setor_destino")
+        if not setor_destino:
+            raise CadastroInvalido("Setor destino não informado")
+        if setor_destino not in setores_validos:
+            raise CadastroInvalido("Setor inválido para redirecionamento")
+
+    finalizar = bool(formulario.get("finalizar"))
+
+    # Requerente só vai para o processo quando nomeado (igual ao formulário)
+    cpf_cnpj_requerente = formulario.get("cpf_requerente") or formulario.get("cnpj_requerente") or None
+    matricula = (formulario.get("matricula_imovel") or "").strip() or gerar_matricula()
+
+    return {
+        "protocolo": formulario["protocolo"],
+        "observacoes": formulario.get("observacoes"),
+        "numero_pasta": _texto(formulario, "numero_pasta"),
+        "solicitacao_requerente": _texto(formulario, "solicitacao_requerente"),
+        "resposta_departamento": _texto(formulario, "resposta_departamento"),
+        "tramitacao": _texto(formulario, "tramitacao"),
+        "tipologia": _texto(formulario, "tipologia"),
+        "situacao_localizacao": _texto(formulario, "situacao_localizacao"),
+        "responsavel_localizacao": _texto(formulario, "responsavel_localizacao_cpf"),
+        "inicio_localizacao": _texto(formulario, "inicio_localizacao"),
+        "fim_localizacao": _texto(formulario, "fim_localizacao"),
+        "dias_uteis_localizacao": None,
+        "nome_ou_loteamento_do_condominio_a_ser_aprovado":
+            formulario.get("nome_ou_loteamento_do_condominio_a_ser_aprovado"),
+        "interesse_social": formulario.get("interesse_social") == "on",
+        "perimetro_urbano": formulario.get("perimetro_urbano") == "on",
+        "data_entrada": agora.date(),
+        "data_previsao_resposta": None,
+
+        "nome_requerente": _texto(formulario, "nome_requerente"),
+        "cpf_cnpj_requerente": cpf_cnpj_requerente,
+        "tipo_requerente": _texto(formulario, "tipo_de_requerente"),
+        "nome_proprietario": _texto(formulario, "nome_proprietario"),
+        "cpf_cnpj_proprietario": _texto(formulario, "cpf_cnpj_proprietario"),
+
+        "matricula_imovel": matricula,
+        "municipio": _texto(formulario, "municipio"),
+        "apa": _texto(formulario, "apa"),
+        "zona_apa": _texto(formulario, "zona_apa"),
+        "utp": _texto(formulario, "utp"),
+        "zona_utp": _texto(formulario, "zona_utp"),
+        "zona_urbana": _texto(formulario, "zona_urbana"),
+        "macrozona_municipal": _texto(formulario, "macrozona_municipal"),
+        "sistema_viario": _texto(formulario, "sistema_viario"),
+        "curva_inundacao": _texto(formulario, "curva_inundacao"),
+        "manancial": _texto(formulario, "manancial"),
+        "faixa_servidao": _texto(formulario, "faixa_servidao"),
+        "localidade_imovel": _texto(formulario, "localidade_imovel"),
+        "area": _numero(formulario, "area"),
+        "latitude": _numero(formulario, "latitude"),
+        "longitude": _numero(formulario, "longitude"),
+
+        "situacao_analise": "FINALIZADA" if finalizar else "NÃO FINALIZADA",
+        "responsavel_analise": cpf_tecnico or None,
+        "inicio_analise": agora,
+        "fim_analise": agora if finalizar else None,
+        "dias_uteis_analise": None,
+        "prioridade": _texto(formulario, "prioridade"),
+        "complexidade": _texto(formulario, "complexidade"),
+
+        # Encaminhado no cadastro: já nasce no setor de destino
+        "setor_origem": setor or None,
+        "setor_destino": setor_destino,
+        "setor_processo": setor_destino or setor or None,
+    }
+
+
+def _preencher_datas(cadastros, agora):
+    """Dias úteis (uma chamada de busday_count para todos) e prazo de resposta."""
+    n = len(cadastros)
+    contagens = contar_dias_uteis(
+        [d["inicio_localizacao"] for d in cadastros] + [d["inicio_analise"] for d in cadastros],
+        [d["fim_localizacao"] for d in cadastros] + [d["fim_analise"] for d in cadastros],
+    )
+    # Todos entram hoje: o prazo é o mesmo
+    prazo = calcular_prazo(agora.date()) if cadastros else None
+    for dados, dias_loc, dias_an in zip(cadastros, contagens[:n], contagens[n:]):
+        dados["dias_uteis_localizacao"] = dias_loc
+        dados["dias_uteis_analise"] = dias_an
+        dados["data_previsao_resposta"] = prazo
+
+
+def preparar_cadastro(formulario, setor, cpf_tecnico, setores_validos, agora=None):
+    """
+    Parâmetros de SQL_CADASTRAR a partir do formulário de /inserir.
+    Levanta CadastroInvalido se o cadastro não pode ser feito.
+    """
+    agora = agora or datetime.now()
+    dados = _montar_cadastro(formulario, setor, cpf_tecnico, setores_validos, agora)
+    _preencher_datas([dados], agora)
+    return dados
+
+
+def preparar_cadastros(formularios, setor, cpf_tecnico, setores_validos, agora=None):
+    """
+    preparar_cadastro() para vários formulários de uma vez (importação).
+    Retorna ([(índice, dados)] dos válidos, [(índice, mensagem)] dos recusados).
+    """
+    agora = agora or datetime.now()
+    validos, erros = [], []
+    for indice, formulario in enumerate(formularios):
+        try:
+            validos.append((indice, _montar_cadastro(formulario, setor, cpf_tecnico, setores_validos, agora)))
+        except CadastroInvalido as e:
+            erros.append((indice, str(e)))
+    _preencher_datas([dados for _, dados in validos], agora)
+    return validos, erros
+
+
+def cadastrar(cur, dados):
+    """Executa SQL_CADASTRAR; devolve {protocolo, id_requerente, ..., id_macrozona}."""
+    cur.execute(SQL_CADASTRAR, dados)
+    return dict(zip(COLUNAS_RESULTADO, cur.fetchone()))
@@ -0,0 +1,207 @@
+# calendario.py
+# Calendário de dias úteis com feriados (numpy.busdaycalendar) usado nos
+# cálculos de prazo e de dias úteis de localização/análise
+#
+# O calendário é montado uma vez e fica em memória; é remontado sozinho
+# quando a configuração ou o arquivo de feriados muda. Variáveis de ambiente:
+#   FERIADOS_CONJUNTOS   conjuntos embutidos, separados por vírgula
+#                        (padrão "nacional,PR"; "facultativos" acrescenta
+#                        Carnaval e Corpus Christi, pontos facultativos)
+#   FERIADOS_ARQUIVO     feriados extras (municipais, pontos facultativos):
+#                        uma data por linha, AAAA-MM-DD ou MM-DD (todo ano),
+#                        texto após # é comentário
+#   FERIADOS_ANO_INICIAL primeiro ano gerado (padrão 2000)
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Segunda a sexta
+SEMANA_UTIL = "1111100"
+
+FERIADOS_FIXOS = {
+    "nacional": [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25)],
+    "PR": [(12, 19)],  # Emancipação política do Paraná
+}
+
+ANOS_A_FRENTE = 10
+
+
+def _pascoa(ano):
+    # Algoritmo de Meeus/Jones/Butcher (calendário gregoriano)
+    a, b, c = ano % 19, ano // 100, ano % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(ano, mes, dia)
+
+
+def feriados_do_ano(ano, conjuntos):
+    """Feriados embutidos de `ano` para os conjuntos pedidos."""
+    datas = set()
+    for conjunto in conjuntos:
+        datas.update(date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS.get(conjunto, []))
+
+    pascoa = _pascoa(ano)
+    if "nacional" in conjuntos:
+        datas.add(pascoa - timedelta(days=2))  # Sexta-feira Santa
+        if ano >= 2024:
+            datas.add(date(ano, 11, 20))  # Consciência Negra (Lei 14.759/2023)
+    if "facultativos" in conjuntos:
+        datas.add(pascoa - timedelta(days=48))  # Carnaval (segunda)
+        datas.add(pascoa - timedelta(days=47))  # Carnaval (terça)
+        datas.add(pascoa + timedelta(days=60))  # Corpus Christi
+    return datas
+
+
+def ler_arquivo_feriados(caminho, anos):
+    """Datas do arquivo de feriados; linhas MM-DD valem para todos os `anos`."""
+    datas = set()
+    with open(caminho, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            linha = linha.split("#", 1)[0].strip()
+            if not linha:
+                continue
+            try:
+                if len(linha) == 5:
+                    mes, dia = (int(parte) for parte in linha.split("-"))
+                    datas.update(date(ano, mes, dia) for ano in anos)
+                else:
+                    datas.add(date.fromisoformat(linha))
+            except ValueError:
+                logger.warning("%s:%s: data de feriado inválida: %r", caminho, numero, linha)
+    return datas
+
+
+class Calendario:
+    """Feriados já expandidos e o busdaycalendar correspondente."""
+
+    def __init__(self, feriados):
+        self.feriados = frozenset(feriados)
+        self.busdaycal = np.busdaycalendar(
+            weekmask=SEMANA_UTIL,
+            holidays=np.array(sorted(self.feriados), dtype="datetime64[D]"),
+        )
+
+
+def _config():
+    conjuntos = os.getenv("FERIADOS_CONJUNTOS", "nacional,PR")
+    arquivo = os.getenv("FERIADOS_ARQUIVO") or None
+    try:
+        modificado = os.path.getmtime(arquivo) if arquivo else None
+    except OSError:
+        modificado = None
+    return (
+        tuple(c.strip() for c in conjuntos.split(",") if c.strip()),
+        arquivo,
+        modificado,
+        int(os.getenv("FERIADOS_ANO_INICIAL", "2000")),
+    )
+
+
+def montar_calendario(conjuntos, arquivo=None, ano_inicial=2000):
+    anos = range(ano_inicial, date.today().year + ANOS_A_FRENTE + 1)
+    feriados = set()
+    for ano in anos:
+        feriados |= feriados_do_ano(ano, conjuntos)
+    if arquivo:
+        try:
+            feriados |= ler_arquivo_feriados(arquivo, anos)
+        except OSError as e:
+            logger.warning("Arquivo de feriados %s ignorado: %s", arquivo, e)
+    return Calendario(feriados)
+
+
+_calendario = None
+_assinatura = None
+_lock = threading.Lock()
+
+
+def obter_calendario():
+    """Calendário atual; remontado se a configuração ou o arquivo mudaram."""
+    global _calendario, _assinatura
+    config = _config()
+    if _calendario is None or config != _assinatura:
+        with _lock:
+            if _calendario is None or config != _assinatura:
+                conjuntos, arquivo, _, ano_inicial = config
+                _calendario = montar_calendario(conjuntos, arquivo, ano_inicial)
+                _assinatura = config
+                logger.info("Calendário de dias úteis carregado: %s feriados (%s)",
+                            len(_calendario.feriados), ", ".join(conjuntos))
+    return _calendario
+
+
+def recarregar_calendario():
+    """Força a remontagem na próxima chamada (ex.: feriado novo no mesmo arquivo)."""
+    global _calendario
+    with _lock:
+        _calendario = None
+
+
+def _como_data(valor):
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        # "AAAA-MM-DD" vindo do formulário ou str() de um datetime do banco
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        logger.warning("Data inválida para dias úteis: %r", valor)
+        return None
+
+
+def _vetor_datas(valores):
+    """datetime64[D] com NaT onde a data falta ou é inválida."""
+    return np.array([_como_data(v) or np.datetime64("NaT") for v in valores], dtype="datetime64[D]")
+
+
+def contar_dias_uteis(inicios, fins, calendario=None):
+    """
+    Dias úteis entre cada par (início incluso, fim excluído), numa única
+    chamada de busday_count. Pares com alguma data faltando dão None.
+    """
+    calendario = calendario or obter_calendario()
+    inicios, fins = _vetor_datas(inicios), _vetor_datas(fins)
+    validos = ~(np.isnat(inicios) | np.isnat(fins))
+    contagens = np.zeros(len(inicios), dtype=np.int64)
+    contagens[validos] = np.busday_count(inicios[validos], fins[validos], busdaycal=calendario.busdaycal)
+    return [int(n) if ok else None for n, ok in zip(contagens, validos)]
+
+
+def dias_uteis(inicio, fim):
+    """Dias úteis entre duas datas (date, datetime ou 'AAAA-MM-DD'); None se faltar alguma."""
+    return contar_dias_uteis([inicio], [fim])[0]
+
+
+def somar_dias_uteis(datas, dias, calendario=None):
+    """
+    Cada data somada de `dias` dias úteis (escalar ou um valor por data).
+    Datas que caem em fim de semana/feriado contam a partir do próximo dia útil.
+    """
+    calendario = calendario or obter_calendario()
+    datas = _vetor_datas(datas)
+    dias = np.broadcast_to(np.asarray(dias, dtype=np.int64), datas.shape)
+    validos = ~np.isnat(datas)
+    resultado = np.full(datas.shape, np.datetime64("NaT"), dtype="datetime64[D]")
+    resultado[validos] = np.busday_offset(datas[validos], dias[validos], roll="forward",
+                                          busdaycal=calendario.busdaycal)
+    return [d.item() if ok else None for d, ok in zip(resultado, validos)]
+
+
+def prazo_em_dias_uteis(data, dias):
+    """Versão escalar de somar_dias_uteis."""
+    return somar_dias_uteis([data], dias)[0]
@@ -0,0 +1,109 @@
+# captura.py
+# Captura de processos pelos técnicos sem corrida entre cliques simultâneos
+LIMITE_CAPTURA_LOTE = 50
+
+# A condição "responsavel_analise IS NULL" fica no próprio UPDATE: se dois
+# técnicos captarem ao mesmo tempo, o segundo espera o lock da linha, reavalia
+# a condição e não atualiza nada.
+SQL_CAPTAR = """
+    UPDATE analise a
+    SET responsavel_analise = %s
+    FROM processo p
+    WHERE a.processo_protocolo = %s
+      AND p.protocolo = a.processo_protocolo
+      AND p.setor_nome = %s
+      AND a.responsavel_analise IS NULL
+    RETURNING a.processo_protocolo
+"""
+
+# Lotes usam SKIP LOCKED: linhas que outro técnico está captando neste
+# instante são puladas em vez de enfileirar todos atrás do mesmo lock.
+SQL_CAPTAR_LISTA = """
+    WITH alvo AS (
+        SELECT a.processo_protocolo
+        FROM analise a
+        JOIN processo p ON p.protocolo = a.processo_protocolo
+        WHERE a.processo_protocolo = ANY(%s)
+          AND p.setor_nome = %s
+          AND a.responsavel_analise IS NULL
+        FOR UPDATE OF a SKIP LOCKED
+    )
+    UPDATE analise a
+    SET responsavel_analise = %s
+    FROM alvo
+    WHERE a.processo_protocolo = alvo.processo_protocolo
+    RETURNING a.processo_protocolo
+"""
+
+SQL_CAPTAR_PROXIMOS = """
+    WITH alvo AS (
+        SELECT a.processo_protocolo
+        FROM analise a
+        JOIN processo p ON p.protocolo = a.processo_protocolo
+        WHERE p.setor_nome = %s
+          AND a.responsavel_analise IS NULL
+        ORDER BY p.protocolo DESC
+        LIMIT %s
+        FOR UPDATE OF a SKIP LOCKED
+    )
+    UPDATE analise a
+    SET responsavel_analise = %s
+    FROM alvo
+    WHERE a.processo_protocolo = alvo.processo_protocolo
+    RETURNING a.processo_protocolo
+"""
+
+# Último registro do histórico de cada protocolo recebe o novo responsável
+SQL_ATUALIZAR_HISTORICO = """
+    UPDATE historico h
+    SET tecnico_novo_responsavel = %s
+    FROM (
+        SELECT DISTINCT ON (processo_protocolo) id_historico
+        FROM historico
+        WHERE processo_protocolo = ANY(%s)
+        ORDER BY processo_protocolo, data_encaminhamento DESC
+    ) ultimo
+    WHERE h.id_historico = ultimo.id_historico
+"""
+
+
+def _registrar_historico(cur, cpf_tecnico, captados):
+    if captados:
+        cur.execute(SQL_ATUALIZAR_HISTORICO, (cpf_tecnico, captados))
+
+
+def captar_processo(cur, protocolo, cpf_tecnico, setor):
+    """Capta um processo do setor se ainda estiver livre. Retorna True se captou."""
+    cur.execute(SQL_CAPTAR, (cpf_tecnico, protocolo, setor))
+    captados = [row[0] for row in cur.fetchall()]
+    _registrar_historico(cur, cpf_tecnico, captados)
+    return bool(captados)
+
+
+def captar_processos(cur, protocolos, cpf_tecnico, setor):
+    """
+    Capta uma lista de protocolos de uma vez.
+    Retorna (captados, falhas): falhas são os já captados por outro técnico,
+    fora do setor, inexistentes, sendo captados neste instante ou além de
+    LIMITE_CAPTURA_LOTE.
+    """
+    protocolos = list(dict.fromkeys(protocolos))
+    excedentes = protocolos[LIMITE_CAPTURA_LOTE:]
+    protocolos = protocolos[:LIMITE_CAPTURA_LOTE]
+    if not protocolos:
+        return [], []
+    cur.execute(SQL_CAPTAR_LISTA, (protocolos, setor, cpf_tecnico))
+    captados = [row[0] for row in cur.fetchall()]
+    _registrar_historico(cur, cpf_tecnico, captados)
+    conjunto_captados = {str(p) for p in captados}
+    falhas = [p for p in protocolos if str(p) not in conjunto_captados] + excedentes
+    return captados, falhas
+
+
+def captar_proximos(cur, cpf_tecnico, setor, quantidade):
+    """Capta até `quantidade` processos livres do setor (mais recentes primeiro)."""
+    quantidade = max(1, min(int(quantidade), LIMITE_CAPTURA_LOTE))
+    cur.execute(SQL_CAPTAR_PROXIMOS, (setor, quantidade, cpf_tecnico))
+    captados = [row[0] for row in cur.fetchall()]
+    _registrar_historico(cur, cpf_tecnico, captados)
+    return captados
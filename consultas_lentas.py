@@ -0,0 +1,127 @@
+# consultas_lentas.py
+# Registro opcional de consultas lentas com o plano (EXPLAIN ANALYZE, BUFFERS)
+#
+# Desligado por padrão. Variáveis de ambiente:
+#   CONSULTAS_LENTAS_MS       limite em ms a partir do qual a consulta é registrada
+#   CONSULTAS_LENTAS_MAX      quantas ficam em memória (padrão 100)
+#   CONSULTAS_LENTAS_ARQUIVO  arquivo JSONL onde cada registro também é gravado
+#   CONSULTAS_LENTAS_EXPLAIN  0 desliga o EXPLAIN (só registra SQL e tempo)
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+import psycopg2.extensions
+
+from registro import campo_sensivel, redigir
+
+logger = logging.getLogger(__name__)
+
+# Só consultas de leitura são repetidas com EXPLAIN ANALYZE (que executa a consulta)
+_RE_SOMENTE_LEITURA = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_RE_ESCRITA = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+UPDATE|FOR\s+SHARE|nextval|setval|pg_notify)\b",
+                         re.IGNORECASE)
+
+# Parâmetro que é só um CPF/CNPJ, com ou sem pontuação (CPF de técnico fica
+# sem pontuação no banco); no plano, o mesmo valor aparece como literal
+_RE_DOCUMENTO = re.compile(r"\d{11}|\d{14}|\d{3}\.\d{3}\.\d{3}-\d{2}|\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}")
+_RE_LITERAL_DOCUMENTO = re.compile(r"'(\d{11}|\d{14})'")
+
+
+def _config():
+    limite = os.getenv("CONSULTAS_LENTAS_MS")
+    return {
+        "limite": float(limite) / 1000 if limite else None,
+        "maximo": int(os.getenv("CONSULTAS_LENTAS_MAX", "100")),
+        "arquivo": os.getenv("CONSULTAS_LENTAS_ARQUIVO") or None,
+        "explain": os.getenv("CONSULTAS_LENTAS_EXPLAIN", "1") != "0",
+    }
+
+
+_cfg = _config()
+_registros = deque(maxlen=_cfg["maximo"])
+_lock = threading.Lock()
+
+# Limite em segundos (None = desligado); lido pelo cursor a cada execute
+LIMITE = _cfg["limite"]
+
+
+def pode_explicar(sql):
+    return bool(_RE_SOMENTE_LEITURA.match(sql)) and not _RE_ESCRITA.search(sql)
+
+
+def _redigir_valor(valor):
+    if isinstance(valor, str) and _RE_DOCUMENTO.fullmatch(valor.strip()):
+        return "[REDIGIDO]"
+    if isinstance(valor, (list, tuple)):
+        return [_redigir_valor(v) for v in valor]
+    return redigir(repr(valor))
+
+
+def _redigir_parametros(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: "[REDIGIDO]" if campo_sensivel(str(k)) and v else _redigir_valor(v)
+                for k, v in params.items()}
+    return [_redigir_valor(v) for v in params]
+
+
+def _redigir_plano(plano):
+    return redigir(_RE_LITERAL_DOCUMENTO.sub("'[REDIGIDO]'", plano))
+
+
+def _explicar(conn, sql, params):
+    # Cursor comum (sem medição) para não entrar de novo aqui
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        if conn.autocommit:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+            return "\n".join(row[0] for row in cur.fetchall())
+        cur.execute("SAVEPOINT consulta_lenta")
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+            return "\n".join(row[0] for row in cur.fetchall())
+        finally:
+            cur.execute("ROLLBACK TO SAVEPOINT consulta_lenta")
+
+
+def registrar(conn, sql, params, duracao):
+    """Chamado pelo cursor quando a consulta passou de LIMITE."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    else:
+        sql = str(sql)
+
+    plano = None
+    if _cfg["explain"] and pode_explicar(sql):
+        try:
+            plano = _redigir_plano(_explicar(conn, sql, params))
+        except Exception as e:
+            plano = f"EXPLAIN falhou: {e}"
+
+    registro = {
+        "em": datetime.now().isoformat(timespec="seconds"),
+        "duracao_ms": round(duracao * 1000, 1),
+        "sql": sql.strip(),
+        "parametros": _redigir_parametros(params),
+        "plano": plano,
+    }
+    with _lock:
+        _registros.append(registro)
+        if _cfg["arquivo"]:
+            try:
+                with open(_cfg["arquivo"], "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                logger.warning("Não foi possível gravar %s: %s", _cfg["arquivo"], e)
+
+    logger.warning("Consulta lenta (%.1f ms): %s", registro["duracao_ms"], " ".join(registro["sql"].split())[:200])
+
+
+def listar():
+    """Consultas lentas mais recentes primeiro."""
+    with _lock:
+        return list(reversed(_registros))
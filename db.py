@@ -1,8 +1,331 @@
-from flask import current_app
+import logging
+import os
+import threading
+import time
+from collections import deque
+
 import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
 
-def get_db_connection():
-    db_url = current_app.config.get('DATABASE_URL')
-    if not db_url:
+from metricas import CursorMedido
+from preparadas import ConexaoPreparada
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera configurado."""
+
+
+def _config_int(app, chave, padrao):
+    valor = app.config.get(chave) if app is not None else None
+    if valor is None:
+        valor = os.getenv(chave)
+    return int(valor) if valor not in (None, "") else padrao
+
+
+def _parametros_conexao(app=None):
+    """Monta os parâmetros de conexão: DATABASE_URL tem prioridade sobre DB_HOST/DB_NAME/..."""
+    db_url = (app.config.get("DATABASE_URL") if app is not None else None) or os.getenv("DATABASE_URL")
+    if db_url:
+        return {"dsn": db_url}
+    if not os.getenv("DB_HOST") and not os.getenv("DB_NAME"):
         raise RuntimeError("DATABASE_URL não está configurado")
-    return psycopg2.connect(db_url)
+    return {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+    }
+
+
+class PoolConexoes:
+    """
+    Pool de conexões PostgreSQL compartilhado por toda a aplicação.
+
+    - minimo/maximo: conexões abertas na inicialização / limite total
+    - vida_maxima: segundos até uma conexão ser descartada e reaberta
+    - timeout: segundos esperando uma conexão livre antes de PoolEsgotado
+    - verificar_apos: conexões ociosas há mais tempo que isso recebem um
+      SELECT 1 antes de serem entregues (health check no checkout)
+
+    Sem configuração de banco (parametros None) o pool é criado vazio e o
+    erro só aparece em obter(), como acontece com o banco fora do ar.
+    """
+
+    def __init__(self, parametros, minimo=1, maximo=10, vida_maxima=1800,
+                 timeout=10, verificar_apos=30):
+        if maximo < 1 or minimo > maximo:
+            raise ValueError("Configuração inválida do pool: minimo/maximo")
+        self._parametros = parametros
+        self.minimo = minimo
+        self.maximo = maximo
+        self.vida_maxima = vida_maxima
+        self.timeout = timeout
+        self.verificar_apos = verificar_apos
+
+        self._cond = threading.Condition()
+        self._livres = deque()      # (conn, criada_em, devolvida_em)
+        self._em_uso = {}           # id(conn) -> criada_em
+        self._abrindo = 0
+        self._fechado = False
+
+        self._stats = {
+            "checkouts": 0,
+            "criadas": 0,
+            "descartadas": 0,
+            "falhas_health_check": 0,
+            "esperas": 0,
+            "timeouts": 0,
+            "tempo_espera_total": 0.0,
+        }
+
+        if parametros is None:
+            logger.warning("Pool iniciado sem conexões: DATABASE_URL não está configurado")
+            return
+        try:
+            for _ in range(minimo):
+                conn = self._abrir()
+                self._stats["criadas"] += 1
+                self._livres.append((conn, time.monotonic(), time.monotonic()))
+        except psycopg2.OperationalError as e:
+            # Banco indisponível na subida: as conexões serão abertas sob demanda
+            logger.warning("Pool iniciado sem conexões abertas: %s", e)
+
+    def _abrir(self):
+        # CursorMedido soma tempo/quantidade de SQL na requisição (metricas.py);
+        # ConexaoPreparada guarda os PREPARE já feitos na sessão (preparadas.py)
+        if self._parametros is None:
+            raise RuntimeError("DATABASE_URL não está configurado")
+        return psycopg2.connect(connection_factory=ConexaoPreparada, cursor_factory=CursorMedido,
+                                **self._parametros)
+
+    def _descartar(self, conn):
+        self._stats["descartadas"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _total(self):
+        return len(self._livres) + len(self._em_uso) + self._abrindo
+
+    def _saudavel(self, conn, criada_em, devolvida_em):
+        agora = time.monotonic()
+        if conn.closed:
+            return False
+        if self.vida_maxima and agora - criada_em > self.vida_maxima:
+            return False
+        if self.verificar_apos is not None and agora - devolvida_em >= self.verificar_apos:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                with self._cond:
+                    self._stats["falhas_health_check"] += 1
+                return False
+        return True
+
+    def _reservar(self, limite):
+        """
+        Reserva uma conexão livre (ou uma vaga para abrir uma nova) sob o lock.
+        Retorna (conn, criada_em, devolvida_em) ou None quando há vaga para abrir.
+        """
+        with self._cond:
+            while True:
+                if self._fechado:
+                    raise PoolEsgotado("Pool de conexões fechado")
+
+                if self._livres:
+                    conn, criada_em, devolvida_em = self._livres.pop()
+                    self._em_uso[id(conn)] = criada_em
+                    return conn, criada_em, devolvida_em
+
+                if self._total() < self.maximo:
+                    self._abrindo += 1
+                    return None
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolEsgotado(
+                        f"Nenhuma conexão livre após {self.timeout}s (máximo={self.maximo})"
+                    )
+                self._stats["esperas"] += 1
+                self._cond.wait(restante)
+
+    def obter(self):
+        """Retira uma conexão do pool (abre uma nova se houver folga)."""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        while True:
+            reservada = self._reservar(limite)
+            if reservada is None:
+                break
+
+            # Health check fora do lock para não segurar as outras threads
+            conn, criada_em, devolvida_em = reservada
+            if self._saudavel(conn, criada_em, devolvida_em):
+                with self._cond:
+                    self._registrar_checkout(inicio)
+                return conn
+
+            with self._cond:
+                self._em_uso.pop(id(conn), None)
+                self._descartar(conn)
+                self._cond.notify()
+
+        # Abre fora do lock para não bloquear quem está devolvendo conexões
+        try:
+            conn = self._abrir()
+        except Exception:
+            with self._cond:
+                self._abrindo -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._abrindo -= 1
+            self._stats["criadas"] += 1
+            self._em_uso[id(conn)] = time.monotonic()
+            self._registrar_checkout(inicio)
+        return conn
+
+    def _registrar_checkout(self, inicio):
+        self._stats["checkouts"] += 1
+        self._stats["tempo_espera_total"] += time.monotonic() - inicio
+
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool, desfazendo qualquer transação pendente."""
+        with self._cond:
+            criada_em = self._em_uso.pop(id(conn), None)
+            if criada_em is None:
+                return
+
+            if not descartar and not conn.closed:
+                try:
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except Exception:
+                    descartar = True
+
+            expirada = self.vida_maxima and time.monotonic() - criada_em > self.vida_maxima
+            if descartar or conn.closed or expirada or self._fechado:
+                self._descartar(conn)
+            else:
+                self._livres.append((conn, criada_em, time.monotonic()))
+            self._cond.notify()
+
+    def estatisticas(self):
+        """Retrato do pool para monitoramento."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+                "livres": len(self._livres),
+                "em_uso": len(self._em_uso),
+                "abrindo": self._abrindo,
+            })
+            return stats
+
+    def fechar(self):
+        with self._cond:
+            self._fechado = True
+            while self._livres:
+                conn, _, _ = self._livres.pop()
+                self._descartar(conn)
+            self._cond.notify_all()
+
+
+class _ConexaoEmprestada:
+    """
+    Context manager devolvido por get_db_connection().
+
+    Mantém a mesma semântica do `with psycopg2.connect(...) as conn`:
+    commit ao sair normalmente, rollback se houver exceção. A diferença é que
+    ao final a conexão volta para o pool em vez de ficar aberta.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = self._pool.obter()
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        conn, self._conn = self._conn, None
+        try:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception:
+            # Conexão em estado desconhecido: não volta para o pool
+            self._pool.devolver(conn, descartar=True)
+            if exc_type is None:
+                raise
+            return False
+        self._pool.devolver(conn)
+        return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _criar_pool(app=None):
+    # Sem banco configurado o import do app (e `flask --help`) continua
+    # funcionando; a falta de configuração só aparece ao pedir uma conexão
+    try:
+        parametros = _parametros_conexao(app)
+    except RuntimeError:
+        parametros = None
+    return PoolConexoes(
+        parametros,
+        minimo=_config_int(app, "DB_POOL_MIN", 1),
+        maximo=_config_int(app, "DB_POOL_MAX", 10),
+        vida_maxima=_config_int(app, "DB_POOL_MAX_LIFETIME", 1800),
+        timeout=_config_int(app, "DB_POOL_TIMEOUT", 10),
+        verificar_apos=_config_int(app, "DB_POOL_PING_APOS", 30),
+    )
+
+
+def init_pool(app=None):
+    """Cria o pool da aplicação a partir do app.config/variáveis de ambiente."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+        _pool = _criar_pool(app)
+        return _pool
+
+
+def get_pool():
+    """Pool atual; é criado sob demanda (ex.: scripts fora do Flask)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _criar_pool()
+    return _pool
+
+
+def get_db_connection():
+    """Empresta uma conexão do pool. Use sempre com `with`."""
+    return _ConexaoEmprestada(get_pool())
+
+
+def abrir_conexao_dedicada():
+    """Conexão fora do pool, para LISTEN e processos de longa duração."""
+    return psycopg2.connect(**_parametros_conexao())
+
+
+def estatisticas_pool():
+    return _pool.estatisticas() if _pool is not None else {}
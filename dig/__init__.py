@@ -1,5 +0,0 @@
-from flask import Blueprint
-
-bp = Blueprint('dig', __name__)
-
-from . import routes
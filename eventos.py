@@ -0,0 +1,111 @@
+# eventos.py
+# Eventos da fila de cada setor para os painéis abertos (Server-Sent Events)
+#
+# Os triggers de migrations/006_notificar_fila_setores.sql fazem NOTIFY no
+# canal fila_setores; a thread de notificacoes.py repassa cada aviso para
+# publicar(), que distribui às assinaturas do setor. Cada painel aberto é uma
+# assinatura com fila própria, consumida pela rota /<setor>/eventos.
+#
+# Cada painel conectado prende uma thread (ou o processo inteiro, em worker
+# síncrono) do servidor enquanto a aba estiver aberta. Com workers sync ou
+# gthread o limite tem de ficar bem abaixo do número de threads por
+# processo, senão os painéis abertos tomam o lugar das requisições normais.
+# Para muitos painéis use workers assíncronos (ex.: gunicorn -k gevent) e
+# aí sim aumente EVENTOS_MAX_ASSINATURAS.
+#
+# Variáveis de ambiente:
+#   EVENTOS_MAX_ASSINATURAS  painéis conectados ao mesmo tempo por processo
+#                            (padrão 4; acima disso a rota responde 503 e
+#                            o painel segue sem atualização ao vivo)
+#   EVENTOS_PING_S           intervalo do comentário de keep-alive (padrão 20)
+import json
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+CANAL_FILA_SETORES = "fila_setores"
+
+MAX_ASSINATURAS = int(os.getenv("EVENTOS_MAX_ASSINATURAS", "4"))
+INTERVALO_PING = float(os.getenv("EVENTOS_PING_S", "20"))
+TAMANHO_FILA = 100
+
+_assinaturas = set()
+_lock = threading.Lock()
+
+
+class Assinatura:
+    def __init__(self, setor):
+        self.setor = setor
+        self.fila = queue.Queue(maxsize=TAMANHO_FILA)
+
+    def entregar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except queue.Full:
+            # Painel parado (aba em segundo plano, rede lenta): descarta o
+            # acumulado e pede para ele recarregar tudo de uma vez
+            with self.fila.mutex:
+                self.fila.queue.clear()
+            self.fila.put_nowait({"evento": "ressincronizar"})
+
+
+def assinar(setor):
+    """Nova assinatura do setor, ou None se o limite de conexões foi atingido."""
+    with _lock:
+        if len(_assinaturas) >= MAX_ASSINATURAS:
+            return None
+        assinatura = Assinatura(setor)
+        _assinaturas.add(assinatura)
+        return assinatura
+
+
+def cancelar(assinatura):
+    with _lock:
+        _assinaturas.discard(assinatura)
+
+
+def publicar(payload):
+    """Callback do canal fila_setores. payload None = ressincronizar todos."""
+    if payload is None:
+        evento, setores = {"evento": "ressincronizar"}, None
+    else:
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            logger.warning("Payload inválido em %s: %r", CANAL_FILA_SETORES, payload)
+            return
+        setores = {evento.get("setor"), evento.get("setor_origem")}
+
+    with _lock:
+        destinos = [a for a in _assinaturas if setores is None or a.setor in setores]
+    for assinatura in destinos:
+        assinatura.entregar(evento)
+
+
+def _formatar(evento, cpf_tecnico):
+    # O CPF do responsável não vai para o navegador: só se foi o próprio técnico
+    dados = {k: v for k, v in evento.items() if k != "responsavel"}
+    if "responsavel" in evento:
+        dados["proprio"] = evento["responsavel"] == cpf_tecnico
+    return f"event: {evento['evento']}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def fluxo(assinatura, cpf_tecnico):
+    """Gerador do corpo text/event-stream de uma assinatura."""
+    try:
+        # Reconexão do EventSource em 5s se a conexão cair
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                evento = assinatura.fila.get(timeout=INTERVALO_PING)
+            except queue.Empty:
+                # Comentário SSE: mantém proxies e o navegador com a conexão aberta
+                yield ": ping\n\n"
+                continue
+            yield _formatar(evento, cpf_tecnico)
+    finally:
+        cancelar(assinatura)
+
@@ -0,0 +1,255 @@
+# fila_pdf.py
+# Fila de geração de PDFs (tabela fila_pdf) consumida com FOR UPDATE SKIP LOCKED
+#
+# Variáveis de ambiente:
+#   FILA_PDF_MAX_TENTATIVAS   tentativas antes de o job ficar em ERRO (padrão 3)
+#   FILA_PDF_ESPERA_S         espera antes da 2ª tentativa; dobra a cada falha (padrão 30)
+#   FILA_PDF_TEMPO_LIMITE_S   job EM_ANDAMENTO há mais que isso volta para a fila
+#                             (worker que caiu no meio; padrão 600)
+#   FILA_PDF_WORKER_EMBUTIDO  1 roda o worker numa thread do servidor web
+#                             (desenvolvimento; padrão 0: use `flask worker-pdf`)
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime
+
+import click
+from psycopg2.extras import Json
+
+from db import get_db_connection, abrir_conexao_dedicada
+from relatorio import gerar_pdf, gerar_pdf_segundo_preenchimento
+from pdf_manager import mesclar_com_relatorio_analise
+from metricas import cronometrar, registrar_etapas
+
+logger = logging.getLogger(__name__)
+
+CANAL_FILA_PDF = "fila_pdf"
+_worker_embutido = None
+_worker_lock = threading.Lock()
+MAX_TENTATIVAS = int(os.getenv("FILA_PDF_MAX_TENTATIVAS", "3"))
+ESPERA_S = int(os.getenv("FILA_PDF_ESPERA_S", "30"))
+TEMPO_LIMITE_S = int(os.getenv("FILA_PDF_TEMPO_LIMITE_S", "600"))
+
+# tipo do job -> como o PDF é montado
+TIPO_CADASTRO = "cadastro"   # relatorio.gerar_pdf com os dados do formulário
+TIPO_EDICAO = "edicao"       # relatorio.gerar_pdf_segundo_preenchimento (lê do banco)
+
+
+def enfileirar_pdf(cur, protocolo, setor_nome, tipo, formulario=None):
+    """
+    Registra o pedido de PDF na transação do chamador e retorna o id do job.
+    O worker só enxerga o job depois do commit, junto com os dados do processo.
+    """
+    cur.execute("""
+        INSERT INTO fila_pdf (processo_protocolo, setor_nome, tipo, formulario)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id_job
+    """, (protocolo, setor_nome, tipo, Json(formulario) if formulario is not None else None))
+    id_job = cur.fetchone()[0]
+    cur.execute("SELECT pg_notify(%s, %s)", (CANAL_FILA_PDF, str(id_job)))
+    return id_job
+
+
+def status_pdf(cur, protocolo):
+    """Último job do protocolo: dict com status/erro/caminho, ou None."""
+    cur.execute("""
+        SELECT id_job, status, tentativas, erro, caminho_pdf, criado_em, concluido_em
+        FROM fila_pdf
+        WHERE processo_protocolo = %s
+        ORDER BY id_job DESC
+        LIMIT 1
+    """, (protocolo,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    cols = [desc[0] for desc in cur.description]
+    return dict(zip(cols, row))
+
+
+def gerar_pdf_job(protocolo, tipo, formulario=None, duracoes=None):
+    """
+    Renderiza e mescla o PDF de um job. Retorna o caminho do PDF final.
+    `duracoes` recebe (etapa, segundos) de pdf_render e pdf_merge.
+    """
+    if duracoes is None:
+        duracoes = []
+    nome_arquivo = f"{protocolo}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+    caminho_pdf = os.path.join("PDFS", nome_arquivo)
+    os.makedirs("PDFS", exist_ok=True)
+
+    with cronometrar("pdf_render", duracoes):
+        if tipo == TIPO_CADASTRO:
+            gerar_pdf(dict(formulario or {}), caminho_pdf)
+        else:
+            gerar_pdf_segundo_preenchimento(protocolo, caminho_pdf)
+
+    with cronometrar("pdf_merge", duracoes):
+        return mesclar_com_relatorio_analise(caminho_pdf, protocolo)
+
+
+# Job parado em EM_ANDAMENTO sem tentativas sobrando: o worker caiu em todas
+SQL_ABANDONAR_TRAVADOS = """
+    UPDATE fila_pdf
+    SET status = 'ERRO', erro = 'Tempo limite esgotado na geração do PDF'
+    WHERE status = 'EM_ANDAMENTO'
+      AND iniciado_em < CURRENT_TIMESTAMP - make_interval(secs => %(limite)s)
+      AND tentativas >= %(max_tentativas)s
+"""
+
+# Pega o próximo job (pendente já liberado para nova tentativa, ou
+# EM_ANDAMENTO esquecido) e já conta a tentativa
+SQL_PEGAR_JOB = """
+    UPDATE fila_pdf
+    SET status = 'EM_ANDAMENTO', iniciado_em = CURRENT_TIMESTAMP, tentativas = tentativas + 1
+    WHERE id_job = (
+        SELECT id_job
+        FROM fila_pdf
+        WHERE (status = 'PENDENTE' AND proxima_tentativa <= CURRENT_TIMESTAMP)
+           OR (status = 'EM_ANDAMENTO'
+               AND iniciado_em < CURRENT_TIMESTAMP - make_interval(secs => %(limite)s))
+        ORDER BY id_job
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id_job, processo_protocolo, setor_nome, tipo, formulario, tentativas
+"""
+
+
+def pegar_job():
+    """Marca o próximo job como EM_ANDAMENTO (transação curta). Retorna a linha ou None."""
+    params = {"limite": TEMPO_LIMITE_S, "max_tentativas": MAX_TENTATIVAS}
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_ABANDONAR_TRAVADOS, params)
+            cur.execute(SQL_PEGAR_JOB, params)
+            return cur.fetchone()
+
+
+def espera_nova_tentativa(tentativas):
+    """Segundos até a próxima tentativa depois de `tentativas` falhas."""
+    return ESPERA_S * 2 ** (tentativas - 1)
+
+
+def registrar_resultado(id_job, protocolo, setor_nome, tentativas, caminho_pdf=None, erro=None,
+                        duracoes=()):
+    """
+    Grava o PDF gerado ou a falha do job (segunda transação curta), junto
+    com as durações de render/mesclagem exportadas pelo /metrics do servidor web.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if erro is None:
+                cur.execute("""
+                    INSERT INTO pdf_gerados (processo_protocolo, setor_nome, caminho_pdf, data_geracao)
+                    VALUES (%s, %s, %s, %s)
+                """, (protocolo, setor_nome, caminho_pdf, datetime.now()))
+                cur.execute("""
+                    UPDATE fila_pdf
+                    SET status = 'CONCLUIDO', caminho_pdf = %s, erro = NULL,
+                        concluido_em = CURRENT_TIMESTAMP
+                    WHERE id_job = %s
+                """, (caminho_pdf, id_job))
+                registrar_etapas(cur, duracoes)
+            else:
+                status = 'ERRO' if tentativas >= MAX_TENTATIVAS else 'PENDENTE'
+                cur.execute("""
+                    UPDATE fila_pdf
+                    SET status = %s, erro = %s,
+                        proxima_tentativa = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                    WHERE id_job = %s
+                """, (status, erro, espera_nova_tentativa(tentativas), id_job))
+
+
+def processar_proximo():
+    """
+    Processa um job. Nenhuma conexão fica emprestada durante a renderização:
+    o job é marcado EM_ANDAMENTO numa transação, o PDF é gerado fora dela e o
+    resultado é gravado em outra. Se o processo cair no meio, o job volta à
+    fila depois de FILA_PDF_TEMPO_LIMITE_S. Retorna o id processado ou None
+    se não houver job liberado.
+    """
+    job = pegar_job()
+    if not job:
+        return None
+    id_job, protocolo, setor_nome, tipo, formulario, tentativas = job
+
+    duracoes = []
+    try:
+        caminho_pdf_final = gerar_pdf_job(protocolo, tipo, formulario, duracoes)
+    except Exception as e:
+        logger.exception("Erro ao gerar PDF do protocolo %s (job %s, tentativa %s)", protocolo, id_job, tentativas)
+        registrar_resultado(id_job, protocolo, setor_nome, tentativas, erro=str(e))
+    else:
+        registrar_resultado(id_job, protocolo, setor_nome, tentativas, caminho_pdf=caminho_pdf_final,
+                            duracoes=duracoes)
+        logger.info("PDF do protocolo %s gerado: %s", protocolo, caminho_pdf_final)
+    return id_job
+
+
+def executar_worker(intervalo=5, uma_vez=False, parar=None):
+    """
+    Consome a fila até ela esvaziar e então espera um NOTIFY (ou `intervalo`
+    segundos) antes de olhar de novo. Com uma_vez=True, sai ao esvaziar.
+    """
+    conn_escuta = None
+    try:
+        if not uma_vez:
+            conn_escuta = abrir_conexao_dedicada()
+            conn_escuta.autocommit = True
+            with conn_escuta.cursor() as cur:
+                cur.execute(f'LISTEN "{CANAL_FILA_PDF}"')
+
+        while parar is None or not parar.is_set():
+            try:
+                while processar_proximo() is not None:
+                    pass
+            except Exception as e:
+                logger.warning("Worker de PDF: erro acessando a fila: %s", e)
+
+            if uma_vez:
+                return
+
+            if select.select([conn_escuta], [], [], intervalo) != ([], [], []):
+                conn_escuta.poll()
+                conn_escuta.notifies.clear()
+    finally:
+        if conn_escuta is not None:
+            conn_escuta.close()
+
+
+def iniciar_worker_embutido():
+    """
+    Roda o worker numa thread do próprio servidor web, só com
+    FILA_PDF_WORKER_EMBUTIDO=1 (desenvolvimento): cada processo do servidor
+    criaria a sua. Em produção use `flask worker-pdf` como processo
+    separado. Pode ser chamada várias vezes: a thread é criada uma única
+    vez por processo.
+    """
+    global _worker_embutido
+    if _worker_embutido is not None or os.getenv("FILA_PDF_WORKER_EMBUTIDO", "0") != "1":
+        return _worker_embutido
+
+    def _rodar():
+        while True:
+            try:
+                executar_worker()
+            except Exception as e:
+                logger.warning("Worker de PDF embutido reiniciando: %s", e)
+                time.sleep(5)
+
+    with _worker_lock:
+        if _worker_embutido is None:
+            _worker_embutido = threading.Thread(target=_rodar, name="worker-pdf", daemon=True)
+            _worker_embutido.start()
+    return _worker_embutido
+
+
+@click.command("worker-pdf")
+@click.option("--intervalo", default=5, help="Segundos entre verificações sem NOTIFY.")
+@click.option("--uma-vez", is_flag=True, help="Processa os pendentes e sai.")
+def comando_worker_pdf(intervalo, uma_vez):
+    """Processa a fila de geração de PDFs."""
+    click.echo("🖨️  Worker de PDF iniciado")
+    executar_worker(intervalo=intervalo, uma_vez=uma_vez)
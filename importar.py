@@ -0,0 +1,598 @@
+# importar.py
+# Importação em lote de processos a partir de planilhas (CSV ou XLSX) vindas
+# do protocolo: `flask importar-processos` e a rota /importar
+#
+# Cada linha é um formulário de /inserir (cabeçalhos = nomes dos campos do
+# formulário) e passa pelas mesmas regras (cadastro.preparar_cadastros).
+# Zonas e municípios são conferidos em mapas carregados uma vez por
+# importação; as linhas válidas vão por COPY para uma tabela temporária e
+# de lá para as tabelas definitivas com um INSERT ... SELECT por tabela.
+# Linhas recusadas saem no relatório (linha, protocolo, motivo) e não
+# impedem as demais; erro do banco desfaz a importação inteira.
+#
+# XLSX precisa do pacote opcional openpyxl (pip install openpyxl); sem ele
+# só CSV é anunciado na página e aceito na importação.
+import csv
+import io
+import logging
+import os
+import re
+import time
+import unicodedata
+from datetime import date, datetime
+
+import click
+
+from cadastro import CadastroInvalido, gerar_matricula, preparar_cadastros
+from db import get_db_connection
+from referencias import montar_consulta_agrupada, obter_referencias
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES = (".csv",) if openpyxl is None else (".csv", ".xlsx", ".xlsm")
+
+# Campos do formulário de /inserir aceitos como coluna
+CAMPOS = {
+    "protocolo", "observacoes", "numero_pasta", "solicitacao_requerente", "resposta_departamento",
+    "tramitacao", "tipologia", "situacao_localizacao", "responsavel_localizacao_cpf",
+    "inicio_localizacao", "fim_localizacao", "nome_ou_loteamento_do_condominio_a_ser_aprovado",
+    "interesse_social", "perimetro_urbano", "nome_requerente", "tipo_de_requerente",
+    "cpf_requerente", "cnpj_requerente", "nome_proprietario", "cpf_cnpj_proprietario",
+    "matricula_imovel", "municipio", "apa", "zona_apa", "utp", "zona_utp", "zona_urbana",
+    "macrozona_municipal", "sistema_viario", "curva_inundacao", "manancial", "faixa_servidao",
+    "localidade_imovel", "area", "latitude", "longitude", "prioridade", "complexidade",
+    "setor_destino",
+}
+
+# Cabeçalhos comuns nas planilhas do protocolo que diferem do formulário
+SINONIMOS = {
+    "cpf_cnpj_requerente": "cpf_requerente",
+    "tipo_requerente": "tipo_de_requerente",
+    "responsavel_localizacao": "responsavel_localizacao_cpf",
+    "pasta": "numero_pasta",
+    "matricula": "matricula_imovel",
+    "macrozona": "macrozona_municipal",
+}
+
+CAMPOS_DATA = ("inicio_localizacao", "fim_localizacao")
+CAMPOS_NUMERO = ("area", "latitude", "longitude")
+CAMPOS_MARCACAO = ("interesse_social", "perimetro_urbano")
+MARCADO = {"on", "sim", "s", "x", "1", "true", "verdadeiro"}
+
+# Tentativas de sortear uma matrícula provisória ainda não usada
+TENTATIVAS_MATRICULA = 50
+
+
+class PlanilhaInvalida(ValueError):
+    """Arquivo que não dá para importar (formato, cabeçalho, dependência)."""
+
+
+class ResultadoImportacao:
+    """Contagens e relatório de uma importação."""
+
+    def __init__(self):
+        self.lidas = 0
+        self.importadas = 0
+        self.erros = []  # (linha da planilha, protocolo, motivo)
+        self.colunas_ignoradas = []
+        self.simulada = False
+
+
+# --- Leitura -----------------------------------------------------------------
+
+def _nome_campo(cabecalho):
+    texto = unicodedata.normalize("NFKD", str(cabecalho or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    campo = re.sub(r"[^a-z0-9]+", "_", texto).strip("_")
+    return SINONIMOS.get(campo, campo)
+
+
+def _texto_celula(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat() if valor.time() == datetime.min.time() else valor.isoformat(" ")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        # Protocolo/matrícula numéricos chegam do Excel como 12345.0
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _montar_linhas(cabecalho, linhas, primeira=2):
+    campos = [_nome_campo(c) for c in cabecalho]
+    if "protocolo" not in campos:
+        raise PlanilhaInvalida("A planilha precisa de uma coluna 'protocolo' na primeira linha")
+    ignoradas = [str(c) for c, campo in zip(cabecalho, campos) if campo and campo not in CAMPOS]
+
+    resultado = []
+    for numero, valores in enumerate(linhas, start=primeira):
+        formulario = {
+            campo: _texto_celula(valor)
+            for campo, valor in zip(campos, valores)
+            if campo in CAMPOS
+        }
+        if any(formulario.values()):
+            resultado.append((numero, formulario))
+    return resultado, ignoradas
+
+
+def _ler_csv(arquivo):
+    conteudo = arquivo.read()
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # CSV salvo pelo Excel em português
+        texto = conteudo.decode("cp1252")
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(io.StringIO(texto, newline=""), dialeto)
+    cabecalho = next(leitor, None)
+    if not cabecalho:
+        raise PlanilhaInvalida("Planilha vazia")
+    return _montar_linhas(cabecalho, leitor)
+
+
+def _ler_xlsx(arquivo):
+    if openpyxl is None:
+        raise PlanilhaInvalida("Importar .xlsx requer o pacote openpyxl (pip install openpyxl); "
+                               "ou salve a planilha como CSV")
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if not cabecalho:
+            raise PlanilhaInvalida("Planilha vazia")
+        return _montar_linhas(cabecalho, linhas)
+    finally:
+        livro.close()
+
+
+def ler_planilha(arquivo, nome):
+    """
+    Lê a primeira aba (XLSX) ou o CSV de um arquivo binário.
+    Retorna ([(linha da planilha, {campo: texto})], colunas ignoradas).
+    """
+    extensao = os.path.splitext(nome or "")[1].lower()
+    if extensao == ".csv":
+        return _ler_csv(arquivo)
+    if extensao in (".xlsx", ".xlsm"):
+        return _ler_xlsx(arquivo)
+    raise PlanilhaInvalida(f"Formato não suportado: {nome!r} (use {', '.join(EXTENSOES)})")
+
+
+# --- Validação ---------------------------------------------------------------
+
+# Uma ida ao banco para todos os mapas (ver referencias.montar_consulta_agrupada)
+CONSULTAS_MAPAS = {
+    "zona_apa": "SELECT apa, nome_zona_apa, id_zona_apa FROM zona_apa WHERE apa IS NOT NULL",
+    "zona_utp": "SELECT utp, nome_zona_utp, id_zona_utp FROM zona_utp WHERE utp IS NOT NULL",
+    "zona_urbana": "SELECT sigla_zona_urbana, id_zona_urbana FROM zona_urbana",
+    "macrozona": "SELECT sigla_macrozona, id_macrozona FROM macrozona_municipal",
+    "matriculas_provisorias": "SELECT matricula_imovel FROM imovel WHERE matricula_imovel LIKE %s",
+}
+
+
+def carregar_mapas(cur, agora=None):
+    """
+    Nomes -> ids das zonas, municípios e matrículas provisórias já usadas
+    hoje, para validar a planilha sem consultar o banco por linha.
+    """
+    agora = agora or datetime.now()
+    cur.execute(montar_consulta_agrupada(CONSULTAS_MAPAS), (f"NOMAT-{agora:%Y%m%d}-%",))
+    dados = {
+        desc[0]: [tuple(linha.values()) for linha in linhas]
+        for desc, linhas in zip(cur.description, cur.fetchone())
+    }
+    return {
+        "zona_apa": {(apa, zona): id_zona for apa, zona, id_zona in dados["zona_apa"]},
+        "zona_utp": {(utp, zona): id_zona for utp, zona, id_zona in dados["zona_utp"]},
+        # Sigla repetida entre municípios: fica a primeira, como no LIMIT 1 de cadastro.py
+        "zona_urbana": dict(reversed(dados["zona_urbana"])),
+        "macrozona": dict(reversed(dados["macrozona"])),
+        "municipio": {m.strip() for m in obter_referencias()["municipio"] if m},
+        "matriculas_provisorias": {m for (m,) in dados["matriculas_provisorias"]},
+    }
+
+
+def _como_data_iso(valor):
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(valor, formato).date().isoformat()
+        except ValueError:
+            pass
+    raise CadastroInvalido(f"Data inválida: {valor!r} (use DD/MM/AAAA ou AAAA-MM-DD)")
+
+
+def _conferir_formulario(formulario, mapas, protocolos_vistos):
+    """
+    Normaliza a linha para o formato do formulário de /inserir e confere o
+    que o formulário já garante pelos seus campos (datas, números, listas).
+    """
+    protocolo = formulario.get("protocolo")
+    if protocolo in protocolos_vistos:
+        raise CadastroInvalido(f"Protocolo repetido na planilha (linha {protocolos_vistos[protocolo]})")
+
+    for campo in CAMPOS_DATA:
+        if formulario.get(campo):
+            try:
+                formulario[campo] = _como_data_iso(formulario[campo])
+            except CadastroInvalido as e:
+                raise CadastroInvalido(f"{campo}: {e}")
+    for campo in CAMPOS_NUMERO:
+        if formulario.get(campo):
+            try:
+                float(formulario[campo].replace(",", "."))
+            except ValueError:
+                raise CadastroInvalido(f"{campo}: número inválido {formulario[campo]!r}")
+    for campo in CAMPOS_MARCACAO:
+        formulario[campo] = "on" if formulario.get(campo, "").lower() in MARCADO else ""
+
+    if formulario.get("municipio") and formulario["municipio"] not in mapas["municipio"]:
+        raise CadastroInvalido(f"Município desconhecido: {formulario['municipio']!r}")
+
+    # Setor destino preenchido equivale a marcar "encaminhar"
+    if formulario.get("setor_destino"):
+        formulario["encaminhar"] = "1"
+
+    if not formulario.get("matricula_imovel"):
+        usadas = mapas["matriculas_provisorias"]
+        for _ in range(TENTATIVAS_MATRICULA):
+            matricula = gerar_matricula()
+            if matricula not in usadas:
+                break
+        else:
+            raise CadastroInvalido("Sem matrícula e sem matrícula provisória livre hoje")
+        usadas.add(matricula)
+        formulario["matricula_imovel"] = matricula
+
+
+def _resolver_zonas(dados, mapas):
+    """Ids das zonas (colunas id_* da tabela temporária); nome que não existe é erro."""
+    dados["id_zona_apa"] = dados["id_zona_utp"] = dados["id_zona_urbana"] = dados["id_macrozona"] = None
+    if dados["apa"] and dados["zona_apa"]:
+        dados["id_zona_apa"] = mapas["zona_apa"].get((dados["apa"], dados["zona_apa"]))
+        if dados["id_zona_apa"] is None:
+            raise CadastroInvalido(f"Zona {dados['zona_apa']!r} não encontrada na APA {dados['apa']!r}")
+    if dados["utp"] and dados["zona_utp"]:
+        dados["id_zona_utp"] = mapas["zona_utp"].get((dados["utp"], dados["zona_utp"]))
+        if dados["id_zona_utp"] is None:
+            raise CadastroInvalido(f"Zona {dados['zona_utp']!r} não encontrada na UTP {dados['utp']!r}")
+    if dados["zona_urbana"]:
+        dados["id_zona_urbana"] = mapas["zona_urbana"].get(dados["zona_urbana"])
+        if dados["id_zona_urbana"] is None:
+            raise CadastroInvalido(f"Zona urbana desconhecida: {dados['zona_urbana']!r}")
+    if dados["macrozona_municipal"]:
+        dados["id_macrozona"] = mapas["macrozona"].get(dados["macrozona_municipal"])
+        if dados["id_macrozona"] is None:
+            raise CadastroInvalido(f"Macrozona desconhecida: {dados['macrozona_municipal']!r}")
+
+
+def validar_linhas(linhas, setor, cpf_tecnico, setores_validos, mapas, agora=None):
+    """
+    Retorna ([(linha, dados de cadastro)] das válidas, [(linha, protocolo, motivo)]).
+    """
+    erros, candidatas, protocolos_vistos = [], [], {}
+    for numero, formulario in linhas:
+        try:
+            _conferir_formulario(formulario, mapas, protocolos_vistos)
+        except CadastroInvalido as e:
+            erros.append((numero, formulario.get("protocolo"), str(e)))
+        else:
+            candidatas.append((numero, formulario))
+            if formulario.get("protocolo"):
+                protocolos_vistos[formulario["protocolo"]] = numero
+
+    preparadas, recusadas = preparar_cadastros(
+        [formulario for _, formulario in candidatas], setor, cpf_tecnico, setores_validos, agora
+    )
+    for indice, motivo in recusadas:
+        numero, formulario = candidatas[indice]
+        erros.append((numero, formulario.get("protocolo"), motivo))
+
+    validas = []
+    for indice, dados in preparadas:
+        numero = candidatas[indice][0]
+        try:
+            _resolver_zonas(dados, mapas)
+        except CadastroInvalido as e:
+            erros.append((numero, dados["protocolo"], str(e)))
+        else:
+            validas.append((numero, dados))
+    erros.sort(key=lambda erro: erro[0])
+    return validas, erros
+
+
+# --- Gravação ----------------------------------------------------------------
+
+# Colunas copiadas para a tabela temporária (chaves de preparar_cadastro
+# mais os ids resolvidos), na ordem do COPY
+COLUNAS_TEMPORARIA = [
+    ("linha", "integer"),
+    ("protocolo", "text"),
+    ("observacoes", "text"),
+    ("numero_pasta", "text"),
+    ("solicitacao_requerente", "text"),
+    ("resposta_departamento", "text"),
+    ("tramitacao", "text"),
+    ("tipologia", "text"),
+    ("situacao_localizacao", "text"),
+    ("responsavel_localizacao", "text"),
+    ("inicio_localizacao", "date"),
+    ("fim_localizacao", "date"),
+    ("dias_uteis_localizacao", "integer"),
+    ("nome_ou_loteamento_do_condominio_a_ser_aprovado", "text"),
+    ("interesse_social", "boolean"),
+    ("perimetro_urbano", "boolean"),
+    ("data_entrada", "date"),
+    ("data_previsao_resposta", "date"),
+    ("nome_requerente", "text"),
+    ("cpf_cnpj_requerente", "text"),
+    ("tipo_requerente", "text"),
+    ("nome_proprietario", "text"),
+    ("cpf_cnpj_proprietario", "text"),
+    ("matricula_imovel", "text"),
+    ("municipio", "text"),
+    ("id_zona_apa", "integer"),
+    ("id_zona_utp", "integer"),
+    ("id_zona_urbana", "integer"),
+    ("id_macrozona", "integer"),
+    ("sistema_viario", "text"),
+    ("curva_inundacao", "text"),
+    ("manancial", "text"),
+    ("faixa_servidao", "text"),
+    ("localidade_imovel", "text"),
+    ("area", "numeric"),
+    ("latitude", "numeric"),
+    ("longitude", "numeric"),
+    ("situacao_analise", "text"),
+    ("responsavel_analise", "text"),
+    ("inicio_analise", "timestamp"),
+    ("fim_analise", "timestamp"),
+    ("dias_uteis_analise", "integer"),
+    ("prioridade", "text"),
+    ("complexidade", "text"),
+    ("setor_origem", "text"),
+    ("setor_destino", "text"),
+    ("setor_processo", "text"),
+]
+
+SQL_CRIAR_TEMPORARIA = (
+    "CREATE TEMP TABLE importacao_processo (\n    "
+    + ",\n    ".join(f"{nome} {tipo}" for nome, tipo in COLUNAS_TEMPORARIA)
+    + ",\n    id_requerente bigint,\n    id_proprietario bigint\n) ON COMMIT DROP"
+)
+
+SQL_COPY = "COPY importacao_processo ({}) FROM STDIN WITH (FORMAT csv)".format(
+    ", ".join(nome for nome, _ in COLUNAS_TEMPORARIA)
+)
+
+# Protocolo já cadastrado: sai da carga e vai para o relatório
+SQL_REMOVER_EXISTENTES = """
+    DELETE FROM importacao_processo t
+    USING processo p
+    WHERE p.protocolo = t.protocolo
+    RETURNING t.linha, t.protocolo
+"""
+
+# Ids de requerente/proprietário reservados antes do INSERT para ligar cada
+# linha ao seu registro (o RETURNING de um INSERT ... SELECT não garante ordem)
+SQL_RESERVAR_IDS = """
+    UPDATE importacao_processo
+    SET id_requerente = CASE WHEN nome_requerente IS NOT NULL
+                             THEN nextval(pg_get_serial_sequence('requerente', 'id_requerente')) END,
+        id_proprietario = CASE WHEN nome_proprietario IS NOT NULL
+                               THEN nextval(pg_get_serial_sequence('proprietario', 'id_proprietario')) END
+"""
+
+# Mesma ordem e mesmas regras de cadastro.SQL_CADASTRAR, uma instrução por tabela
+SQL_CARGA = [
+    ("requerente", """
+        INSERT INTO requerente (id_requerente, cpf_cnpj_requerente, nome_requerente, tipo_requerente)
+        OVERRIDING SYSTEM VALUE
+        SELECT id_requerente, cpf_cnpj_requerente, nome_requerente, tipo_requerente
+        FROM importacao_processo
+        WHERE nome_requerente IS NOT NULL
+    """),
+    ("proprietario", """
+        INSERT INTO proprietario (id_proprietario, cpf_cnpj_proprietario, nome_proprietario)
+        OVERRIDING SYSTEM VALUE
+        SELECT id_proprietario, cpf_cnpj_proprietario, nome_proprietario
+        FROM importacao_processo
+        WHERE nome_proprietario IS NOT NULL
+    """),
+    # Várias linhas do mesmo imóvel: vale a primeira (as outras cairiam no DO NOTHING)
+    ("imovel", """
+        INSERT INTO imovel (matricula_imovel, zona_apa, zona_utp, classificacao_viaria, curva_inundacao,
+                            manancial, area, localidade_imovel, latitude, longitude, faixa_servidao)
+        SELECT DISTINCT ON (matricula_imovel)
+               matricula_imovel, id_zona_apa, id_zona_utp, sistema_viario, curva_inundacao,
+               manancial, area, localidade_imovel, latitude, longitude, faixa_servidao
+        FROM importacao_processo
+        ORDER BY matricula_imovel, linha
+        ON CONFLICT (matricula_imovel) DO NOTHING
+    """),
+    ("imovel_municipio", """
+        INSERT INTO imovel_municipio (imovel_matricula, municipio_nome)
+        SELECT DISTINCT matricula_imovel, municipio
+        FROM importacao_processo
+        WHERE municipio IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """),
+    ("proprietario_imovel", """
+        INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id)
+        SELECT matricula_imovel, id_proprietario
+        FROM importacao_processo
+        WHERE id_proprietario IS NOT NULL
+    """),
+    # Aqui o cadastro sobrescreve (DO UPDATE): vale a última linha do imóvel
+    ("imovel_zona_macrozona", """
+        INSERT INTO imovel_zona_macrozona (imovel_matricula, zona_urbana_id, macrozona_id)
+        SELECT DISTINCT ON (matricula_imovel) matricula_imovel, id_zona_urbana, id_macrozona
+        FROM importacao_processo
+        WHERE id_zona_urbana IS NOT NULL OR id_macrozona IS NOT NULL
+        ORDER BY matricula_imovel, linha DESC
+        ON CONFLICT (imovel_matricula)
+        DO UPDATE SET
+            zona_urbana_id = EXCLUDED.zona_urbana_id,
+            macrozona_id = EXCLUDED.macrozona_id
+    """),
+    ("pasta", """
+        INSERT INTO pasta (numero_pasta)
+        SELECT DISTINCT numero_pasta
+        FROM importacao_processo
+        WHERE numero_pasta IS NOT NULL
+        ON CONFLICT (numero_pasta) DO NOTHING
+    """),
+    ("processo", """
+        INSERT INTO processo (
+            protocolo, observacoes, imovel_matricula, pasta_numero, solicitacao_requerente,
+            resposta_departamento, tramitacao, setor_nome, tipologia, situacao_localizacao,
+            responsavel_localizacao, inicio_localizacao, fim_localizacao,
+            dias_uteis_localizacao, requerente,
+            nome_ou_loteamento_do_condominio_a_ser_aprovado, interesse_social,
+            data_entrada, perimetro_urbano, data_previsao_resposta
+        )
+        SELECT protocolo, observacoes, matricula_imovel, numero_pasta, solicitacao_requerente,
+               resposta_departamento, tramitacao, setor_processo, tipologia, situacao_localizacao,
+               responsavel_localizacao, inicio_localizacao, fim_localizacao,
+               dias_uteis_localizacao, id_requerente,
+               nome_ou_loteamento_do_condominio_a_ser_aprovado, interesse_social,
+               data_entrada, perimetro_urbano, data_previsao_resposta
+        FROM importacao_processo
+        ORDER BY linha
+    """),
+    ("analise", """
+        INSERT INTO analise (situacao_analise, responsavel_analise, inicio_analise, fim_analise,
+                             dias_uteis_analise, ultima_movimentacao, processo_protocolo,
+                             prioridade, complexidade)
+        SELECT situacao_analise, responsavel_analise, inicio_analise, fim_analise,
+               dias_uteis_analise, data_entrada, protocolo, prioridade, complexidade
+        FROM importacao_processo
+    """),
+    ("historico", """
+        INSERT INTO historico (
+            processo_protocolo, setor_origem, setor_destino,
+            tecnico_responsavel_anterior, tecnico_novo_responsavel,
+            data_encaminhamento
+        )
+        SELECT protocolo, setor_origem, setor_destino, responsavel_analise, NULL, CURRENT_TIMESTAMP
+        FROM importacao_processo
+        WHERE setor_destino IS NOT NULL
+    """),
+]
+
+
+def _buffer_copy(validas):
+    # CSV do COPY: campo vazio sem aspas é NULL
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for numero, dados in validas:
+        escritor.writerow([numero] + [dados[nome] for nome, _ in COLUNAS_TEMPORARIA[1:]])
+    buffer.seek(0)
+    return buffer
+
+
+def gravar_linhas(cur, validas):
+    """
+    Carrega as linhas válidas (COPY + INSERT ... SELECT por tabela) na
+    transação de `cur`. Retorna (processos gravados, [(linha, protocolo, motivo)]).
+    """
+    cur.execute(SQL_CRIAR_TEMPORARIA)
+    cur.copy_expert(SQL_COPY, _buffer_copy(validas))
+    cur.execute(SQL_REMOVER_EXISTENTES)
+    erros = [(numero, protocolo, "Protocolo já cadastrado") for numero, protocolo in cur.fetchall()]
+    cur.execute(SQL_RESERVAR_IDS)
+
+    gravados = 0
+    for tabela, sql in SQL_CARGA:
+        inicio = time.perf_counter()
+        cur.execute(sql)
+        logger.debug("Importação: %s linhas em %s (%.0f ms)", cur.rowcount, tabela,
+                     (time.perf_counter() - inicio) * 1000)
+        if tabela == "processo":
+            gravados = cur.rowcount
+    return gravados, erros
+
+
+def importar_processos(arquivo, nome, setor, cpf_tecnico, setores_validos, simular=False):
+    """
+    Importa a planilha (arquivo binário aberto) para o setor. Com `simular`,
+    faz tudo e desfaz no final. Levanta PlanilhaInvalida se nada pode ser lido.
+    """
+    resultado = ResultadoImportacao()
+    resultado.simulada = simular
+    linhas, resultado.colunas_ignoradas = ler_planilha(arquivo, nome)
+    resultado.lidas = len(linhas)
+    if resultado.colunas_ignoradas:
+        logger.info("Importação de %s: colunas ignoradas %s", nome, resultado.colunas_ignoradas)
+
+    agora = datetime.now()
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            mapas = carregar_mapas(cur, agora)
+            validas, resultado.erros = validar_linhas(linhas, setor, cpf_tecnico, setores_validos, mapas, agora)
+            if validas:
+                resultado.importadas, existentes = gravar_linhas(cur, validas)
+                resultado.erros = sorted(resultado.erros + existentes, key=lambda erro: erro[0])
+        if simular:
+            conn.rollback()
+
+    logger.info("Importação de %s (%s): %s linhas, %s processos%s, %s recusadas",
+                nome, setor, resultado.lidas, resultado.importadas,
+                " (simulação)" if simular else "", len(resultado.erros))
+    return resultado
+
+
+def relatorio_csv(erros):
+    """Relatório de linhas recusadas em CSV (separador ';', abre direto no Excel)."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    escritor.writerow(["linha", "protocolo", "motivo"])
+    escritor.writerows(erros)
+    return buffer.getvalue()
+
+
+@click.command("importar-processos")
+@click.argument("arquivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--setor", required=True, help="Setor que cadastra (ex.: DIG).")
+@click.option("--cpf-tecnico", help="Técnico responsável pela análise (sem ele, os processos ficam disponíveis no setor).")
+@click.option("--simular", is_flag=True, help="Valida e carrega, mas desfaz no final.")
+@click.option("--relatorio", type=click.Path(dir_okay=False, writable=True), help="Grava as linhas recusadas em CSV.")
+def comando_importar_processos(arquivo, setor, cpf_tecnico, simular, relatorio):
+    """Importa processos de uma planilha CSV/XLSX com os campos do formulário de cadastro."""
+    setores = obter_referencias()["setor"]
+    if setor not in setores:
+        raise click.BadParameter(f"use um de {', '.join(setores)}", param_hint="--setor")
+
+    inicio = time.monotonic()
+    try:
+        with open(arquivo, "rb") as f:
+            resultado = importar_processos(f, arquivo, setor, cpf_tecnico, setores, simular)
+    except PlanilhaInvalida as e:
+        raise click.ClickException(str(e))
+    duracao = time.monotonic() - inicio
+
+    if resultado.colunas_ignoradas:
+        click.echo(f"Colunas ignoradas: {', '.join(resultado.colunas_ignoradas)}")
+    verbo = "seriam importados" if simular else "importados"
+    click.echo(f"✅ {resultado.lidas} linhas em {duracao:.1f}s "
+               f"({resultado.lidas / duracao if duracao else 0:.0f}/s); {verbo}: {resultado.importadas}")
+    if resultado.erros:
+        click.echo(f"❌ Linhas recusadas: {len(resultado.erros)}")
+        if relatorio:
+            with open(relatorio, "w", encoding="utf-8-sig", newline="") as f:
+                f.write(relatorio_csv(resultado.erros))
+            click.echo(f"   Relatório em {os.path.abspath(relatorio)}")
+        else:
+            for linha, protocolo, motivo in resultado.erros:
+                click.echo(f"   linha {linha} ({protocolo or 'sem protocolo'}): {motivo}")
+        raise SystemExit(1)
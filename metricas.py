@@ -0,0 +1,301 @@
+# metricas.py
+# Tempo por requisição, SQL executado e etapas de PDF: cabeçalho
+# Server-Timing na resposta e agregados em /metrics (formato Prometheus)
+#
+# Render e mesclagem de PDF rodam fora do servidor web (`flask worker-pdf`,
+# processos do `flask regerar-pdfs`): essas durações são somadas na tabela
+# metricas_etapa (registrar_etapas) e o /metrics as lê de lá.
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+
+import consultas_lentas
+
+logger = logging.getLogger(__name__)
+
+# Limites (segundos) dos histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SQL_SOMAR_ETAPAS = """
+    INSERT INTO metricas_etapa (etapa, le, contagem, soma)
+    VALUES %s
+    ON CONFLICT (etapa, le) DO UPDATE
+    SET contagem = metricas_etapa.contagem + EXCLUDED.contagem,
+        soma = metricas_etapa.soma + EXCLUDED.soma
+"""
+
+_medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+class Medicao:
+    """Números de uma requisição (ou de um trecho medido fora dela)."""
+
+    __slots__ = ("inicio", "consultas", "tempo_sql", "mais_lenta", "sql_mais_lenta", "etapas")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.mais_lenta = 0.0
+        self.sql_mais_lenta = None
+        self.etapas = {}
+
+    def registrar_sql(self, sql, duracao):
+        self.consultas += 1
+        self.tempo_sql += duracao
+        if duracao > self.mais_lenta:
+            self.mais_lenta = duracao
+            self.sql_mais_lenta = sql
+
+    def server_timing(self, total):
+        """Valor do cabeçalho Server-Timing (durações em ms)."""
+        partes = [
+            f"app;dur={total * 1000:.1f}",
+            f'db;dur={self.tempo_sql * 1000:.1f};desc="{self.consultas} consultas"',
+        ]
+        if self.consultas:
+            partes.append(f"sql-max;dur={self.mais_lenta * 1000:.1f}")
+        for etapa, duracao in self.etapas.items():
+            partes.append(f"{etapa};dur={duracao * 1000:.1f}")
+        return ", ".join(partes)
+
+
+class _Histograma:
+    def __init__(self):
+        self.contagens = [0] * len(BUCKETS)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.contagens[i] += 1
+
+    def somado(self, outro):
+        h = _Histograma()
+        h.contagens = [a + b for a, b in zip(self.contagens, outro.contagens)]
+        h.soma = self.soma + outro.soma
+        h.total = self.total + outro.total
+        return h
+
+
+class Agregador:
+    """Acumula as medições de todas as requisições do processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requisicoes = {}      # (endpoint, metodo, status) -> contagem
+        self._duracao = {}          # endpoint -> _Histograma
+        self._consultas = {}        # endpoint -> total de consultas
+        self._tempo_sql = {}        # endpoint -> segundos em SQL
+        self._etapas = {}           # etapa -> _Histograma
+
+    def registrar_requisicao(self, endpoint, metodo, status, duracao, medicao):
+        with self._lock:
+            chave = (endpoint, metodo, status)
+            self._requisicoes[chave] = self._requisicoes.get(chave, 0) + 1
+            self._duracao.setdefault(endpoint, _Histograma()).observar(duracao)
+            self._consultas[endpoint] = self._consultas.get(endpoint, 0) + medicao.consultas
+            self._tempo_sql[endpoint] = self._tempo_sql.get(endpoint, 0.0) + medicao.tempo_sql
+
+    def registrar_etapa(self, etapa, duracao):
+        with self._lock:
+            self._etapas.setdefault(etapa, _Histograma()).observar(duracao)
+
+    def prometheus(self, pool=None, etapas_externas=None):
+        """
+        Texto no formato de exposição do Prometheus. etapas_externas:
+        histogramas lidos de metricas_etapa (carregar_etapas).
+        """
+        linhas = []
+
+        def histograma(nome, rotulo, valor_rotulo, h):
+            for limite, contagem in zip(BUCKETS, h.contagens):
+                linhas.append(f'{nome}_bucket{{{rotulo}="{valor_rotulo}",le="{limite}"}} {contagem}')
+            linhas.append(f'{nome}_bucket{{{rotulo}="{valor_rotulo}",le="+Inf"}} {h.total}')
+            linhas.append(f'{nome}_sum{{{rotulo}="{valor_rotulo}"}} {h.soma:.6f}')
+            linhas.append(f'{nome}_count{{{rotulo}="{valor_rotulo}"}} {h.total}')
+
+        with self._lock:
+            linhas += ["# HELP dirtec_requisicoes_total Requisições atendidas",
+                       "# TYPE dirtec_requisicoes_total counter"]
+            for (endpoint, metodo, status), n in sorted(self._requisicoes.items()):
+                linhas.append(f'dirtec_requisicoes_total{{endpoint="{endpoint}",metodo="{metodo}",status="{status}"}} {n}')
+
+            linhas += ["# HELP dirtec_requisicao_segundos Duração das requisições",
+                       "# TYPE dirtec_requisicao_segundos histogram"]
+            for endpoint, h in sorted(self._duracao.items()):
+                histograma("dirtec_requisicao_segundos", "endpoint", endpoint, h)
+
+            linhas += ["# HELP dirtec_sql_consultas_total Consultas SQL executadas",
+                       "# TYPE dirtec_sql_consultas_total counter"]
+            for endpoint, n in sorted(self._consultas.items()):
+                linhas.append(f'dirtec_sql_consultas_total{{endpoint="{endpoint}"}} {n}')
+
+            linhas += ["# HELP dirtec_sql_segundos_total Tempo gasto em SQL",
+                       "# TYPE dirtec_sql_segundos_total counter"]
+            for endpoint, segundos in sorted(self._tempo_sql.items()):
+                linhas.append(f'dirtec_sql_segundos_total{{endpoint="{endpoint}"}} {segundos:.6f}')
+
+            linhas += ["# HELP dirtec_etapa_segundos Duração de etapas (render/mesclagem de PDF)",
+                       "# TYPE dirtec_etapa_segundos histogram"]
+            etapas = dict(self._etapas)
+            for etapa, h in (etapas_externas or {}).items():
+                etapas[etapa] = etapas[etapa].somado(h) if etapa in etapas else h
+            for etapa, h in sorted(etapas.items()):
+                histograma("dirtec_etapa_segundos", "etapa", etapa, h)
+
+        if pool:
+            linhas += ["# HELP dirtec_pool Estado do pool de conexões",
+                       "# TYPE dirtec_pool gauge"]
+            for chave, valor in sorted(pool.items()):
+                linhas.append(f'dirtec_pool{{campo="{chave}"}} {valor}')
+
+        return "\n".join(linhas) + "\n"
+
+
+agregador = Agregador()
+
+
+def registrar_etapas(cur, duracoes):
+    """
+    Soma em metricas_etapa as durações medidas fora do servidor web,
+    duracoes = [(etapa, segundos)], na transação do chamador.
+    """
+    histogramas = {}
+    for etapa, duracao in duracoes:
+        histogramas.setdefault(etapa, _Histograma()).observar(duracao)
+    if not histogramas:
+        return
+    # Sempre na mesma ordem: dois processos somando ao mesmo tempo não se travam
+    linhas = []
+    for etapa, h in sorted(histogramas.items()):
+        linhas += [(etapa, str(limite), contagem, 0.0) for limite, contagem in zip(BUCKETS, h.contagens)]
+        linhas.append((etapa, "+Inf", h.total, h.soma))
+    execute_values(cur, SQL_SOMAR_ETAPAS, linhas)
+
+
+def carregar_etapas(cur):
+    """Histogramas acumulados em metricas_etapa: {etapa: _Histograma}."""
+    limites = [str(limite) for limite in BUCKETS]
+    cur.execute("SELECT etapa, le, contagem, soma FROM metricas_etapa")
+    histogramas = {}
+    for etapa, le, contagem, soma in cur.fetchall():
+        h = histogramas.setdefault(etapa, _Histograma())
+        if le == "+Inf":
+            h.total, h.soma = contagem, soma
+        elif le in limites:
+            h.contagens[limites.index(le)] = contagem
+    return histogramas
+
+
+class CursorMedido(psycopg2.extensions.cursor):
+    """
+    Cursor que soma tempo e quantidade de SQL na medição em andamento e
+    repassa as consultas acima de CONSULTAS_LENTAS_MS para consultas_lentas.py.
+    """
+
+    def _medir(self, executar, sql, params):
+        medicao = _medicao_atual.get()
+        if medicao is None and consultas_lentas.LIMITE is None:
+            return executar(sql, params)
+        inicio = time.perf_counter()
+        try:
+            resultado = executar(sql, params)
+        finally:
+            duracao = time.perf_counter() - inicio
+            if medicao is not None:
+                medicao.registrar_sql(sql, duracao)
+        # Só consultas que terminaram bem (a transação ainda aceita o EXPLAIN)
+        if consultas_lentas.LIMITE is not None and duracao >= consultas_lentas.LIMITE:
+            consultas_lentas.registrar(self.connection, sql, params, duracao)
+        return resultado
+
+    def execute(self, sql, params=None):
+        return self._medir(super().execute, sql, params)
+
+    def executemany(self, sql, params_seq):
+        # Só o tempo entra na medição; executemany não é repetido com EXPLAIN
+        medicao = _medicao_atual.get()
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, params_seq)
+        finally:
+            if medicao is not None:
+                medicao.registrar_sql(sql, time.perf_counter() - inicio)
+
+
+@contextmanager
+def medir(etapa):
+    """Cronometra um trecho (ex.: "pdf_render"), dentro ou fora de requisição."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        agregador.registrar_etapa(etapa, duracao)
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.etapas[etapa] = medicao.etapas.get(etapa, 0.0) + duracao
+
+
+@contextmanager
+def cronometrar(etapa, duracoes):
+    """
+    Como medir(), para etapas fora do servidor web: a duração entra em
+    `duracoes` (gravada depois com registrar_etapas), não no agregador do
+    processo. Só etapas concluídas sem erro.
+    """
+    inicio = time.perf_counter()
+    yield
+    duracoes.append((etapa, time.perf_counter() - inicio))
+
+
+def instrumentar(app):
+    """Liga a medição por requisição, o Server-Timing e a rota /metrics."""
+    from flask import g, request
+
+    from db import estatisticas_pool, get_db_connection
+
+    @app.before_request
+    def _iniciar_medicao():
+        g.medicao = Medicao()
+        _medicao_atual.set(g.medicao)
+
+    @app.after_request
+    def _registrar_medicao(resposta):
+        medicao = g.pop("medicao", None)
+        if medicao is None:
+            return resposta
+        total = time.perf_counter() - medicao.inicio
+        resposta.headers["Server-Timing"] = medicao.server_timing(total)
+        agregador.registrar_requisicao(
+            request.endpoint or "desconhecido", request.method, resposta.status_code, total, medicao
+        )
+        return resposta
+
+    @app.teardown_request
+    def _encerrar_medicao(_exc=None):
+        # A thread do servidor é reaproveitada: não deixa a medição vazar
+        _medicao_atual.set(None)
+
+    @app.route("/metrics")
+    def metricas_prometheus():
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    etapas_externas = carregar_etapas(cur)
+        except Exception as e:
+            logger.warning("Métricas do worker de PDF indisponíveis: %s", e)
+            etapas_externas = None
+        return app.response_class(
+            agregador.prometheus(estatisticas_pool(), etapas_externas),
+            mimetype="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -0,0 +1,50 @@
+# migracoes.py
+# Aplica, em ordem, os arquivos migrations/NNN_*.sql ainda não aplicados
+from pathlib import Path
+
+import click
+
+from db import get_db_connection
+
+DIRETORIO_MIGRACOES = Path(__file__).resolve().parent / "migrations"
+
+
+def listar_migracoes():
+    return sorted(DIRETORIO_MIGRACOES.glob("*.sql"))
+
+
+def aplicar_migracoes():
+    """Aplica as migrações pendentes, cada uma na sua transação. Retorna as aplicadas."""
+    aplicadas = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migracoes (
+                    versao TEXT PRIMARY KEY,
+                    aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+
+            cur.execute("SELECT versao FROM schema_migracoes")
+            ja_aplicadas = {row[0] for row in cur.fetchall()}
+
+            for arquivo in listar_migracoes():
+                if arquivo.stem in ja_aplicadas:
+                    continue
+                cur.execute(arquivo.read_text(encoding="utf-8"))
+                cur.execute("INSERT INTO schema_migracoes (versao) VALUES (%s)", (arquivo.stem,))
+                conn.commit()
+                aplicadas.append(arquivo.stem)
+    return aplicadas
+
+
+@click.command("migrar")
+def comando_migrar():
+    """Aplica as migrações SQL pendentes de migrations/."""
+    aplicadas = aplicar_migracoes()
+    if aplicadas:
+        for versao in aplicadas:
+            click.echo(f"✅ Migração aplicada: {versao}")
+    else:
+        click.echo("ℹ️ Nenhuma migração pendente")
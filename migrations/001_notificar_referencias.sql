@@ -0,0 +1,31 @@
+-- Avisa a aplicação (LISTEN referencias_alteradas) quando uma tabela de
+-- enumerados muda, para o cache de referencias.py ser invalidado na hora.
+
+CREATE OR REPLACE FUNCTION notificar_referencias() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('referencias_alteradas', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabela text;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY[
+        'solicitacao_resposta', 'tipo_tramitacao', 'tipologia', 'tecnico',
+        'municipio', 'sistema_viario', 'faixa_servidao', 'curva_inundacao',
+        'apa', 'utp', 'prioridade', 'complexidade', 'setor',
+        'zona_urbana', 'macrozona_municipal'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_referencias ON %I', tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notificar_referencias
+                 AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                 FOR EACH STATEMENT EXECUTE FUNCTION notificar_referencias()',
+            tabela
+        );
+    END LOOP;
+END
+$$;
@@ -0,0 +1,19 @@
+-- A hierarquia de zonas (/referencias/zonas.json) também depende de
+-- zona_apa e zona_utp: invalida o cache quando elas mudam.
+
+DO $$
+DECLARE
+    tabela text;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY['zona_apa', 'zona_utp']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_referencias ON %I', tabela);
+        EXECUTE format(
+            'CREATE TRIGGER trg_notificar_referencias
+                 AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                 FOR EACH STATEMENT EXECUTE FUNCTION notificar_referencias()',
+            tabela
+        );
+    END LOOP;
+END
+$$;
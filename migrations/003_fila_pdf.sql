@@ -0,0 +1,21 @@
+-- Fila de geração de PDFs: a requisição só enfileira, um worker
+-- (flask worker-pdf) renderiza, mescla e registra em pdf_gerados.
+
+CREATE TABLE IF NOT EXISTS fila_pdf (
+    id_job BIGSERIAL PRIMARY KEY,
+    processo_protocolo TEXT NOT NULL,
+    setor_nome TEXT,
+    tipo TEXT NOT NULL CHECK (tipo IN ('cadastro', 'edicao')),
+    formulario JSONB,
+    status TEXT NOT NULL DEFAULT 'PENDENTE'
+        CHECK (status IN ('PENDENTE', 'CONCLUIDO', 'ERRO')),
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    erro TEXT,
+    caminho_pdf TEXT,
+    criado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    concluido_em TIMESTAMP
+);
+
+-- Só os pendentes interessam ao worker
+CREATE INDEX IF NOT EXISTS idx_fila_pdf_pendentes ON fila_pdf (id_job) WHERE status = 'PENDENTE';
+CREATE INDEX IF NOT EXISTS idx_fila_pdf_protocolo ON fila_pdf (processo_protocolo, id_job DESC);
@@ -0,0 +1,18 @@
+-- Índices das listas paginadas do painel (painel.py): cada página é um
+-- range scan por protocolo em vez de ordenar todo o histórico.
+
+-- Disponíveis do setor, mais recentes primeiro
+CREATE INDEX IF NOT EXISTS idx_processo_setor_protocolo
+    ON processo (setor_nome, protocolo DESC);
+
+-- Análises ainda sem responsável
+CREATE INDEX IF NOT EXISTS idx_analise_sem_responsavel
+    ON analise (processo_protocolo)
+    WHERE responsavel_analise IS NULL;
+
+-- Processos capturados por técnico
+CREATE INDEX IF NOT EXISTS idx_analise_responsavel_protocolo
+    ON analise (responsavel_analise, processo_protocolo DESC);
+
+CREATE INDEX IF NOT EXISTS idx_imovel_municipio_matricula
+    ON imovel_municipio (imovel_matricula);
@@ -0,0 +1,4 @@
+-- Último PDF por protocolo (painel.ultimos_pdfs): o DISTINCT ON percorre
+-- este índice e lê só a primeira entrada de cada protocolo.
+CREATE INDEX IF NOT EXISTS idx_pdf_gerados_protocolo_data
+    ON pdf_gerados (processo_protocolo, data_geracao DESC);
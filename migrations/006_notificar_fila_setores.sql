@@ -0,0 +1,52 @@
+-- Avisa a aplicação (LISTEN fila_setores) quando a fila de um setor muda,
+-- para os painéis abertos (/<setor>/eventos, ver eventos.py) se atualizarem
+-- sem recarregar a página. Payload JSON: evento, protocolo, setor e, no
+-- encaminhamento, setor_origem; na captura, o responsável.
+--
+-- NOTIFY só é entregue no COMMIT e avisos iguais na mesma transação são
+-- enviados uma vez só.
+
+CREATE OR REPLACE FUNCTION notificar_fila_setores() RETURNS trigger AS $$
+DECLARE
+    evento jsonb;
+BEGIN
+    IF TG_TABLE_NAME = 'processo' THEN
+        evento := jsonb_build_object(
+            'evento', 'adicionado', 'protocolo', NEW.protocolo, 'setor', NEW.setor_nome);
+
+    ELSIF TG_TABLE_NAME = 'historico' THEN
+        evento := jsonb_build_object(
+            'evento', 'encaminhado', 'protocolo', NEW.processo_protocolo,
+            'setor', NEW.setor_destino, 'setor_origem', NEW.setor_origem);
+
+    ELSIF TG_TABLE_NAME = 'analise' THEN
+        -- Só a captura (responsável passa de NULL para alguém) muda a fila;
+        -- a liberação acontece junto com o encaminhamento, avisado pelo histórico
+        IF OLD.responsavel_analise IS NOT NULL OR NEW.responsavel_analise IS NULL THEN
+            RETURN NULL;
+        END IF;
+        evento := jsonb_build_object(
+            'evento', 'captado', 'protocolo', NEW.processo_protocolo,
+            'setor', (SELECT setor_nome FROM processo WHERE protocolo = NEW.processo_protocolo),
+            'responsavel', NEW.responsavel_analise);
+    END IF;
+
+    PERFORM pg_notify('fila_setores', evento::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notificar_fila_setores ON processo;
+CREATE TRIGGER trg_notificar_fila_setores
+    AFTER INSERT ON processo
+    FOR EACH ROW EXECUTE FUNCTION notificar_fila_setores();
+
+DROP TRIGGER IF EXISTS trg_notificar_fila_setores ON historico;
+CREATE TRIGGER trg_notificar_fila_setores
+    AFTER INSERT ON historico
+    FOR EACH ROW EXECUTE FUNCTION notificar_fila_setores();
+
+DROP TRIGGER IF EXISTS trg_notificar_fila_setores ON analise;
+CREATE TRIGGER trg_notificar_fila_setores
+    AFTER UPDATE OF responsavel_analise ON analise
+    FOR EACH ROW EXECUTE FUNCTION notificar_fila_setores();
@@ -0,0 +1,26 @@
+-- Índices para os filtros que a aplicação de fato usa e que ainda não
+-- tinham índice. Os do painel estão em 004 (setor_nome, responsavel_analise,
+-- imovel_municipio.imovel_matricula) e o do último PDF em 005.
+-- Conferência: `flask verificar-indices` (verificar_indices.py).
+
+-- Busca do id da zona pelo nome da APA/UTP (inserir e preencher_tecnico):
+-- WHERE apa = %s AND nome_zona_apa = %s. Os nomes são gravados sem espaços
+-- nas pontas (008_aparar_espacos.sql), então a consulta compara a coluna.
+CREATE INDEX IF NOT EXISTS idx_zona_apa_apa
+    ON zona_apa (apa, nome_zona_apa);
+
+CREATE INDEX IF NOT EXISTS idx_zona_utp_utp
+    ON zona_utp (utp, nome_zona_utp);
+
+-- Último encaminhamento de cada protocolo (captura.SQL_ATUALIZAR_HISTORICO)
+CREATE INDEX IF NOT EXISTS idx_historico_protocolo_data
+    ON historico (processo_protocolo, data_encaminhamento DESC);
+
+-- Toda atualização de análise filtra por processo_protocolo; chave
+-- estrangeira não cria índice no lado que referencia
+CREATE INDEX IF NOT EXISTS idx_analise_processo
+    ON analise (processo_protocolo);
+
+-- Filtro por município do painel (painel.FILTROS_PAINEL)
+CREATE INDEX IF NOT EXISTS idx_imovel_municipio_nome
+    ON imovel_municipio (municipio_nome);
@@ -0,0 +1,90 @@
+-- Nomes usados como chave de texto (APA, UTP, município) gravados sem
+-- espaços nas pontas, para as comparações não dependerem de TRIM().
+--
+-- aparar_espacos(coluna, ...) é um trigger BEFORE INSERT/UPDATE que aplica
+-- TRIM nas colunas passadas como argumento.
+--
+-- As colunas das tabelas filhas são chaves estrangeiras para
+-- apa.nome_apa, utp.nome_utp e municipio.nome_municipio. As chaves passam
+-- a ser ON UPDATE CASCADE e a tabela pai é corrigida primeiro: a correção
+-- desce para as filhas. Depois são corrigidas as filhas que tinham espaço
+-- só do lado delas. Qualquer conflito (ex.: 'X' e 'X ' na mesma tabela
+-- pai) interrompe a migração com erro: nada fica normalizado pela metade.
+
+CREATE OR REPLACE FUNCTION aparar_espacos() RETURNS trigger AS $$
+DECLARE
+    coluna text;
+    valores jsonb := '{}';
+BEGIN
+    FOREACH coluna IN ARRAY TG_ARGV
+    LOOP
+        valores := valores || jsonb_build_object(coluna, TRIM(to_jsonb(NEW) ->> coluna));
+    END LOOP;
+    NEW := jsonb_populate_record(NEW, valores);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    pai record;
+    alvo record;
+    fk record;
+BEGIN
+    -- 1. Chaves estrangeiras para os nomes passam a propagar o UPDATE
+    FOR pai IN
+        SELECT * FROM (VALUES
+            ('apa', 'nome_apa'),
+            ('utp', 'nome_utp'),
+            ('municipio', 'nome_municipio')
+        ) AS v(tabela, coluna)
+    LOOP
+        FOR fk IN
+            SELECT c.conname, c.conrelid::regclass AS filha, pg_get_constraintdef(c.oid) AS definicao
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = c.confkey[1]
+            WHERE c.contype = 'f'
+              AND c.confrelid = pai.tabela::regclass
+              AND array_length(c.confkey, 1) = 1
+              AND a.attname = pai.coluna
+              AND c.confupdtype <> 'c'
+        LOOP
+            EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.filha, fk.conname);
+            EXECUTE format('ALTER TABLE %s ADD CONSTRAINT %I %s', fk.filha, fk.conname,
+                regexp_replace(
+                    regexp_replace(fk.definicao, ' ON UPDATE (NO ACTION|RESTRICT|SET NULL|SET DEFAULT)', ''),
+                    '(REFERENCES [^)]*\))', '\1 ON UPDATE CASCADE'));
+        END LOOP;
+    END LOOP;
+
+    -- 2. Tabelas pai primeiro (o CASCADE corrige as filhas), depois as filhas
+    FOR alvo IN
+        SELECT * FROM (VALUES
+            ('apa', 'nome_apa'),
+            ('utp', 'nome_utp'),
+            ('municipio', 'nome_municipio'),
+            ('zona_apa', 'apa'),
+            ('zona_utp', 'utp'),
+            ('zona_urbana', 'municipio_nome'),
+            ('macrozona_municipal', 'municipio_nome'),
+            ('imovel_municipio', 'municipio_nome')
+        ) AS v(tabela, coluna)
+    LOOP
+        BEGIN
+            EXECUTE format('UPDATE %I SET %I = TRIM(%I) WHERE %I <> TRIM(%I)',
+                           alvo.tabela, alvo.coluna, alvo.coluna, alvo.coluna, alvo.coluna);
+        EXCEPTION WHEN unique_violation OR foreign_key_violation THEN
+            RAISE EXCEPTION '%.% não pôde ser normalizado: %', alvo.tabela, alvo.coluna, SQLERRM
+                USING HINT = 'Unifique os nomes que só diferem por espaços e rode a migração de novo.';
+        END;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I',
+                       'trg_aparar_' || alvo.coluna, alvo.tabela);
+        EXECUTE format(
+            'CREATE TRIGGER %I BEFORE INSERT OR UPDATE OF %I ON %I
+                 FOR EACH ROW EXECUTE FUNCTION aparar_espacos(%L)',
+            'trg_aparar_' || alvo.coluna, alvo.coluna, alvo.tabela, alvo.coluna
+        );
+    END LOOP;
+END
+$$;
@@ -0,0 +1,30 @@
+-- Prazo de resposta em dias úteis (prazos.py), gravado no cadastro e
+-- preenchido para os processos antigos com `flask recalcular-prazos`.
+
+ALTER TABLE processo ADD COLUMN IF NOT EXISTS data_previsao_resposta date;
+
+-- O prazo é um dia, não um instante: comparações com CURRENT_DATE e com os
+-- limites calculados pelo calendário ficam diretas
+ALTER TABLE processo ALTER COLUMN data_previsao_resposta TYPE date
+    USING data_previsao_resposta::date;
+
+-- Processos do setor por prazo (atrasados / vencendo primeiro)
+CREATE INDEX IF NOT EXISTS idx_processo_setor_prazo
+    ON processo (setor_nome, data_previsao_resposta)
+    WHERE data_previsao_resposta IS NOT NULL;
+
+-- Processos em aberto com prazo, para os painéis ordenarem e filtrarem por
+-- urgência. "Vence em breve" depende do calendário de feriados: o limite é
+-- calculado na aplicação e entra como parâmetro (ver prazos.py).
+CREATE OR REPLACE VIEW prazos_resposta AS
+SELECT p.protocolo,
+       p.setor_nome,
+       p.tipologia,
+       p.data_previsao_resposta,
+       a.responsavel_analise,
+       a.situacao_analise,
+       p.data_previsao_resposta < CURRENT_DATE AS atrasado
+FROM processo p
+LEFT JOIN analise a ON a.processo_protocolo = p.protocolo
+WHERE p.data_previsao_resposta IS NOT NULL
+  AND a.situacao_analise IS DISTINCT FROM 'FINALIZADA';
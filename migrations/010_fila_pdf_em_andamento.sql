@@ -0,0 +1,19 @@
+-- Fila de PDFs sem transação aberta durante a renderização: o worker marca
+-- o job como EM_ANDAMENTO numa transação curta, renderiza e grava o
+-- resultado em outra. Job com falha volta a PENDENTE só depois de
+-- proxima_tentativa (espera crescente entre tentativas).
+
+ALTER TABLE fila_pdf DROP CONSTRAINT IF EXISTS fila_pdf_status_check;
+ALTER TABLE fila_pdf ADD CONSTRAINT fila_pdf_status_check
+    CHECK (status IN ('PENDENTE', 'EM_ANDAMENTO', 'CONCLUIDO', 'ERRO'));
+
+-- iniciado_em: quando o worker pegou o job (EM_ANDAMENTO esquecido por um
+-- worker que caiu volta para a fila depois de FILA_PDF_TEMPO_LIMITE_S)
+ALTER TABLE fila_pdf ADD COLUMN IF NOT EXISTS iniciado_em TIMESTAMP;
+ALTER TABLE fila_pdf ADD COLUMN IF NOT EXISTS proxima_tentativa TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+DROP INDEX IF EXISTS idx_fila_pdf_pendentes;
+CREATE INDEX IF NOT EXISTS idx_fila_pdf_pendentes
+    ON fila_pdf (proxima_tentativa, id_job) WHERE status = 'PENDENTE';
+CREATE INDEX IF NOT EXISTS idx_fila_pdf_em_andamento
+    ON fila_pdf (iniciado_em) WHERE status = 'EM_ANDAMENTO';
@@ -0,0 +1,13 @@
+-- Histogramas de etapas que rodam fora do servidor web (render e mesclagem
+-- de PDF no `flask worker-pdf` e no `flask regerar-pdfs`): cada processo
+-- soma as suas durações aqui e o /metrics do servidor web exporta a tabela.
+-- Uma linha por (etapa, limite do bucket); a linha le = '+Inf' guarda o
+-- total de observações e a soma das durações.
+
+CREATE TABLE IF NOT EXISTS metricas_etapa (
+    etapa TEXT NOT NULL,
+    le TEXT NOT NULL,
+    contagem BIGINT NOT NULL DEFAULT 0,
+    soma DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (etapa, le)
+);
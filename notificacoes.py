@@ -0,0 +1,91 @@
+# notificacoes.py
+# Escuta LISTEN/NOTIFY do PostgreSQL numa thread própria e repassa os avisos
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+
+from db import abrir_conexao_dedicada
+
+logger = logging.getLogger(__name__)
+
+_callbacks = defaultdict(list)
+_thread = None
+_lock = threading.Lock()
+
+
+def registrar_canal(canal, callback):
+    """callback(payload) é chamado a cada NOTIFY recebido em `canal`."""
+    _callbacks[canal].append(callback)
+
+
+def _despachar(notify):
+    for callback in _callbacks.get(notify.channel, []):
+        try:
+            callback(notify.payload)
+        except Exception as e:
+            logger.warning("Erro tratando NOTIFY %s: %s", notify.channel, e)
+
+
+def _escutar():
+    espera = 1
+    primeira = True
+    while True:
+        conn = None
+        try:
+            conn = abrir_conexao_dedicada()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for canal in list(_callbacks):
+                    cur.execute(f'LISTEN "{canal}"')
+            espera = 1
+
+            # Avisos podem ter se perdido enquanto a conexão estava caída:
+            # payload None sinaliza "ressincronize" para cada callback
+            if not primeira:
+                for canal, callbacks in list(_callbacks.items()):
+                    for callback in callbacks:
+                        try:
+                            callback(None)
+                        except Exception as e:
+                            logger.warning("Erro ressincronizando %s: %s", canal, e)
+            primeira = False
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _despachar(conn.notifies.pop(0))
+        except Exception as e:
+            logger.warning("Escuta de notificações interrompida (%s); reconectando em %ss", e, espera)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(espera)
+        espera = min(espera * 2, 60)
+
+
+def iniciar_escuta():
+    """
+    Inicia (uma vez por processo) a thread de LISTEN.
+    Desligada por padrão: ative com ESCUTAR_NOTIFICACOES=1.
+    """
+    global _thread
+    if os.getenv("ESCUTAR_NOTIFICACOES", "0") != "1":
+        return None
+    with _lock:
+        if _thread is None and _callbacks:
+            _thread = threading.Thread(target=_escutar, name="escuta-notify", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def escuta_ativa():
+    """True se a thread de LISTEN foi iniciada neste processo."""
+    return _thread is not None
@@ -0,0 +1,139 @@
+# painel.py
+# Listas paginadas (keyset) do painel do técnico: disponíveis e capturados
+import os
+
+from prazos import URGENCIAS, condicao_urgencia
+
+LIMITE_PADRAO = 25
+LIMITE_MAXIMO = 100
+
+SITUACOES_ANALISE = ['NÃO FINALIZADA', 'FINALIZADA']
+
+# filtro aceito na URL -> coluna
+FILTROS_PAINEL = {
+    "situacao_analise": "a.situacao_analise",
+    "tipologia": "p.tipologia",
+    "municipio": "im.municipio_nome",
+}
+
+
+def ler_limite(valor):
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return LIMITE_PADRAO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def ler_filtros(args):
+    """Filtros preenchidos na query string (ignora os vazios)."""
+    filtros = {nome: args.get(nome) for nome in FILTROS_PAINEL if args.get(nome)}
+    if args.get("urgencia") in URGENCIAS:
+        filtros["urgencia"] = args["urgencia"]
+    return filtros
+
+
+def _pagina(cur, select_from, condicoes, params, apos=None, antes=None, limite=LIMITE_PADRAO):
+    """
+    Executa a consulta paginada por protocolo (mais recentes primeiro).
+
+    - apos: protocolo da última linha da página atual -> próxima página
+    - antes: protocolo da primeira linha da página atual -> página anterior
+
+    Busca limite+1 linhas para saber se existe mais uma página sem COUNT(*).
+    Retorna (linhas, cursor_proxima, cursor_anterior).
+    """
+    condicoes = list(condicoes)
+    params = list(params)
+    if apos:
+        condicoes.append("p.protocolo < %s")
+        params.append(apos)
+        ordem = "DESC"
+    elif antes:
+        condicoes.append("p.protocolo > %s")
+        params.append(antes)
+        ordem = "ASC"
+    else:
+        ordem = "DESC"
+
+    cur.execute(
+        f"{select_from} WHERE {' AND '.join(condicoes)} "
+        f"ORDER BY p.protocolo {ordem} LIMIT %s",
+        params + [limite + 1],
+    )
+    linhas = cur.fetchall()
+    tem_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    if antes:
+        linhas.reverse()
+        cursor_proxima = linhas[-1][0] if linhas else None
+        cursor_anterior = linhas[0][0] if linhas and tem_mais else None
+    else:
+        cursor_proxima = linhas[-1][0] if linhas and tem_mais else None
+        cursor_anterior = linhas[0][0] if linhas and apos else None
+    return linhas, cursor_proxima, cursor_anterior
+
+
+def _condicoes_filtros(filtros):
+    condicoes, params = [], []
+    for nome, valor in filtros.items():
+        if nome == "urgencia":
+            # Faixa de datas calculada com o calendário (prazos.py)
+            condicao, valores = condicao_urgencia(valor)
+            condicoes.append(condicao)
+            params.extend(valores)
+            continue
+        condicoes.append(f"{FILTROS_PAINEL[nome]} = %s")
+        params.append(valor)
+    return condicoes, params
+
+
+def listar_disponiveis(cur, setor_nome, filtros=None, apos=None, antes=None, limite=LIMITE_PADRAO):
+    """Processos do setor SEM responsável na análise."""
+    condicoes, params = _condicoes_filtros(filtros or {})
+    return _pagina(
+        cur,
+        """
+        SELECT p.protocolo, p.tipologia, im.municipio_nome, p.data_previsao_resposta
+        FROM processo p
+        JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
+        LEFT JOIN analise a ON a.processo_protocolo = p.protocolo
+        """,
+        ["p.setor_nome = %s", "a.responsavel_analise IS NULL"] + condicoes,
+        [setor_nome] + params,
+        apos=apos, antes=antes, limite=limite,
+    )
+
+
+def listar_meus(cur, cpf_tecnico, filtros=None, apos=None, antes=None, limite=LIMITE_PADRAO):
+    """Processos capturados pelo técnico (responsável)."""
+    condicoes, params = _condicoes_filtros(filtros or {})
+    return _pagina(
+        cur,
+        """
+        SELECT p.protocolo, p.tipologia, im.municipio_nome, a.situacao_analise, p.data_previsao_resposta
+        FROM processo p
+        JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
+        JOIN analise a ON a.processo_protocolo = p.protocolo
+        """,
+        ["a.responsavel_analise = %s"] + condicoes,
+        [cpf_tecnico] + params,
+        apos=apos, antes=antes, limite=limite,
+    )
+
+
+def ultimos_pdfs(cur, protocolos):
+    """
+    PDF mais recente de cada protocolo: {protocolo: nome_do_arquivo}.
+    O DISTINCT ON resolve no banco e devolve uma linha por protocolo.
+    """
+    if not protocolos:
+        return {}
+    cur.execute("""
+        SELECT DISTINCT ON (processo_protocolo) processo_protocolo, caminho_pdf
+        FROM pdf_gerados
+        WHERE processo_protocolo = ANY(%s)
+        ORDER BY processo_protocolo, data_geracao DESC
+    """, (list(protocolos),))
+    return {protocolo: os.path.basename(caminho) for protocolo, caminho in cur.fetchall()}
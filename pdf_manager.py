@@ -1,9 +1,12 @@
 # pdf_manager.py
+import logging
 import os
 import shutil
 from pathlib import Path
 from PyPDF2 import PdfMerger
 
+logger = logging.getLogger(__name__)
+
 # Configurações - MESMA ESTRUTURA que relatorio.py usa
 RELATORIOS_DIR = Path("RELATORIOS_ANALISE")
 PDFS_DIR = Path("PDFS")  # ← O MESMO que relatorio.py já usa!
@@ -39,11 +42,11 @@ def salvar_relatorio_analise(arquivo_pdf, protocolo):
     # Substitui se já existir (único relatório por processo)
     if caminho_arquivo.exists():
         os.remove(caminho_arquivo)
-        print(f"📄 Substituindo relatório existente para {protocolo}")
+        logger.info("Substituindo relatório existente para %s", protocolo)
     
     arquivo_pdf.save(str(caminho_arquivo))
     
-    print(f"📄 Relatório de análise salvo em: {caminho_arquivo}")
+    logger.info("Relatório de análise salvo em: %s", caminho_arquivo)
     return str(caminho_arquivo)
 
 def obter_relatorio_analise(protocolo):
@@ -53,9 +56,11 @@ def obter_relatorio_analise(protocolo):
     caminho = RELATORIOS_DIR / f"{protocolo}_relatorio.pdf"
     return str(caminho) if caminho.exists() else None
 
-def mesclar_com_relatorio_analise(pdf_principal_path, protocolo):
+def mesclar_com_relatorio_analise(pdf_principal_path, protocolo, estrito=False):
     """
-    Função CRÍTICA: Mescla o PDF gerado pelo relatorio.py com anexo
+    Função CRÍTICA: Mescla o PDF gerado pelo relatorio.py com anexo.
+    Se a mescla falhar, devolve o PDF sem o anexo; com estrito=True levanta
+    a exceção (lotes que precisam listar a falha, ver regerar_pdfs.py).
     """
     if not os.path.exists(pdf_principal_path):
         return pdf_principal_path
@@ -92,11 +97,13 @@ def mesclar_com_relatorio_analise(pdf_principal_path, protocolo):
         merger.write(str(output_path))
         merger.close()
         
-        print(f"✅ PDF mesclado (relatorio.py + anexo): {output_path}")
+        logger.info("PDF mesclado (relatorio.py + anexo): %s", output_path)
         return str(output_path)
         
     except Exception as e:
-        print(f"⚠️  Erro ao mesclar PDFs: {e}")
+        if estrito:
+            raise
+        logger.warning("Erro ao mesclar PDFs: %s", e)
         # Fallback: retorna o PDF original do relatorio.py
         return pdf_principal_path
 
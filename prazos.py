@@ -0,0 +1,121 @@
+# prazos.py
+# Prazo de resposta dos processos em dias úteis (calendario.py)
+#
+# Variáveis de ambiente:
+#   PRAZO_RESPOSTA_DIAS_UTEIS  prazo a partir da data de entrada (padrão 28,
+#                              o equivalente aos antigos 40 dias corridos)
+#   PRAZO_AVISO_DIAS_UTEIS     "vence em breve": prazo dentro de N dias úteis (padrão 5)
+import os
+import time
+from datetime import date
+
+import click
+from psycopg2.extras import execute_values
+
+from calendario import obter_calendario, prazo_em_dias_uteis, somar_dias_uteis
+from db import get_db_connection
+
+PRAZO_RESPOSTA = int(os.getenv("PRAZO_RESPOSTA_DIAS_UTEIS", "28"))
+JANELA_AVISO = int(os.getenv("PRAZO_AVISO_DIAS_UTEIS", "5"))
+
+URGENCIAS = ["atrasado", "vence_em_breve"]
+
+TAMANHO_LOTE = 5000
+
+
+def calcular_prazo(data_entrada):
+    return prazo_em_dias_uteis(data_entrada, PRAZO_RESPOSTA)
+
+
+def limites_urgencia(hoje=None):
+    """(hoje, último dia que conta como "vence em breve")."""
+    hoje = hoje or date.today()
+    return hoje, prazo_em_dias_uteis(hoje, JANELA_AVISO)
+
+
+def condicao_urgencia(urgencia, coluna="p.data_previsao_resposta", situacao="a.situacao_analise"):
+    """
+    (condição SQL, parâmetros) para filtrar por urgência, ou None se inválida.
+    Análise finalizada não tem prazo a cumprir (como na view prazos_resposta).
+    """
+    hoje, limite = limites_urgencia()
+    em_aberto = f"{situacao} IS DISTINCT FROM 'FINALIZADA'"
+    if urgencia == "atrasado":
+        return f"{coluna} < %s AND {em_aberto}", [hoje]
+    if urgencia == "vence_em_breve":
+        return f"{coluna} BETWEEN %s AND %s AND {em_aberto}", [hoje, limite]
+    return None
+
+
+def classificar(prazo, hoje, limite):
+    """Urgência de um prazo para exibição (classe CSS do painel)."""
+    if prazo is None:
+        return None
+    if prazo < hoje:
+        return "atrasado"
+    if prazo <= limite:
+        return "vence_em_breve"
+    return "no_prazo"
+
+
+def listar_urgentes(cur, setor_nome, limite=10):
+    """Processos em aberto do setor com prazo mais próximo (view prazos_resposta)."""
+    cur.execute("""
+        SELECT protocolo, tipologia, data_previsao_resposta, responsavel_analise
+        FROM prazos_resposta
+        WHERE setor_nome = %s
+        ORDER BY data_previsao_resposta, protocolo
+        LIMIT %s
+    """, (setor_nome, limite))
+    return cur.fetchall()
+
+
+def recalcular_prazos(todos=False, tamanho_lote=TAMANHO_LOTE, progresso=lambda lidas, alteradas: None):
+    """
+    Preenche data_previsao_resposta a partir de data_entrada, em lotes por
+    protocolo. Sem `todos`, só os processos ainda sem prazo.
+    Retorna (linhas lidas, linhas alteradas).
+    """
+    calendario = obter_calendario()
+    filtro = "" if todos else "AND data_previsao_resposta IS NULL"
+    ultimo, lidas, alteradas = "", 0, 0
+    while True:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT protocolo, data_entrada, data_previsao_resposta
+                    FROM processo
+                    WHERE protocolo > %s AND data_entrada IS NOT NULL {filtro}
+                    ORDER BY protocolo
+                    LIMIT %s
+                """, (ultimo, tamanho_lote))
+                linhas = cur.fetchall()
+                if not linhas:
+                    break
+                prazos = somar_dias_uteis([l[1] for l in linhas], PRAZO_RESPOSTA, calendario)
+                mudancas = [(l[0], prazo) for l, prazo in zip(linhas, prazos) if prazo != l[2]]
+                if mudancas:
+                    execute_values(cur, """
+                        UPDATE processo p
+                        SET data_previsao_resposta = v.prazo
+                        FROM (VALUES %s) AS v(protocolo, prazo)
+                        WHERE p.protocolo = v.protocolo
+                    """, mudancas, template="(%s, %s::date)", page_size=len(mudancas))
+
+        ultimo = linhas[-1][0]
+        lidas += len(linhas)
+        alteradas += len(mudancas)
+        progresso(lidas, alteradas)
+    return lidas, alteradas
+
+
+@click.command("recalcular-prazos")
+@click.option("--todos", is_flag=True, help="Recalcula também quem já tem prazo (ex.: feriados mudaram).")
+@click.option("--lote", type=int, default=TAMANHO_LOTE, show_default=True, help="Processos por lote.")
+def comando_recalcular_prazos(todos, lote):
+    """Grava o prazo de resposta em dias úteis dos processos."""
+    inicio = time.monotonic()
+    lidas, alteradas = recalcular_prazos(
+        todos, lote, lambda lidas, alteradas: click.echo(f"  {lidas} lidos, {alteradas} alterados")
+    )
+    click.echo(f"✅ {lidas} processos em {time.monotonic() - inicio:.1f}s; prazos gravados: {alteradas}")
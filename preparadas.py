@@ -0,0 +1,84 @@
+# preparadas.py
+# Registro de prepared statements para o SQL fixo dos caminhos mais usados
+#
+# Cada declaração é preparada (PREPARE) uma vez por conexão do pool, na
+# primeira vez em que é usada, e depois executada por nome (EXECUTE): o
+# PostgreSQL deixa de analisar e planejar o mesmo texto a cada chamada.
+#
+# DB_PREPARAR=0 desliga (ex.: atrás de um PgBouncer em modo transaction, onde
+# a sessão que recebeu o PREPARE não é necessariamente a do EXECUTE); nesse
+# caso executar() roda o SQL original com cur.execute.
+#
+# Comparação com e sem: python -m benchmarks.bench_preparadas
+import os
+import re
+
+import psycopg2.extensions
+
+ATIVO = os.getenv("DB_PREPARAR", "1") != "0"
+
+_declaracoes = {}
+_RE_PARAMETRO = re.compile(r"%s")
+
+
+class ConexaoPreparada(psycopg2.extensions.connection):
+    """Conexão que lembra quais declarações já foram preparadas na sessão."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+class Declaracao:
+    """SQL com parâmetros %s posicionais, identificado por um nome único."""
+
+    def __init__(self, nome, sql):
+        if "%(" in sql:
+            raise ValueError(f"{nome}: use só parâmetros posicionais (%s)")
+        self.nome = nome
+        self.sql = sql
+        self.parametros = len(_RE_PARAMETRO.findall(sql))
+
+        contador = iter(range(1, self.parametros + 1))
+        corpo = _RE_PARAMETRO.sub(lambda _: f"${next(contador)}", sql).strip().rstrip(";")
+        self.sql_preparar = f"PREPARE {nome} AS {corpo}"
+        self.sql_executar = f"EXECUTE {nome}"
+        if self.parametros:
+            self.sql_executar += " (" + ", ".join(["%s"] * self.parametros) + ")"
+
+    def __repr__(self):
+        return f"<Declaracao {self.nome}>"
+
+
+def declarar(nome, sql):
+    """Registra (uma vez, no import do módulo que usa) e devolve a declaração."""
+    existente = _declaracoes.get(nome)
+    if existente is not None:
+        if existente.sql != sql:
+            raise ValueError(f"Declaração {nome!r} registrada com SQL diferente")
+        return existente
+    declaracao = _declaracoes[nome] = Declaracao(nome, sql)
+    return declaracao
+
+
+def declaracoes():
+    """Declarações registradas, por nome."""
+    return dict(_declaracoes)
+
+
+def executar(cur, declaracao, params=(), preparar=None):
+    """
+    cur.execute da declaração, preparando-a antes se esta conexão ainda não
+    a conhece. `preparar` sobrepõe DB_PREPARAR (usado pelo benchmark).
+    """
+    preparadas = getattr(cur.connection, "preparadas", None)
+    if not (ATIVO if preparar is None else preparar) or preparadas is None:
+        # Desligado ou conexão fora do pool (ex.: abrir_conexao_dedicada)
+        cur.execute(declaracao.sql, params)
+        return
+    if declaracao.nome not in preparadas:
+        # PREPARE não é transacional: sobrevive a um rollback posterior e vale
+        # até a conexão ser fechada (ver vida_maxima do pool)
+        cur.execute(declaracao.sql_preparar)
+        preparadas.add(declaracao.nome)
+    cur.execute(declaracao.sql_executar, params)
@@ -0,0 +1,112 @@
+# recalcular_dias_uteis.py
+# Recalcula dias_uteis_localizacao (processo) e dias_uteis_analise (analise)
+# com o calendário atual (calendario.py), ex.: depois de incluir feriados
+import time
+
+import click
+from psycopg2.extras import execute_values
+
+from calendario import contar_dias_uteis, obter_calendario
+from db import get_db_connection
+
+TAMANHO_LOTE = 5000
+
+SQL_LOTE = """
+    SELECT p.protocolo,
+           p.inicio_localizacao, p.fim_localizacao, p.dias_uteis_localizacao,
+           a.inicio_analise, a.fim_analise, a.dias_uteis_analise
+    FROM processo p
+    LEFT JOIN analise a ON a.processo_protocolo = p.protocolo
+    WHERE p.protocolo > %s
+    ORDER BY p.protocolo
+    LIMIT %s
+"""
+
+SQL_ATUALIZAR_LOCALIZACAO = """
+    UPDATE processo p
+    SET dias_uteis_localizacao = v.dias
+    FROM (VALUES %s) AS v(protocolo, dias)
+    WHERE p.protocolo = v.protocolo
+"""
+
+SQL_ATUALIZAR_ANALISE = """
+    UPDATE analise a
+    SET dias_uteis_analise = v.dias
+    FROM (VALUES %s) AS v(protocolo, dias)
+    WHERE a.processo_protocolo = v.protocolo
+"""
+
+# Sem o cast, um lote só de NULLs vira coluna text no VALUES
+MODELO_VALORES = "(%s, %s::integer)"
+
+
+def recalcular_lote(linhas, calendario):
+    """
+    Novos valores do lote, numa única chamada de busday_count para as duas
+    colunas. Retorna ([(protocolo, dias)] de localização, idem de análise),
+    só com as linhas que mudaram.
+    """
+    n = len(linhas)
+    contagens = contar_dias_uteis(
+        [l[1] for l in linhas] + [l[4] for l in linhas],
+        [l[2] for l in linhas] + [l[5] for l in linhas],
+        calendario,
+    )
+    localizacao, analise = [], []
+    for linha, dias_loc, dias_an in zip(linhas, contagens[:n], contagens[n:]):
+        protocolo = linha[0]
+        if dias_loc != linha[3]:
+            localizacao.append((protocolo, dias_loc))
+        # Processo sem análise (LEFT JOIN): não há linha para atualizar
+        if linha[4] is not None and dias_an != linha[6]:
+            analise.append((protocolo, dias_an))
+    return localizacao, analise
+
+
+def recalcular_dias_uteis(tamanho_lote=TAMANHO_LOTE, simular=False,
+                          progresso=lambda lidas, loc, an: None):
+    """
+    Percorre processo/analise em lotes por protocolo, cada lote na sua
+    transação. Retorna (linhas lidas, localizações alteradas, análises alteradas).
+    """
+    calendario = obter_calendario()
+    ultimo, lidas, total_loc, total_an = "", 0, 0, 0
+    while True:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_LOTE, (ultimo, tamanho_lote))
+                linhas = cur.fetchall()
+                if not linhas:
+                    break
+                localizacao, analise = recalcular_lote(linhas, calendario)
+                if not simular:
+                    if localizacao:
+                        execute_values(cur, SQL_ATUALIZAR_LOCALIZACAO, localizacao,
+                                       template=MODELO_VALORES, page_size=len(localizacao))
+                    if analise:
+                        execute_values(cur, SQL_ATUALIZAR_ANALISE, analise,
+                                       template=MODELO_VALORES, page_size=len(analise))
+
+        ultimo = linhas[-1][0]
+        lidas += len(linhas)
+        total_loc += len(localizacao)
+        total_an += len(analise)
+        progresso(lidas, total_loc, total_an)
+    return lidas, total_loc, total_an
+
+
+@click.command("recalcular-dias-uteis")
+@click.option("--lote", type=int, default=TAMANHO_LOTE, show_default=True, help="Processos por lote.")
+@click.option("--simular", is_flag=True, help="Só conta o que mudaria, sem gravar.")
+def comando_recalcular_dias_uteis(lote, simular):
+    """Recalcula os dias úteis de localização e de análise com o calendário atual."""
+    inicio = time.monotonic()
+
+    def progresso(lidas, loc, an):
+        click.echo(f"  {lidas} processos lidos, {loc} localizações e {an} análises alteradas")
+
+    lidas, loc, an = recalcular_dias_uteis(lote, simular, progresso)
+    duracao = time.monotonic() - inicio
+    verbo = "mudariam" if simular else "atualizadas"
+    click.echo(f"✅ {lidas} processos em {duracao:.1f}s ({lidas / duracao if duracao else 0:.0f}/s); "
+               f"{verbo}: {loc} localizações, {an} análises")
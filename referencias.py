@@ -0,0 +1,215 @@
+# referencias.py
+# Cache em memória das tabelas de enumerados usadas pelos formulários
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Nome da lista -> consulta. Consultas de uma coluna viram lista de valores,
+# consultas de várias colunas viram lista de tuplas (igual ao cur.fetchall()).
+CONSULTAS_REFERENCIA = {
+    "solicitacao_resposta": "SELECT tipo_solicitacao_resposta FROM solicitacao_resposta",
+    "tramitacao": "SELECT nome_tipo_tramitacao FROM tipo_tramitacao",
+    "tipologia": "SELECT nome_tipologia FROM tipologia",
+    "tecnico": "SELECT cpf_tecnico, nome_tecnico, setor_tecnico FROM tecnico",
+    "municipio": "SELECT nome_municipio FROM municipio",
+    "sistema_viario": "SELECT DISTINCT classificacao_metropolitana FROM sistema_viario WHERE classificacao_metropolitana IS NOT NULL",
+    "faixa_servidao": "SELECT DISTINCT tipo FROM faixa_servidao WHERE tipo IS NOT NULL",
+    "curva_inundacao": "SELECT DISTINCT tipo_curva FROM curva_inundacao WHERE tipo_curva IS NOT NULL",
+    "apa": "SELECT DISTINCT nome_apa FROM apa WHERE nome_apa IS NOT NULL",
+    "utp": "SELECT DISTINCT nome_utp FROM utp WHERE nome_utp IS NOT NULL",
+    "prioridade": "SELECT DISTINCT tipo_prioridade FROM prioridade WHERE tipo_prioridade IS NOT NULL",
+    "complexidade": "SELECT DISTINCT nivel_complexidade FROM complexidade WHERE nivel_complexidade IS NOT NULL",
+    "setor": "SELECT DISTINCT nome_setor FROM setor WHERE nome_setor IS NOT NULL ORDER BY nome_setor",
+    # O formulário técnico (blueprints) lê outras colunas destas duas tabelas
+    "curva_inundacao_tecnico": "SELECT DISTINCT curva_inundacao FROM curva_inundacao WHERE curva_inundacao IS NOT NULL",
+    "faixa_servidao_tecnico": "SELECT DISTINCT faixa_servidao FROM faixa_servidao WHERE faixa_servidao IS NOT NULL",
+    "zonas_urbanas": "SELECT id_zona_urbana, sigla_zona_urbana FROM zona_urbana",
+    "macrozonas": "SELECT id_macrozona, sigla_macrozona FROM macrozona_municipal",
+    # Pares (pai, zona) usados para montar a hierarquia de zonas (ver hierarquia_zonas())
+    "hierarquia_zona_urbana": "SELECT DISTINCT municipio_nome AS pai, sigla_zona_urbana AS zona FROM zona_urbana WHERE municipio_nome IS NOT NULL ORDER BY 1, 2",
+    "hierarquia_macrozona": "SELECT DISTINCT municipio_nome AS pai, sigla_macrozona AS zona FROM macrozona_municipal WHERE municipio_nome IS NOT NULL ORDER BY 1, 2",
+    "hierarquia_zona_apa": "SELECT DISTINCT apa AS pai, nome_zona_apa AS zona FROM zona_apa WHERE apa IS NOT NULL ORDER BY 1, 2",
+    "hierarquia_zona_utp": "SELECT DISTINCT utp AS pai, nome_zona_utp AS zona FROM zona_utp WHERE utp IS NOT NULL ORDER BY 1, 2",
+}
+
+# Canal do NOTIFY disparado quando uma tabela de referência muda
+# (ver migrations/001_notificar_referencias.sql)
+CANAL_REFERENCIAS = "referencias_alteradas"
+
+SITUACOES_LOCALIZACAO = ['LOCALIZADA', 'NÃO PRECISA LOCALIZAR']
+MANANCIAL = ['SUPERFICIAL', 'SUBTERRÂNEA', 'SUPERFICIAL-SUBTERRÂNEA']
+
+
+def carregar_referencias_sequencial(cur):
+    """Executa as consultas de CONSULTAS_REFERENCIA uma a uma (uma ida ao banco cada)."""
+    dados = {}
+    for nome, sql in CONSULTAS_REFERENCIA.items():
+        cur.execute(sql)
+        linhas = cur.fetchall()
+        if len(cur.description) == 1:
+            dados[nome] = [row[0] for row in linhas]
+        else:
+            dados[nome] = [tuple(row) for row in linhas]
+    return dados
+
+
+def montar_consulta_agrupada(consultas=CONSULTAS_REFERENCIA):
+    """
+    Junta todas as consultas num único SELECT: cada lista vira uma coluna
+    json com as linhas da consulta original (json_agg de row_to_json).
+    """
+    colunas = [
+        f"(SELECT COALESCE(json_agg(row_to_json(t)), '[]'::json) FROM ({sql}) t) AS \"{nome}\""
+        for nome, sql in consultas.items()
+    ]
+    return "SELECT\n    " + ",\n    ".join(colunas)
+
+
+CONSULTA_AGRUPADA = montar_consulta_agrupada()
+
+
+def carregar_referencias(cur):
+    """
+    Carrega todas as listas numa única ida ao banco.
+    Devolve o mesmo formato de carregar_referencias_sequencial().
+    """
+    cur.execute(CONSULTA_AGRUPADA)
+    row = cur.fetchone()
+    dados = {}
+    for desc, linhas in zip(cur.description, row):
+        valores = []
+        for linha in linhas:
+            if len(linha) == 1:
+                valores.append(next(iter(linha.values())))
+            else:
+                valores.append(tuple(linha.values()))
+        dados[desc[0]] = valores
+    return dados
+
+
+class CacheReferencias:
+    """
+    Mantém as listas de referência em memória por `ttl` segundos.
+
+    Se a recarga falhar e já houver dados, continua servindo a versão anterior
+    em vez de derrubar as páginas de formulário.
+    """
+
+    def __init__(self, ttl=3600, carregador=carregar_referencias):
+        self.ttl = ttl
+        self._carregador = carregador
+        self._lock = threading.Lock()
+        self._dados = None
+        self._carregado_em = 0.0
+        # invalidar() incrementa _pedidas; o cache está válido enquanto a
+        # última carga tiver sido feita depois do último pedido.
+        self._pedidas = 0
+        self._atendidas = 0
+        self.versao = 0
+
+    def _expirado(self):
+        return (
+            self._dados is None
+            or self._pedidas != self._atendidas
+            or time.monotonic() - self._carregado_em > self.ttl
+        )
+
+    def obter(self):
+        """Listas de referência (não modificar: são compartilhadas entre requisições)."""
+        if not self._expirado():
+            return self._dados
+
+        with self._lock:
+            if not self._expirado():
+                return self._dados
+            pedidas = self._pedidas
+            try:
+                with get_db_connection() as conn:
+                    with conn.cursor() as cur:
+                        dados = self._carregador(cur)
+            except Exception as e:
+                if self._dados is None:
+                    raise
+                logger.warning("Falha ao recarregar referências, usando versão em cache: %s", e)
+                self._carregado_em = time.monotonic()
+                return self._dados
+
+            self._dados = dados
+            self._carregado_em = time.monotonic()
+            self._atendidas = pedidas
+            self.versao += 1
+            return self._dados
+
+    def invalidar(self):
+        """Força recarga na próxima leitura."""
+        self._pedidas += 1
+
+
+_cache = CacheReferencias(ttl=int(os.getenv("REFERENCIAS_TTL", "3600")))
+
+
+def obter_referencias():
+    return _cache.obter()
+
+
+def invalidar_referencias(*_):
+    _cache.invalidar()
+
+
+def versao_referencias():
+    return _cache.versao
+
+
+def _agrupar(pares):
+    agrupado = {}
+    for pai, zona in pares:
+        agrupado.setdefault(pai, []).append(zona)
+    return agrupado
+
+
+# (referências de origem, dados, corpo_json, etag) — trocado de uma vez só
+_hierarquia = (None, None, None, None)
+_hierarquia_lock = threading.Lock()
+
+
+def hierarquia_zonas():
+    """
+    Documento com toda a hierarquia de zonas, montado uma vez por carga do cache:
+
+        {"municipios": {municipio: {"zonas_urbanas": [...], "macrozonas": [...]}},
+         "apas": {apa: [zonas]}, "utps": {utp: [zonas]}}
+
+    Retorna (dados, corpo_json, etag). O etag muda só quando o conteúdo muda.
+    """
+    global _hierarquia
+    ref = obter_referencias()
+    atual = _hierarquia
+    if atual[0] is ref:
+        return atual[1:]
+
+    with _hierarquia_lock:
+        if _hierarquia[0] is not ref:
+            zonas_urbanas = _agrupar(ref["hierarquia_zona_urbana"])
+            macrozonas = _agrupar(ref["hierarquia_macrozona"])
+            municipios = {
+                municipio: {
+                    "zonas_urbanas": zonas_urbanas.get(municipio, []),
+                    "macrozonas": macrozonas.get(municipio, []),
+                }
+                for municipio in sorted(set(zonas_urbanas) | set(macrozonas))
+            }
+            dados = {
+                "municipios": municipios,
+                "apas": _agrupar(ref["hierarquia_zona_apa"]),
+                "utps": _agrupar(ref["hierarquia_zona_utp"]),
+            }
+            corpo = json.dumps(dados, ensure_ascii=False, sort_keys=True).encode("utf-8")
+            _hierarquia = (ref, dados, corpo, hashlib.sha1(corpo).hexdigest()[:16])
+        return _hierarquia[1:]
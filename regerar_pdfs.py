@@ -0,0 +1,132 @@
+# regerar_pdfs.py
+# Reemite em lote os PDFs de processos finalizados (ex.: após mudar o layout
+# do relatório ou as LEGENDAS_AMIGAVEIS), renderizando em vários processos
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import click
+from psycopg2.extras import execute_values
+
+from db import get_db_connection
+from relatorio import carregar_segundo_preenchimento_lote, renderizar_pdf_segundo_preenchimento
+from pdf_manager import mesclar_com_relatorio_analise
+from registro import configurar_logging_pool
+from metricas import cronometrar, registrar_etapas
+
+TAMANHO_LOTE_INSERT = 200
+
+
+def carregar_finalizados(cur, setor=None, desde=None, ate=None, protocolos=None):
+    """
+    Processos finalizados que batem com o filtro, com os dados do PDF de
+    edição carregados em lote (número fixo de consultas, ver
+    relatorio.carregar_segundo_preenchimento_lote).
+    Retorna lista de (protocolo, setor, dados).
+    """
+    condicoes, params = ["a.situacao_analise = 'FINALIZADA'"], []
+    if setor:
+        condicoes.append("p.setor_nome = %s")
+        params.append(setor)
+    if desde:
+        condicoes.append("a.fim_analise >= %s")
+        params.append(desde)
+    if ate:
+        condicoes.append("a.fim_analise < %s")
+        params.append(ate + timedelta(days=1))
+    if protocolos:
+        condicoes.append("p.protocolo = ANY(%s)")
+        params.append(list(protocolos))
+
+    cur.execute(f"""
+        SELECT p.protocolo, p.setor_nome
+        FROM processo p
+        JOIN analise a ON a.processo_protocolo = p.protocolo
+        WHERE {" AND ".join(condicoes)}
+        ORDER BY p.protocolo
+    """, params)
+    setores = dict(cur.fetchall())
+
+    dados_por_protocolo = carregar_segundo_preenchimento_lote(cur, setores)
+    return [(protocolo, setores[protocolo], dados) for protocolo, dados in dados_por_protocolo.items()]
+
+
+def _renderizar(protocolo, dados):
+    # Roda nos processos do pool: só arquivo, sem banco. As durações voltam
+    # com o caminho e o processo principal as grava em metricas_etapa
+    duracoes = []
+    nome_arquivo = f"{protocolo}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+    caminho_pdf = os.path.join("PDFS", nome_arquivo)
+    os.makedirs("PDFS", exist_ok=True)
+    with cronometrar("pdf_render", duracoes):
+        renderizar_pdf_segundo_preenchimento(dados, caminho_pdf)
+    # Falha na mescla entra nas falhas do comando, em vez de gravar o PDF sem o anexo
+    with cronometrar("pdf_merge", duracoes):
+        caminho_pdf = mesclar_com_relatorio_analise(caminho_pdf, protocolo, estrito=True)
+    return caminho_pdf, duracoes
+
+
+def _registrar(gerados, duracoes):
+    if not gerados:
+        return
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO pdf_gerados (processo_protocolo, setor_nome, caminho_pdf, data_geracao)
+                VALUES %s
+            """, gerados)
+            registrar_etapas(cur, duracoes)
+
+
+def regerar_pdfs(setor=None, desde=None, ate=None, protocolos=None, processos=None,
+                 progresso=lambda feitos, total: None):
+    """Regera os PDFs do filtro. Retorna (quantidade gerada, [(protocolo, erro)])."""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            finalizados = carregar_finalizados(cur, setor, desde, ate, protocolos)
+
+    total = len(finalizados)
+    gerados, falhas, pendentes_insert, duracoes = 0, [], [], []
+    with ProcessPoolExecutor(max_workers=processos, initializer=configurar_logging_pool) as executor:
+        futuros = {
+            executor.submit(_renderizar, protocolo, dados): (protocolo, setor_pdf)
+            for protocolo, setor_pdf, dados in finalizados
+        }
+        for feitos, futuro in enumerate(as_completed(futuros), start=1):
+            protocolo, setor_pdf = futuros[futuro]
+            try:
+                caminho, duracoes_pdf = futuro.result()
+            except Exception as e:
+                falhas.append((protocolo, str(e)))
+            else:
+                pendentes_insert.append((protocolo, setor_pdf, caminho, datetime.now()))
+                duracoes += duracoes_pdf
+                gerados += 1
+            if len(pendentes_insert) >= TAMANHO_LOTE_INSERT:
+                _registrar(pendentes_insert, duracoes)
+                pendentes_insert, duracoes = [], []
+            progresso(feitos, total)
+
+    _registrar(pendentes_insert, duracoes)
+    return gerados, falhas
+
+
+@click.command("regerar-pdfs")
+@click.option("--setor", help="Só processos deste setor (ex.: DIG).")
+@click.option("--desde", type=click.DateTime(formats=["%Y-%m-%d"]), help="Finalizados a partir de AAAA-MM-DD.")
+@click.option("--ate", type=click.DateTime(formats=["%Y-%m-%d"]), help="Finalizados até AAAA-MM-DD (inclusive).")
+@click.option("--protocolo", "protocolos", multiple=True, help="Protocolo específico (pode repetir).")
+@click.option("--processos", type=int, default=None, help="Processos de renderização (padrão: núcleos da CPU).")
+def comando_regerar_pdfs(setor, desde, ate, protocolos, processos):
+    """Regera os PDFs de processos finalizados e registra em pdf_gerados."""
+    def progresso(feitos, total):
+        if feitos == total or feitos % 50 == 0:
+            click.echo(f"  {feitos}/{total}")
+
+    gerados, falhas = regerar_pdfs(setor, desde, ate, protocolos, processos, progresso)
+    click.echo(f"✅ PDFs gerados: {gerados}")
+    if falhas:
+        click.echo(f"❌ Falhas: {len(falhas)}")
+        for protocolo, erro in falhas:
+            click.echo(f"   {protocolo}: {erro}")
+        raise SystemExit(1)
@@ -0,0 +1,211 @@
+# registro.py
+# Logging da aplicação: JSON (ou texto) por linha, id de requisição,
+# CPF/CNPJ mascarados e escrita fora da thread da requisição
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+
+# Só CPF/CNPJ pontuados (000.000.000-00, 00.000.000/0000-00): sequências de
+# 11 ou 14 dígitos também são protocolos, matrículas e carimbos de data nos
+# nomes de PDF. CPF/CNPJ sem pontuação se protege pelo nome do campo
+# (redigir_campos), nunca passando o valor cru na mensagem.
+_RE_CNPJ = re.compile(r"(?<!\d)\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}(?!\d)")
+_RE_CPF = re.compile(r"(?<!\d)\d{3}\.\d{3}\.\d{3}-\d{2}(?!\d)")
+
+# Campos de formulário/extra cujo valor é sempre mascarado por inteiro
+# (responsavel_* guardam o CPF do técnico)
+_CAMPOS_SENSIVEIS = ("cpf", "cnpj", "responsavel")
+
+# Atributos padrão do LogRecord (o resto veio de extra= e vai para o JSON)
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+def redigir(texto):
+    """Mascara CPFs e CNPJs num texto livre."""
+    texto = _RE_CNPJ.sub("[CNPJ]", texto)
+    return _RE_CPF.sub("[CPF]", texto)
+
+
+def campo_sensivel(nome):
+    nome = nome.lower()
+    return any(s in nome for s in _CAMPOS_SENSIVEIS)
+
+
+def redigir_campos(dados):
+    """Cópia de um dict (ex.: formulário) com CPF/CNPJ mascarados."""
+    return {
+        k: "[REDIGIDO]" if campo_sensivel(k) and v else (redigir(v) if isinstance(v, str) else v)
+        for k, v in dados.items()
+    }
+
+
+def _request_id_atual():
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return None
+    if has_request_context():
+        return g.get("request_id")
+    return None
+
+
+class FiltroRequisicao(logging.Filter):
+    """Anota o registro com o id da requisição em andamento ("-" fora dela)."""
+
+    def filter(self, record):
+        record.request_id = _request_id_atual() or "-"
+        return True
+
+
+class _QueueHandlerRedigido(logging.handlers.QueueHandler):
+    # prepare() roda na thread de quem logou: a mensagem já sai formatada
+    # (inclusive traceback) e mascarada antes de entrar na fila
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.msg = redigir(record.msg)
+        _redigir_extras(record)
+        return record
+
+
+def _redigir_extras(record):
+    for chave, valor in list(vars(record).items()):
+        if chave in _ATRIBUTOS_PADRAO:
+            continue
+        if campo_sensivel(chave) and valor:
+            setattr(record, chave, "[REDIGIDO]")
+        elif isinstance(valor, str):
+            setattr(record, chave, redigir(valor))
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro; campos de extra= entram como chaves."""
+
+    def format(self, record):
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+FORMATO_TEXTO = "%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s"
+
+
+def _niveis_por_modulo(texto):
+    """LOG_NIVEIS="setores.routes=DEBUG,fila_pdf=WARNING" -> {modulo: nivel}."""
+    niveis = {}
+    for item in (texto or "").split(","):
+        if "=" in item:
+            modulo, nivel = item.split("=", 1)
+            niveis[modulo.strip()] = nivel.strip().upper()
+    return niveis
+
+
+def _saidas():
+    if os.getenv("LOG_FORMATO", "json") == "texto":
+        formatador = logging.Formatter(FORMATO_TEXTO)
+    else:
+        formatador = FormatadorJSON()
+
+    saidas = [logging.StreamHandler(sys.stdout)]
+    if os.getenv("LOG_ARQUIVO"):
+        saidas.append(logging.handlers.WatchedFileHandler(os.getenv("LOG_ARQUIVO"), encoding="utf-8"))
+    for saida in saidas:
+        saida.setFormatter(formatador)
+    return saidas
+
+
+def _configurar_raiz(handlers, nivel):
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    for handler in handlers:
+        raiz.addHandler(handler)
+    raiz.setLevel(nivel.upper())
+    for modulo, nivel_modulo in _niveis_por_modulo(os.getenv("LOG_NIVEIS")).items():
+        logging.getLogger(modulo).setLevel(nivel_modulo)
+
+
+def configurar_logging(app=None):
+    """
+    Configura o logger raiz uma única vez por processo.
+
+    - LOG_NIVEL: nível geral (padrão INFO; DEBUG com app.debug/FLASK_DEBUG=1)
+    - LOG_NIVEIS: níveis por módulo, ex. "setores.routes=DEBUG,werkzeug=WARNING"
+    - LOG_FORMATO: "json" (padrão) ou "texto"
+    - LOG_ARQUIVO: arquivo adicional além do stdout
+
+    Os handlers de saída rodam num QueueListener: a requisição só enfileira.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    debug = (app is not None and app.debug) or os.getenv("FLASK_DEBUG") == "1"
+    nivel = os.getenv("LOG_NIVEL") or ("DEBUG" if debug else "INFO")
+    saidas = _saidas()
+
+    fila = queue.SimpleQueue()
+    entrada = _QueueHandlerRedigido(fila)
+    entrada.addFilter(FiltroRequisicao())
+    _configurar_raiz([entrada], nivel)
+
+    _listener = logging.handlers.QueueListener(fila, *saidas, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class _FiltroRedigido(logging.Filter):
+    # Mesma máscara do _QueueHandlerRedigido, para handlers sem fila
+    def filter(self, record):
+        record.msg = redigir(record.getMessage())
+        record.args = None
+        _redigir_extras(record)
+        return True
+
+
+def configurar_logging_pool():
+    """
+    `initializer` dos pools de processos (ex.: regerar_pdfs). Com fork o
+    filho herda o handler da fila, mas não a thread que a esvazia, e os
+    registros se perdiam. No filho as saídas ficam direto no logger raiz,
+    sem fila: o processo pode terminar sem passar pelo atexit.
+    """
+    global _listener
+    _listener = None
+    nivel = os.getenv("LOG_NIVEL") or ("DEBUG" if os.getenv("FLASK_DEBUG") == "1" else "INFO")
+    saidas = _saidas()
+    for saida in saidas:
+        saida.addFilter(FiltroRequisicao())
+        saida.addFilter(_FiltroRedigido())
+    _configurar_raiz(saidas, nivel)
+
+
+def registrar_request_id(app):
+    """Gera (ou reaproveita o X-Request-ID recebido) um id por requisição."""
+    from flask import g, request
+
+    @app.before_request
+    def _definir_request_id():
+        recebido = request.headers.get("X-Request-ID", "")
+        g.request_id = recebido[:64] if recebido else uuid.uuid4().hex[:16]
+
+    @app.after_request
+    def _devolver_request_id(resposta):
+        resposta.headers["X-Request-ID"] = g.get("request_id", "")
+        return resposta
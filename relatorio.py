@@ -2,6 +2,7 @@ from fpdf import FPDF
 from datetime import datetime
 
 from db import get_db_connection
+from tecnicos import nomes_tecnicos
 
 LEGENDAS_AMIGAVEIS = {
     "numero_pasta": "Número Pasta",
@@ -89,7 +90,68 @@ LEGENDAS_AMIGAVEIS_2 = {
     "fim_localizacao" : "Fim da Localização"
     }
 
-def gerar_pdf(formulario, caminho):
+# Campos com CPF de técnico que aparecem no PDF com o nome
+CAMPOS_TECNICO_CADASTRO = ["responsavel_analise_cpf", "responsavel_localizacao_cpf", "responsavel_analise"]
+CAMPOS_TECNICO_EDICAO = ["responsavel_analise", "responsavel_localizacao"]
+
+# Mesma consulta do preencher_tecnico (GET)
+SQL_SEGUNDO_PREENCHIMENTO = """
+    SELECT 
+        p.protocolo, 
+        p.observacoes, 
+        p.pasta_numero, 
+        p.solicitacao_requerente, 
+        p.resposta_departamento,
+        p.tramitacao, 
+        p.tipologia, 
+        im.municipio_nome AS municipio, 
+        p.situacao_localizacao,
+        p.responsavel_localizacao,
+        a.responsavel_analise, 
+        p.inicio_localizacao, 
+        p.fim_localizacao,
+        p.nome_ou_loteamento_do_condominio_a_ser_aprovado, 
+        p.interesse_social,
+        r.nome_requerente, 
+        r.tipo_requerente, 
+        r.cpf_cnpj_requerente,
+        pr.nome_proprietario, 
+        pr.cpf_cnpj_proprietario,     
+        p.imovel_matricula,
+        i.area,                  
+        i.localidade_imovel,        
+        i.latitude,              
+        i.longitude,                
+        a.prioridade, 
+        a.complexidade,
+        za.nome_zona_apa as zona_apa,
+        zu.nome_zona_utp as zona_utp,
+        za.apa as apa,                    -- Nome da APA
+        zu.utp as utp,                    -- Nome da UTP
+        i.curva_inundacao,
+        i.faixa_servidao, 
+        i.classificacao_viaria AS sistema_viario,
+        a.situacao_analise,
+        p.perimetro_urbano,
+        zu2.sigla_zona_urbana as zona_urbana,
+        mm.sigla_macrozona as macrozona_municipal
+    FROM processo p
+    JOIN analise a ON a.processo_protocolo = p.protocolo
+    LEFT JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
+    LEFT JOIN requerente r ON p.requerente = r.id_requerente
+    LEFT JOIN proprietario_imovel pi ON p.imovel_matricula = pi.imovel_matricula
+    LEFT JOIN proprietario pr ON pi.proprietario_id = pr.id_proprietario
+    LEFT JOIN imovel i ON p.imovel_matricula = i.matricula_imovel
+    LEFT JOIN zona_apa za ON i.zona_apa = za.id_zona_apa
+    LEFT JOIN zona_utp zu ON i.zona_utp = zu.id_zona_utp
+    LEFT JOIN imovel_zona_macrozona izm ON i.matricula_imovel = izm.imovel_matricula
+    LEFT JOIN zona_urbana zu2 ON izm.zona_urbana_id = zu2.id_zona_urbana
+    LEFT JOIN macrozona_municipal mm ON izm.macrozona_id = mm.id_macrozona
+"""
+
+
+def _montar_pdf(dados, titulo, legendas, caminho, ignorar=()):
+    """Desenha o relatório a partir de um dict já resolvido (sem acesso ao banco)."""
     pdf = FPDF()
     pdf.add_page()
     pdf.set_margins(left=20, top=15, right=20)
@@ -100,31 +162,13 @@ def gerar_pdf(formulario, caminho):
 
     # Cabeçalho
     pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Relatório de Processo", ln=True, align="C")
+    pdf.cell(0, 10, titulo, ln=True, align="C")
     pdf.set_font("Arial", "", 12)
     pdf.ln(10)
 
-    # Substituir CPFs/CNPJs pelos nomes
-    campos_para_substituir = {
-        "responsavel_analise_cpf": "tecnico",
-        "responsavel_localizacao_cpf": "tecnico",
-        "responsavel_analise" : "tecnico"
-    }
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            for campo, tipo in campos_para_substituir.items():
-                valor = formulario.get(campo)
-                if not valor:
-                    continue
-                if tipo == "tecnico":
-                    cur.execute("SELECT nome_tecnico FROM tecnico WHERE cpf_tecnico = %s", (valor,))
-                result = cur.fetchone()
-                formulario[campo] = result[0] if result else "Desconhecido"
-
     # Função para adicionar linha no PDF
     def add_row(chave, valor):
-        legenda = LEGENDAS_AMIGAVEIS.get(chave, chave.capitalize().replace("_", " "))
+        legenda = legendas.get(chave, chave.capitalize().replace("_", " "))
         texto = str(valor)
         
         # 1. Legenda (sempre uma linha)
@@ -155,7 +199,7 @@ def gerar_pdf(formulario, caminho):
             
             pdf.ln(2) 
 
-    for chave, valor in formulario.items():
+    for chave, valor in dados.items():
         
         if chave in ['interesse_social', 'perimetro_urbano']:
             if valor is True or str(valor).lower() in ['true', '1', 'sim', 'on']:
@@ -164,7 +208,7 @@ def gerar_pdf(formulario, caminho):
                 valor = "NÃO"
         
         if valor and str(valor).strip().lower() != "none":            
-            if chave == 'finalizar':
+            if chave in ignorar:
                 continue
             add_row(chave, valor)
             pdf.ln(2)
@@ -175,161 +219,70 @@ def gerar_pdf(formulario, caminho):
     pdf.cell(0, 10, f"Página {pdf.page_no()}", align="C")
 
     pdf.output(caminho)
-    
-def gerar_pdf_segundo_preenchimento(protocolo, caminho):
-    #Gera PDF para segundo preenchimento buscando dados completos do banco
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_margins(left=20, top=15, right=20)
-    pdf.set_font("Arial", "", 12)
-    
-    data_geracao = datetime.now().strftime("%d/%m/%Y %H:%M")
-    pdf.cell(0, 10, f"Gerado em: {data_geracao}", ln=True, align="C")
-    pdf.ln(10)
 
-    # Cabeçalho
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Relatório de Processo - Edição", ln=True, align="C")
-    pdf.set_font("Arial", "", 12)
-    pdf.ln(10)
 
-    # Buscar TODOS os dados do banco
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # Query completa (igual à do preencher_tecnico)
-            cur.execute("""
-                SELECT 
-                    p.protocolo, 
-                    p.observacoes, 
-                    p.pasta_numero, 
-                    p.solicitacao_requerente, 
-                    p.resposta_departamento,
-                    p.tramitacao, 
-                    p.tipologia, 
-                    im.municipio_nome AS municipio, 
-                    p.situacao_localizacao,
-                    p.responsavel_localizacao,
-                    a.responsavel_analise, 
-                    p.inicio_localizacao, 
-                    p.fim_localizacao,
-                    p.nome_ou_loteamento_do_condominio_a_ser_aprovado, 
-                    p.interesse_social,
-                    r.nome_requerente, 
-                    r.tipo_requerente, 
-                    r.cpf_cnpj_requerente,
-                    pr.nome_proprietario, 
-                    pr.cpf_cnpj_proprietario,     
-                    p.imovel_matricula,
-                    i.area,                  
-                    i.localidade_imovel,        
-                    i.latitude,              
-                    i.longitude,                
-                    a.prioridade, 
-                    a.complexidade,
-                    za.nome_zona_apa as zona_apa,
-                    zu.nome_zona_utp as zona_utp,
-                    za.apa as apa,                    -- Nome da APA
-                    zu.utp as utp,                    -- Nome da UTP
-                    i.curva_inundacao,
-                    i.faixa_servidao, 
-                    i.classificacao_viaria AS sistema_viario,
-                    a.situacao_analise,
-                    p.perimetro_urbano,
-                    zu2.sigla_zona_urbana as zona_urbana,
-                    mm.sigla_macrozona as macrozona_municipal
-                FROM processo p
-                JOIN analise a ON a.processo_protocolo = p.protocolo
-                LEFT JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
-                LEFT JOIN requerente r ON p.requerente = r.id_requerente
-                LEFT JOIN proprietario_imovel pi ON p.imovel_matricula = pi.imovel_matricula
-                LEFT JOIN proprietario pr ON pi.proprietario_id = pr.id_proprietario
-                LEFT JOIN imovel i ON p.imovel_matricula = i.matricula_imovel
-                LEFT JOIN zona_apa za ON i.zona_apa = za.id_zona_apa
-                LEFT JOIN zona_utp zu ON i.zona_utp = zu.id_zona_utp
-                LEFT JOIN imovel_zona_macrozona izm ON i.matricula_imovel = izm.imovel_matricula
-                LEFT JOIN zona_urbana zu2 ON izm.zona_urbana_id = zu2.id_zona_urbana
-                LEFT JOIN macrozona_municipal mm ON izm.macrozona_id = mm.id_macrozona
-                WHERE p.protocolo = %s;
-            """, (protocolo,))
-            
-            row = cur.fetchone()
-            if not row:
-                raise Exception(f"Processo {protocolo} não encontrado")
-            
-            cols = [desc[0] for desc in cur.description]
-            dados_completos = dict(zip(cols, row))
-        
-    dados_completos['situacao_analise'] = 'FINALIZADA'
-            
-    # CONVERTER CPFs PARA NOMES (igual na função original)
-    campos_para_substituir = {
-        "responsavel_analise": "tecnico",
-        "responsavel_localizacao": "tecnico",
-    }
+def substituir_tecnicos(dados, campos, nomes):
+    # Substituir CPFs pelos nomes
+    for campo in campos:
+        valor = dados.get(campo)
+        if valor:
+            dados[campo] = nomes.get(valor, "Desconhecido")
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            for campo, tipo in campos_para_substituir.items():
-                valor = dados_completos.get(campo)
-                if not valor:
-                    continue
-                if tipo == "tecnico":
-                    cur.execute("SELECT nome_tecnico FROM tecnico WHERE cpf_tecnico = %s", (valor,))
-                    result = cur.fetchone()
-                    dados_completos[campo] = result[0] if result else "Desconhecido"
-                    
 
-    # Função para adicionar linha no PDF (igual à original)
-    def add_row(chave, valor):
-        legenda = LEGENDAS_AMIGAVEIS_2.get(chave, chave.capitalize().replace("_", " "))
-        texto = str(valor)
-        
-        # 1. Legenda (sempre uma linha)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(50, 10, f"{legenda}:", border=0, align='R')
-        
-        # 2. Valor com quebra a cada 58 caracteres
-        pdf.set_font("Arial", "", 12)
-        
-        # Se texto for curto (<58 chars), uma linha normal
-        if len(texto) <= 58:
-            pdf.cell(0, 10, texto, border=0, ln=True, align='L')
-            pdf.ln(2)  # Espaço pequeno
-        else:
-            # Texto longo: quebrar a cada 58 caracteres
-            linhas = []
-            for i in range(0, len(texto), 58):
-                linha = texto[i:i+58]
-                linhas.append(linha)
-            
-            # Primeira linha (alinhada com legenda)
-            pdf.cell(0, 10, linhas[0], border=0, ln=True, align='L')
-            
-            # Linhas seguintes (com indentação)
-            for linha in linhas[1:]:
-                pdf.cell(50, 10, "", border=0, align='R')  # Espaço vazio para alinhar
-                pdf.cell(0, 10, linha, border=0, ln=True, align='L')
-            
-            pdf.ln(2) 
+def renderizar_pdf(formulario, caminho):
+    """PDF do cadastro a partir do formulário com os nomes já resolvidos."""
+    _montar_pdf(formulario, "Relatório de Processo", LEGENDAS_AMIGAVEIS, caminho, ignorar=("finalizar",))
 
-    # Gerar PDF com dados completos
-    for chave, valor in dados_completos.items():
-        
-        if chave in ['interesse_social', 'perimetro_urbano']:
-            if valor is True or str(valor).lower() in ['true', '1', 'sim', 'on']:
-                valor = "SIM"
-            else:
-                valor = "NÃO"
-        
-        if valor and str(valor).strip().lower() != "none":
-            add_row(chave, valor)
-            pdf.ln(2)
 
-    # Rodapé
-    pdf.set_y(-15)
-    pdf.set_font("Arial", "I", 8)
-    pdf.cell(0, 10, f"Página {pdf.page_no()}", align="C")
-    pdf.output(caminho)
+def renderizar_pdf_segundo_preenchimento(dados, caminho):
+    """PDF da edição a partir da linha de SQL_SEGUNDO_PREENCHIMENTO já resolvida."""
+    _montar_pdf(dados, "Relatório de Processo - Edição", LEGENDAS_AMIGAVEIS_2, caminho)
 
 
+def gerar_pdf(formulario, caminho):
+    # Nomes dos técnicos vêm do diretório em memória (tecnicos.py)
+    nomes = nomes_tecnicos(formulario.get(c) for c in CAMPOS_TECNICO_CADASTRO)
+    substituir_tecnicos(formulario, CAMPOS_TECNICO_CADASTRO, nomes)
+    renderizar_pdf(formulario, caminho)
+
 
+def carregar_segundo_preenchimento_lote(cur, protocolos):
+    """
+    Dados completos de vários processos para o PDF de edição: {protocolo: dados}.
+    Uma única consulta, qualquer que seja a quantidade de protocolos; os
+    nomes dos técnicos vêm do diretório em memória (tecnicos.py). Protocolos inexistentes ficam de fora.
+    """
+    protocolos = list(dict.fromkeys(protocolos))
+    if not protocolos:
+        return {}
+    cur.execute(SQL_SEGUNDO_PREENCHIMENTO + " WHERE p.protocolo = ANY(%s)", (protocolos,))
+    cols = [desc[0] for desc in cur.description]
+
+    # Vários proprietários geram linhas repetidas: fica a primeira (como no fetchone)
+    por_protocolo = {}
+    for row in cur.fetchall():
+        dados = dict(zip(cols, row))
+        por_protocolo.setdefault(dados["protocolo"], dados)
+
+    cpfs = [d.get(c) for d in por_protocolo.values() for c in CAMPOS_TECNICO_EDICAO]
+    nomes = nomes_tecnicos(cpfs)
+    for dados in por_protocolo.values():
+        dados['situacao_analise'] = 'FINALIZADA'
+        substituir_tecnicos(dados, CAMPOS_TECNICO_EDICAO, nomes)
+    return por_protocolo
+
+
+def carregar_segundo_preenchimento(cur, protocolo):
+    """Dados completos do processo para o PDF de edição, com os técnicos pelo nome."""
+    dados_completos = carregar_segundo_preenchimento_lote(cur, [protocolo]).get(protocolo)
+    if not dados_completos:
+        raise Exception(f"Processo {protocolo} não encontrado")
+    return dados_completos
+
+
+def gerar_pdf_segundo_preenchimento(protocolo, caminho):
+    #Gera PDF para segundo preenchimento buscando dados completos do banco
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            dados_completos = carregar_segundo_preenchimento(cur, protocolo)
+    renderizar_pdf_segundo_preenchimento(dados_completos, caminho)
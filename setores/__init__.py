@@ -0,0 +1,14 @@
+from flask import Blueprint
+
+# Um único blueprint com o fluxo de trabalho dos setores técnicos.
+# É registrado uma vez por setor (ver registrar_setores), cada registro com
+# nome e prefixo próprios: "dig.ambiente" -> /dig/ambiente, etc.
+bp = Blueprint('setor', __name__)
+
+from . import routes
+
+
+def registrar_setores(app, setores):
+    """setores: {sigla do setor: nome do blueprint}, ex. SETOR_TO_BLUEPRINT."""
+    for nome in dict.fromkeys(setores.values()):
+        app.register_blueprint(bp, name=nome, url_prefix='/' + nome.replace('_', '-'))
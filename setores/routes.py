@@ -1,21 +1,125 @@
 from datetime import datetime
-import os
-from flask import flash, render_template, session, redirect, url_for, request
+import logging
+from flask import flash, render_template, session, redirect, url_for, request, jsonify, Response, stream_with_context
 from . import bp
 from db import get_db_connection
-import numpy as np
-from pdf_manager import salvar_relatorio_analise, mesclar_com_relatorio_analise, obter_relatorio_analise  
-
-def calcular_dias_uteis(inicio_str, fim_str):
-    if not inicio_str or not fim_str:
-        return None
-    try:
-        inicio = datetime.strptime(inicio_str, "%Y-%m-%d").date()
-        fim = datetime.strptime(fim_str, "%Y-%m-%d").date()
-        return int(np.busday_count(inicio, fim))
-    except Exception as e:
-        print("Erro ao calcular dias úteis:", e)
-        return None
+from pdf_manager import salvar_relatorio_analise, obter_relatorio_analise
+from fila_pdf import enfileirar_pdf, TIPO_EDICAO
+from referencias import obter_referencias, SITUACOES_LOCALIZACAO, MANANCIAL
+from painel import listar_disponiveis, listar_meus, ultimos_pdfs, ler_filtros, ler_limite, SITUACOES_ANALISE
+from tecnicos import nome_tecnico as obter_nome_tecnico
+from notificacoes import escuta_ativa
+from eventos import assinar, cancelar as cancelar_assinatura, fluxo as fluxo_eventos
+from preparadas import declarar, executar
+from calendario import dias_uteis
+from prazos import classificar, limites_urgencia, listar_urgentes
+from captura import captar_processo as captar, captar_processos as captar_lista, captar_proximos
+from registro import campo_sensivel, redigir_campos
+
+logger = logging.getLogger(__name__)
+
+
+def _valores_log(campo, *valores):
+    # Valor de campo com CPF/CNPJ (registro.campo_sensivel) não vai para o log
+    return ["[REDIGIDO]" if valor and campo_sensivel(campo) else valor for valor in valores]
+
+
+# SQL fixo do preencher_tecnico, preparado uma vez por conexão (preparadas.py)
+SQL_ZONA_APA_ID = declarar("zona_apa_id", """
+    SELECT id_zona_apa
+    FROM zona_apa
+    WHERE apa = %s AND nome_zona_apa = %s
+""")
+
+SQL_ZONA_UTP_ID = declarar("zona_utp_id", """
+    SELECT id_zona_utp
+    FROM zona_utp
+    WHERE utp = %s AND nome_zona_utp = %s
+""")
+
+SQL_FINALIZAR_ANALISE = declarar("finalizar_analise", """
+    UPDATE analise
+    SET situacao_analise = 'FINALIZADA',
+        fim_analise = %s,
+        dias_uteis_analise = %s,
+        responsavel_analise = %s,
+        ultima_movimentacao = CURRENT_DATE
+    WHERE processo_protocolo = %s
+""")
+
+SQL_FINALIZAR_ANALISE_SEM_INICIO = declarar("finalizar_analise_sem_inicio", """
+    UPDATE analise SET situacao_analise = 'FINALIZADA', responsavel_analise = %s WHERE processo_protocolo = %s
+""")
+
+SQL_ATRIBUIR_RESPONSAVEL = declarar("atribuir_responsavel", """
+    UPDATE analise SET responsavel_analise = %s WHERE processo_protocolo = %s
+""")
+
+# Dados do formulário de edição (GET do preencher_tecnico)
+SQL_FORMULARIO_EDICAO = declarar("formulario_edicao", """
+    SELECT
+        p.protocolo,
+        p.observacoes,
+        p.pasta_numero,
+        p.solicitacao_requerente,
+        p.resposta_departamento,
+        p.tramitacao,
+        p.tipologia,
+        im.municipio_nome AS municipio,
+        p.situacao_localizacao,
+        p.responsavel_localizacao,
+        a.responsavel_analise,
+        p.inicio_localizacao,
+        p.fim_localizacao,
+        p.nome_ou_loteamento_do_condominio_a_ser_aprovado,
+        p.interesse_social,
+        r.nome_requerente,
+        r.tipo_requerente,
+        r.cpf_cnpj_requerente,
+        CASE
+            WHEN LENGTH(REPLACE(REPLACE(r.cpf_cnpj_requerente, '.', ''), '-', '')) = 11
+            THEN r.cpf_cnpj_requerente
+            ELSE NULL
+        END AS cpf_requerente,
+        CASE
+            WHEN LENGTH(REPLACE(REPLACE(REPLACE(REPLACE(r.cpf_cnpj_requerente, '.', ''), '-', ''), '/', ''), '.', '')) = 14
+            THEN r.cpf_cnpj_requerente
+            ELSE NULL
+        END AS cnpj_requerente,
+        pr.nome_proprietario,
+        pr.cpf_cnpj_proprietario,
+        p.imovel_matricula,
+        i.area,
+        i.localidade_imovel,
+        i.latitude,
+        i.longitude,
+        a.prioridade,
+        a.complexidade,
+        za.nome_zona_apa as zona_apa,
+        zu.nome_zona_utp as zona_utp,
+        za.apa as apa,                    -- Nome da APA
+        zu.utp as utp,                    -- Nome da UTP
+        i.curva_inundacao,
+        i.faixa_servidao,
+        i.classificacao_viaria AS sistema_viario,
+        a.situacao_analise,
+        p.perimetro_urbano,
+        zu2.sigla_zona_urbana as zona_urbana,
+        mm.sigla_macrozona as macrozona_municipal
+    FROM processo p
+    JOIN analise a ON a.processo_protocolo = p.protocolo
+    LEFT JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
+    LEFT JOIN requerente r ON p.requerente = r.id_requerente
+    LEFT JOIN proprietario_imovel pi ON p.imovel_matricula = pi.imovel_matricula
+    LEFT JOIN proprietario pr ON pi.proprietario_id = pr.id_proprietario
+    LEFT JOIN imovel i ON p.imovel_matricula = i.matricula_imovel
+    LEFT JOIN zona_apa za ON i.zona_apa = za.id_zona_apa
+    LEFT JOIN zona_utp zu ON i.zona_utp = zu.id_zona_utp
+    LEFT JOIN imovel_zona_macrozona izm ON i.matricula_imovel = izm.imovel_matricula
+    LEFT JOIN zona_urbana zu2 ON izm.zona_urbana_id = zu2.id_zona_urbana
+    LEFT JOIN macrozona_municipal mm ON izm.macrozona_id = mm.id_macrozona
+    WHERE p.protocolo = %s
+""")
 
 
 @bp.route('/ambiente')
@@ -26,70 +130,98 @@ def ambiente():
     if not setor_nome or not cpf_tecnico:
         return "Usuário sem sessão ativa", 401
 
+    # Paginação por cursor (protocolo) e filtros vindos da query string
+    filtros = ler_filtros(request.args)
+    limite = ler_limite(request.args.get("limite"))
+
+    nome_tecnico = obter_nome_tecnico(cpf_tecnico, "Técnico")
+
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            
-             # Buscar nome do técnico pelo CPF
-            cur.execute("SELECT nome_tecnico FROM tecnico WHERE cpf_tecnico = %s", (cpf_tecnico,))
-            row = cur.fetchone()
-            if row:
-                nome_tecnico = row[0]
-            else:
-                nome_tecnico = "Técnico"
-                
             # Processos disponíveis: do setor, SEM responsável na análise
-            cur.execute("""
-                SELECT p.protocolo, p.tipologia, im.municipio_nome
-                FROM processo p
-                JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
-                LEFT JOIN analise a ON a.processo_protocolo = p.protocolo
-                WHERE p.setor_nome = %s AND (a.responsavel_analise IS NULL)
-                ORDER BY p.protocolo DESC
-            """, (setor_nome,))
-            disponiveis = cur.fetchall()
+            disponiveis, disp_proxima, disp_anterior = listar_disponiveis(
+                cur, setor_nome, filtros,
+                apos=request.args.get("disp_apos"), antes=request.args.get("disp_antes"),
+                limite=limite,
+            )
 
             # Processos capturados pelo técnico (responsável)
-            cur.execute("""
-                SELECT p.protocolo, p.tipologia, im.municipio_nome, a.situacao_analise
-                FROM processo p
-                JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
-                JOIN analise a ON a.processo_protocolo = p.protocolo
-                WHERE a.responsavel_analise = %s
-                ORDER BY p.protocolo DESC
-            """, (cpf_tecnico,))
-            meus = cur.fetchall()
-            
-            
+            meus, meus_proxima, meus_anterior = listar_meus(
+                cur, cpf_tecnico, filtros,
+                apos=request.args.get("meus_apos"), antes=request.args.get("meus_antes"),
+                limite=limite,
+            )
 
-            # Montar lista de protocolos para buscar PDFs
-            protocolos = [p[0] for p in meus]
+            # PDF mais recente de cada processo da página
+            pdfs_por_protocolo = ultimos_pdfs(cur, [p[0] for p in meus])
+
+            # Em aberto no setor com o prazo de resposta mais próximo
+            urgentes = listar_urgentes(cur, setor_nome)
+
+    hoje, limite_aviso = limites_urgencia()
+
+    ref = obter_referencias()
+
+    def url_pagina(**mudancas):
+        # Mantém filtros e o cursor da outra lista ao trocar de página
+        args = request.args.to_dict()
+        args.update(mudancas)
+        return url_for(".ambiente", **{k: v for k, v in args.items() if v})
 
-            pdfs_por_protocolo = {}
-            if protocolos:
-                cur.execute("""
-                    SELECT processo_protocolo, caminho_pdf
-                    FROM pdf_gerados
-                    WHERE processo_protocolo = ANY(%s)
-                    ORDER BY data_geracao DESC
-                """, (protocolos,))
-                for processo_protocolo, caminho_pdf in cur.fetchall():
-                    if processo_protocolo not in pdfs_por_protocolo:
-                        pdfs_por_protocolo[processo_protocolo] = os.path.basename(caminho_pdf)
-
-            cur.execute("SELECT nome_setor FROM setor ORDER BY nome_setor")
-            setores = [row[0] for row in cur.fetchall()]
-            
     return render_template(
-        'dplam/ambiente_setor.html',
+        'setor/ambiente_setor.html',
         disponiveis=disponiveis,
         meus=meus,
-        setores=setores,
+        setores=ref["setor"],
         setor=setor_nome,
         nome_tecnico=nome_tecnico,
-        pdfs_por_protocolo=pdfs_por_protocolo
+        pdfs_por_protocolo=pdfs_por_protocolo,
+        filtros=filtros,
+        limite=limite,
+        tipologias=ref["tipologia"],
+        municipios=ref["municipio"],
+        situacoes_analise=SITUACOES_ANALISE,
+        disp_proxima=disp_proxima,
+        disp_anterior=disp_anterior,
+        meus_proxima=meus_proxima,
+        meus_anterior=meus_anterior,
+        url_pagina=url_pagina,
+        urgentes=urgentes,
+        urgencia=lambda prazo: classificar(prazo, hoje, limite_aviso),
     )
 
             
+@bp.route('/eventos')
+def eventos():
+    """
+    Eventos da fila do setor (text/event-stream) para o painel se atualizar
+    sem recarregar: adicionado, encaminhado, captado e ressincronizar.
+    """
+    setor_nome = session.get("setor")
+    cpf_tecnico = session.get("cpf_tecnico")
+
+    if not setor_nome or not cpf_tecnico:
+        return "Usuário sem sessão ativa", 401
+
+    # Sem a escuta (ESCUTAR_NOTIFICACOES=1) não há eventos: 204 faz o
+    # EventSource desistir em vez de ficar reconectando
+    if not escuta_ativa():
+        return "", 204
+
+    assinatura = assinar(setor_nome)
+    if assinatura is None:
+        return "Limite de conexões de eventos atingido", 503
+
+    resposta = Response(
+        stream_with_context(fluxo_eventos(assinatura, cpf_tecnico)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Cliente que cai antes do primeiro envio não chega a rodar o gerador
+    resposta.call_on_close(lambda: cancelar_assinatura(assinatura))
+    return resposta
+
+
 @bp.route('/visualizar_processo/<string:protocolo>')            
 def visualizar_processo(protocolo):
     cpf_tecnico = session.get("cpf_tecnico")
@@ -112,15 +244,8 @@ def visualizar_processo(protocolo):
             if not row:
                 return "Processo não encontrado", 404
 
-            responsavel_cpf = row[6]
-
-            # Buscar nome do responsável pelo CPF
-            cur.execute("SELECT nome_tecnico FROM tecnico WHERE cpf_tecnico = %s", (responsavel_cpf,))
-            result = cur.fetchone()
-            if result:
-                responsavel_nome = result[0]
-            else:
-                responsavel_nome = "Desconhecido"
+            # Nome do responsável pelo CPF (diretório em memória)
+            responsavel_nome = obter_nome_tecnico(row[6])
 
             # Mapear para dicionário com nomes e valores
             campos = {
@@ -136,7 +261,7 @@ def visualizar_processo(protocolo):
             # Filtrar campos não preenchidos (None ou vazios)
             campos_preenchidos = {k: v for k, v in campos.items() if v and str(v).strip()}
 
-    return render_template('dplam/visualizar_processo.html', campos=campos_preenchidos)
+    return render_template('setor/visualizar_processo.html', campos=campos_preenchidos)
 
 
 @bp.route('/captar_processo/<string:protocolo>')
@@ -149,35 +274,68 @@ def captar_processo(protocolo):
     try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
-                # 1. ATUALIZAR O RESPONSÁVEL NA ANÁLISE (já existente)
-                cur.execute("""
-                    UPDATE analise SET responsavel_analise = %s
-                    WHERE processo_protocolo = %s
-                """, (cpf_tecnico, protocolo))
-
-                # 2. ÚNICA NOVIDADE: Atualizar o último registro do histórico
-                cur.execute("""
-                    UPDATE historico 
-                    SET tecnico_novo_responsavel = %s
-                    WHERE processo_protocolo = %s 
-                    AND id_historico = (
-                        SELECT id_historico FROM historico 
-                        WHERE processo_protocolo = %s 
-                        ORDER BY data_encaminhamento DESC 
-                        LIMIT 1
-                    )
-                """, (cpf_tecnico, protocolo, protocolo))
+                # Só capta se o processo ainda estiver livre (ver captura.py);
+                # o histórico é atualizado na mesma transação
+                captou = captar(cur, protocolo, cpf_tecnico, setor)
 
-                conn.commit()
-                flash(f"✅ Processo {protocolo} captado com sucesso!", "success")
-                print(f"✅ Captura: {cpf_tecnico} é o novo responsável pelo processo {protocolo}")
+        if captou:
+            flash(f"✅ Processo {protocolo} captado com sucesso!", "success")
+            logger.info("Captura: %s é o novo responsável pelo processo %s", session.get("nome_tecnico"), protocolo)
+        else:
+            flash(f"⚠️ Processo {protocolo} já foi captado por outro técnico.", "error")
+            logger.warning("Captura recusada: %s não está mais disponível", protocolo)
 
     except Exception as e:
-        conn.rollback()
         flash(f"❌ Erro ao captar processo: {str(e)}", "error")
-        print(f"❌ Erro na captura: {str(e)}")
+        logger.exception("Erro na captura")
+
+    return redirect(url_for(".ambiente"))
+
+
+@bp.route('/captar_processos', methods=['POST'])
+def captar_processos_lote():
+    """
+    Captura em lote: `protocolos` (lista marcada no painel) ou, se vier
+    `quantidade`, os próximos N processos livres do setor.
+    Responde JSON quando a requisição é JSON.
+    """
+    cpf_tecnico = session.get("cpf_tecnico")
+    setor = session.get("setor")
+    if not cpf_tecnico or not setor:
+        return redirect(url_for("login"))
+
+    dados = request.get_json(silent=True) or request.form
+    protocolos = dados.getlist("protocolos") if hasattr(dados, "getlist") else dados.get("protocolos", [])
+    quantidade = dados.get("quantidade")
+
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                if protocolos:
+                    captados, falhas = captar_lista(cur, protocolos, cpf_tecnico, setor)
+                elif quantidade:
+                    captados = captar_proximos(cur, cpf_tecnico, setor, quantidade)
+                    falhas = []
+                else:
+                    captados, falhas = [], []
+    except Exception as e:
+        logger.exception("Erro na captura em lote")
+        if request.is_json:
+            return jsonify({"erro": str(e)}), 500
+        flash(f"❌ Erro ao captar processos: {str(e)}", "error")
+        return redirect(url_for(".ambiente"))
+
+    logger.info("Captura em lote: %s captou %s, falhas: %s", session.get("nome_tecnico"), len(captados), falhas)
+    if request.is_json:
+        return jsonify({"captados": captados, "falhas": falhas})
 
-    return redirect(url_for("dplam.ambiente"))
+    if captados:
+        flash(f"✅ {len(captados)} processo(s) captado(s): {', '.join(map(str, captados))}", "success")
+    else:
+        flash("ℹ️ Nenhum processo disponível foi captado.", "error")
+    if falhas:
+        flash(f"⚠️ Não captados (já com outro técnico ou indisponíveis): {', '.join(map(str, falhas))}", "error")
+    return redirect(url_for(".ambiente"))
 
 
 @bp.route('/preencher_tecnico/<string:protocolo>', methods=['GET', 'POST'])
@@ -192,9 +350,8 @@ def preencher_tecnico(protocolo):
 
         # Detectar Finalizar e variáveis de finalização
         acao_finalizar = formulario.get("finalizar")
-        from datetime import datetime
         fim_analise = datetime.now() if acao_finalizar else None
-        print(f"🔘 Ação detectada - Finalizar: {acao_finalizar}")
+        logger.debug("Ação detectada - Finalizar: %s", acao_finalizar)
 
         # Campos que serão atualizados enviados do formulário
         campos_processo = [
@@ -223,10 +380,10 @@ def preencher_tecnico(protocolo):
         for chk in checkbox_fields:
             if chk not in formulario:
                 formulario[chk] = False
-                print(f"🔧 Checkbox {chk} não enviado - definido como False")
+                logger.debug("Checkbox %s não enviado - definido como False", chk)
             else:
                 formulario[chk] = to_bool(formulario[chk])
-                print(f"🔧 Checkbox {chk} processado: {formulario[chk]}")
+                logger.debug("Checkbox %s processado: %s", chk, formulario[chk])
 
         try:
             with get_db_connection() as conn:
@@ -238,9 +395,9 @@ def preencher_tecnico(protocolo):
                         if arquivo_pdf and arquivo_pdf.filename != '':
                             caminho_salvo = salvar_relatorio_analise(arquivo_pdf, protocolo)
                             if caminho_salvo:
-                                print(f"✅ Relatório de análise (técnico) salvo para protocolo {protocolo}: {caminho_salvo}")
+                                logger.info("Relatório de análise (técnico) salvo para protocolo %s: %s", protocolo, caminho_salvo)
                             else:
-                                print(f"⚠️  Arquivo PDF inválido para protocolo {protocolo}")
+                                logger.warning("Arquivo PDF inválido para protocolo %s", protocolo)
                     # Buscar dados atuais do processo
                     cur.execute("SELECT * FROM processo WHERE protocolo = %s", (protocolo,))
                     processo_atual = cur.fetchone()
@@ -263,7 +420,7 @@ def preencher_tecnico(protocolo):
                         valor_formulario = formulario.get(campo)
                         valor_atual = processo_dict.get(campo)
                         
-                        print(f"🔍 DEBUG {campo}: formulario='{valor_formulario}', atual='{valor_atual}'")
+                        logger.debug("%s: formulario='%s', atual='%s'", campo, *_valores_log(campo, valor_formulario, valor_atual))
                         
                         if campo == 'pasta_numero' and valor_formulario and valor_formulario != '':
                             try:
@@ -273,9 +430,9 @@ def preencher_tecnico(protocolo):
                                     VALUES (%s) 
                                     ON CONFLICT (numero_pasta) DO NOTHING
                                 """, (valor_formulario,))
-                                print(f"✅ Pasta {valor_formulario} criada/verificada")
-                            except Exception as e:
-                                print(f"❌ Erro ao criar pasta {valor_formulario}: {e}")
+                                logger.debug("Pasta %s criada/verificada", valor_formulario)
+                            except Exception:
+                                logger.exception("Erro ao criar pasta %s", valor_formulario)
                         
                         # TRATAMENTO PARA VALORES VAZIOS EM CAMPOS CRÍTICOS
                         if valor_formulario == '':
@@ -288,7 +445,7 @@ def preencher_tecnico(protocolo):
                                 'observacoes', 'situacao_localizacao', 'nome_ou_loteamento_do_condominio_a_ser_aprovado'
                             ]:
                                 valor_formulario = None
-                                print(f"🔧 Campo {campo} convertido de vazio para NULL")
+                                logger.debug("Campo %s convertido de vazio para NULL", campo)
                         
                         # CORREÇÃO CRÍTICA: LÓGICA DE ATUALIZAÇÃO MODIFICADA
                         deve_atualizar = False
@@ -300,17 +457,17 @@ def preencher_tecnico(protocolo):
                             if valor_checkbox != valor_atual:
                                 deve_atualizar = True
                                 valor_final = valor_checkbox
-                                print(f"✅ Checkbox {campo} será atualizado: {valor_atual} -> {valor_final}")
+                                logger.debug("Checkbox %s será atualizado: %s -> %s", campo, *_valores_log(campo, valor_atual, valor_final))
                         
                         # REGRA 2: Campos normais atualizam se vieram no formulário
                         elif campo in formulario:
                             if valor_formulario != valor_atual:
                                 deve_atualizar = True
-                                print(f"✅ Campo {campo} será atualizado: '{valor_atual}' -> '{valor_final}'")
+                                logger.debug("Campo %s será atualizado: '%s' -> '%s'", campo, *_valores_log(campo, valor_atual, valor_final))
                             else:
-                                print(f"⏭️ Campo {campo} não será atualizado (valores iguais)")
+                                logger.debug("Campo %s não será atualizado (valores iguais)", campo)
                         else:
-                            print(f"⏭️ Campo {campo} não veio no formulário - mantém valor atual")
+                            logger.debug("Campo %s não veio no formulário - mantém valor atual", campo)
                         
                         # EXECUTAR A ATUALIZAÇÃO SE NECESSÁRIO
                         if deve_atualizar:
@@ -321,7 +478,7 @@ def preencher_tecnico(protocolo):
                     if ('inicio_localizacao' in [c.split()[0] for c in campos_para_atualizar] or 
                         'fim_localizacao' in [c.split()[0] for c in campos_para_atualizar]):
                         
-                        print(f"🎯 Datas de localização alteradas - recalculando dias úteis...")
+                        logger.debug("Datas de localização alteradas - recalculando dias úteis...")
                         
                         # Obter valores finais
                         inicio_final = formulario.get('inicio_localizacao') or processo_dict.get('inicio_localizacao')
@@ -329,26 +486,27 @@ def preencher_tecnico(protocolo):
                         
                         # Calcular dias úteis
                         if inicio_final and fim_final:
-                            dias_uteis_localizacao = calcular_dias_uteis(str(inicio_final), str(fim_final))
+                            dias_uteis_localizacao = dias_uteis(inicio_final, fim_final)
                         else:
                             dias_uteis_localizacao = None
                         
                         # Adicionar ao UPDATE
                         campos_para_atualizar.append("dias_uteis_localizacao = %s")
                         valores_para_atualizar.append(dias_uteis_localizacao)
-                        print(f"🎯 Dias úteis localização: {dias_uteis_localizacao}")
+                        logger.debug("Dias úteis localização: %s", dias_uteis_localizacao)
 
                     # Executar UPDATE apenas se houver campos para atualizar
                     if campos_para_atualizar:
                         campos_sql = ", ".join(campos_para_atualizar)
                         valores_para_atualizar.append(protocolo)
                         sql_atualizar_processo = f"UPDATE processo SET {campos_sql} WHERE protocolo = %s"
-                        print(f"🔍 SQL Processo: {sql_atualizar_processo}")
-                        print(f"🎯 Valores: {valores_para_atualizar}")
+                        logger.debug("SQL Processo: %s", sql_atualizar_processo)
+                        logger.debug("Valores: %s", redigir_campos(dict(zip(
+                            [c.split()[0] for c in campos_para_atualizar] + ["protocolo"], valores_para_atualizar))))
                         cur.execute(sql_atualizar_processo, valores_para_atualizar)
-                        print(f"✅ UPDATE executado: {len(campos_para_atualizar)} campos atualizados")
+                        logger.debug("UPDATE executado: %s campos atualizados", len(campos_para_atualizar))
                     else:
-                        print("ℹ️ Nenhum campo da tabela processo para atualizar")
+                        logger.debug("Nenhum campo da tabela processo para atualizar")
 
                 # 2. OBTER MATRÍCULA DO IMÓVEL (chave para relacionamentos)
                 matricula_imovel = formulario.get("imovel_matricula") or processo_dict.get("imovel_matricula")
@@ -369,7 +527,7 @@ def preencher_tecnico(protocolo):
                         possui_apa = formulario.get("possui_apa")
                         possui_utp = formulario.get("possui_utp")
 
-                        print(f"🔍 DEBUG INICIAL - possui_apa: {possui_apa}, possui_utp: {possui_utp}")
+                        logger.debug("Inicial - possui_apa: %s, possui_utp: %s", possui_apa, possui_utp)
 
                         # Converter texto para IDs (quando necessário)
                         zona_apa_id = None
@@ -381,15 +539,11 @@ def preencher_tecnico(protocolo):
                             apa_nome = formulario.get("apa")  # ← IMPORTANTE!
                             
                             if zona_apa_texto and zona_apa_texto != '' and apa_nome:
-                                cur.execute("""
-                                    SELECT id_zona_apa 
-                                    FROM zona_apa 
-                                    WHERE TRIM(apa) = %s AND nome_zona_apa = %s
-                                """, (apa_nome, zona_apa_texto))
+                                executar(cur, SQL_ZONA_APA_ID, (apa_nome, zona_apa_texto))
                                 
                                 result = cur.fetchone()
                                 zona_apa_id = result[0] if result else None
-                                print(f"✅ Zona APA: '{zona_apa_texto}' na APA '{apa_nome}' → ID: {zona_apa_id}")
+                                logger.debug("Zona APA: '%s' na APA '%s' → ID: %s", zona_apa_texto, apa_nome, zona_apa_id)
                             else:
                                 zona_apa_id = None
 
@@ -399,15 +553,11 @@ def preencher_tecnico(protocolo):
                             utp_nome = formulario.get("utp")  # ← IMPORTANTE!
                             
                             if zona_utp_texto and zona_utp_texto != '' and utp_nome:
-                                cur.execute("""
-                                    SELECT id_zona_utp 
-                                    FROM zona_utp 
-                                    WHERE TRIM(utp) = %s AND nome_zona_utp = %s
-                                """, (utp_nome, zona_utp_texto))
+                                executar(cur, SQL_ZONA_UTP_ID, (utp_nome, zona_utp_texto))
                                 
                                 result = cur.fetchone()
                                 zona_utp_id = result[0] if result else None
-                                print(f"✅ Zona UTP: '{zona_utp_texto}' na UTP '{utp_nome}' → ID: {zona_utp_id}")
+                                logger.debug("Zona UTP: '%s' na UTP '%s' → ID: %s", zona_utp_texto, utp_nome, zona_utp_id)
                             else:
                                 zona_utp_id = None
 
@@ -435,13 +585,13 @@ def preencher_tecnico(protocolo):
                             "longitude": longitude or None
                         }
 
-                        print(f"🔍 CAMPOS IMOVEL FINAIS: {campos_imovel}")
+                        logger.debug("CAMPOS IMOVEL FINAIS: %s", campos_imovel)
                             
                         for campo_imovel, valor_formulario in campos_imovel.items():
                             # CONVERTE STRING VAZIA PARA None (DEVE VIR ANTES!)
                             if valor_formulario == '':
                                 valor_formulario = None
-                                print(f"🔧 Campo {campo_imovel} convertido de vazio para NULL")
+                                logger.debug("Campo %s convertido de vazio para NULL", campo_imovel)
                             
                             # DEPOIS faz a verificação normal
                             valor_atual = imovel_dict.get(campo_imovel)
@@ -457,41 +607,39 @@ def preencher_tecnico(protocolo):
                     
                 # 4. ATUALIZAR IMOVEL_MUNICIPIO 
                 if municipio_formulario and matricula_imovel:
-                    print("🚀 CONDIÇÃO ATENDIDA - Vai atualizar!")
+                    logger.debug("CONDIÇÃO ATENDIDA - Vai atualizar!")
                     try:
                         with conn.cursor() as cur:
                             # DEBUG da tabela
                             cur.execute("SELECT * FROM imovel_municipio WHERE imovel_matricula = %s", (matricula_imovel,))
                             existente = cur.fetchone()
-                            print(f"📊 Registro existente: {existente}")
+                            logger.debug("Registro existente: %s", existente)
                             
                             # Tentativa 1: DELETE + INSERT
                             cur.execute("DELETE FROM imovel_municipio WHERE imovel_matricula = %s", (matricula_imovel,))
-                            print("🗑️  Delete executado")
+                            logger.debug("Delete executado")
                             
                             cur.execute(
                                 "INSERT INTO imovel_municipio (imovel_matricula, municipio_nome) VALUES (%s, %s)",
                                 (matricula_imovel, municipio_formulario)
                             )
-                            print("✅ INSERT executado")
+                            logger.debug("INSERT executado")
                             
                             # Verifica se inseriu
                             cur.execute("SELECT * FROM imovel_municipio WHERE imovel_matricula = %s", (matricula_imovel,))
                             verificado = cur.fetchone()
-                            print(f"🔍 Registro verificado: {verificado}")
+                            logger.debug("Registro verificado: %s", verificado)
                             
-                    except Exception as e:
-                        print(f"❌ ERRO: {e}")
-                        import traceback
-                        traceback.print_exc()
+                    except Exception:
+                        logger.exception("Erro atualizando imovel_municipio de %s", matricula_imovel)
                 else:
-                    print("⏭️  Condição NÃO atendida - pulando")
+                    logger.debug("Condição NÃO atendida - pulando")
                     
                 # 5. ATUALIZAR ZONAS URBANAS/MACROZONAS (VERSÃO INTELIGENTE)
                 zona_urbana = formulario.get("zona_urbana")
                 macrozona_municipal = formulario.get("macrozona_municipal")
 
-                print(f"🔍 DEBUG ZONAS INICIAL - Zona: '{zona_urbana}', Macrozona: '{macrozona_municipal}'")
+                logger.debug("Zonas iniciais - Zona: '%s', Macrozona: '%s'", zona_urbana, macrozona_municipal)
 
                 # BUSCAR VALORES ATUAIS NO BANCO
                 with conn.cursor() as cur:
@@ -507,7 +655,7 @@ def preencher_tecnico(protocolo):
                     zona_urbana_atual = resultado[0] if resultado else None
                     macrozona_municipal_atual = resultado[1] if resultado else None
 
-                print(f"🔍 VALORES ATUAIS NO BANCO - Zona: '{zona_urbana_atual}', Macrozona: '{macrozona_municipal_atual}'")
+                logger.debug("VALORES ATUAIS NO BANCO - Zona: '%s', Macrozona: '%s'", zona_urbana_atual, macrozona_municipal_atual)
 
                 # DETERMINAR VALORES FINAIS (PRESERVAR O QUE NÃO FOI MODIFICADO)
                 zona_final = zona_urbana_atual  # Começa com o valor atual
@@ -526,7 +674,7 @@ def preencher_tecnico(protocolo):
                     else:
                         macrozona_final = macrozona_municipal  # Usuário quer mudar
 
-                print(f"🔍 VALORES FINAIS - Zona: '{zona_final}', Macrozona: '{macrozona_final}'")
+                logger.debug("VALORES FINAIS - Zona: '%s', Macrozona: '%s'", zona_final, macrozona_final)
 
                 # Só atualizar se pelo menos um campo foi modificado
                 houve_modificacao = (
@@ -535,7 +683,7 @@ def preencher_tecnico(protocolo):
                 )
 
                 if matricula_imovel and houve_modificacao:
-                    print("🔄 Atualizando zonas/macrozonas (houve modificação)...")
+                    logger.debug("Atualizando zonas/macrozonas (houve modificação)...")
                     
                     # Buscar IDs
                     id_zona_urbana = None
@@ -554,7 +702,7 @@ def preencher_tecnico(protocolo):
                     
                     # Atualizar banco
                     with conn.cursor() as cur:
-                        print(f"🎯 EXECUTANDO UPDATE: matricula={matricula_imovel}, zona_id={id_zona_urbana}, macro_id={id_macrozona}")
+                        logger.debug("EXECUTANDO UPDATE: matricula=%s, zona_id=%s, macro_id=%s", matricula_imovel, id_zona_urbana, id_macrozona)
                         
                         cur.execute("""
                             INSERT INTO imovel_zona_macrozona (imovel_matricula, zona_urbana_id, macrozona_id) 
@@ -565,9 +713,9 @@ def preencher_tecnico(protocolo):
                                 macrozona_id = EXCLUDED.macrozona_id
                         """, (matricula_imovel, id_zona_urbana, id_macrozona))
                     
-                    print("✅ Zonas/Macrozonas atualizadas!")
+                    logger.debug("Zonas/Macrozonas atualizadas!")
                 else:
-                    print("⏭️ Zonas/macrozonas NÃO atualizadas - sem modificações")
+                    logger.debug("Zonas/macrozonas NÃO atualizadas - sem modificações")
                         
                 # 6. ATUALIZAR REQUERENTE (VERSÃO CORRIGIDA)
                 requerente_id = None 
@@ -588,7 +736,7 @@ def preencher_tecnico(protocolo):
                         
                         result = cur.fetchone()
                         requerente_id = result[0] if result else None
-                        print(f"✅ Requerente atualizado. ID: {requerente_id}")
+                        logger.debug("Requerente atualizado. ID: %s", requerente_id)
                     
                     # Atualizar processo com o ID do requerente
                     with conn.cursor() as cur:
@@ -600,7 +748,7 @@ def preencher_tecnico(protocolo):
                 cpf_cnpj_proprietario = formulario.get("cpf_cnpj_proprietario")
                 nome_proprietario = formulario.get("nome_proprietario")
 
-                print(f"🔍 DEBUG PROPRIETÁRIO - Nome: '{nome_proprietario}', CPF/CNPJ: '{cpf_cnpj_proprietario}'")
+                logger.debug("Proprietário - Nome: '%s', CPF/CNPJ informado: %s", nome_proprietario, bool(cpf_cnpj_proprietario))
 
                 # ATUALIZAR SE: tem nome OU tem CPF/CNPJ (não precisa dos dois)
                 if nome_proprietario or cpf_cnpj_proprietario:
@@ -613,7 +761,7 @@ def preencher_tecnico(protocolo):
                         
                         result = cur.fetchone()
                         proprietario_id = result[0] if result else None
-                        print(f"✅ Proprietário inserido/atualizado. ID: {proprietario_id}")
+                        logger.debug("Proprietário inserido/atualizado. ID: %s", proprietario_id)
                     
                     # ATUALIZAR RELAÇÃO PROPRIETARIO_IMOVEL (DENTRO DO MESMO BLOCO!)
                     if proprietario_id and matricula_imovel:
@@ -632,16 +780,16 @@ def preencher_tecnico(protocolo):
                                     SET proprietario_id = %s 
                                     WHERE imovel_matricula = %s
                                 """, (proprietario_id, matricula_imovel))
-                                print(f"✅ Relação proprietário-imóvel ATUALIZADA (matrícula: {matricula_imovel})")
+                                logger.debug("Relação proprietário-imóvel ATUALIZADA (matrícula: %s)", matricula_imovel)
                             else:
                                 # INSERT da nova relação
                                 cur.execute("""
                                     INSERT INTO proprietario_imovel (imovel_matricula, proprietario_id)
                                     VALUES (%s, %s)
                                 """, (matricula_imovel, proprietario_id))
-                                print(f"✅ Nova relação proprietário-imóvel CRIADA (matrícula: {matricula_imovel})")
+                                logger.debug("Nova relação proprietário-imóvel CRIADA (matrícula: %s)", matricula_imovel)
                 else:
-                    print("⏭️ Proprietário não atualizado - nenhum dado fornecido")
+                    logger.debug("Proprietário não atualizado - nenhum dado fornecido")
             
                 # 8. ATUALIZAR ANALISE (apenas campos modificados)
                 with conn.cursor() as cur:
@@ -661,35 +809,23 @@ def preencher_tecnico(protocolo):
                         
                         if inicio_analise:
                             fim_analise = datetime.now()
-                            dias_uteis_analise = calcular_dias_uteis(
-                                inicio_analise.strftime("%Y-%m-%d"),
-                                fim_analise.strftime("%Y-%m-%d")
-                            )
+                            dias_uteis_analise = dias_uteis(inicio_analise, fim_analise)
                             
                             # ATUALIZA com fim_analise e dias_uteis_analise
-                            cur.execute("""
-                                UPDATE analise 
-                                SET situacao_analise = 'FINALIZADA',
-                                    fim_analise = %s,
-                                    dias_uteis_analise = %s,
-                                    responsavel_analise = %s,
-                                    ultima_movimentacao = CURRENT_DATE
-                                WHERE processo_protocolo = %s
-                            """, (fim_analise, dias_uteis_analise, cpf_tecnico, protocolo))
+                            executar(cur, SQL_FINALIZAR_ANALISE,
+                                     (fim_analise, dias_uteis_analise, cpf_tecnico, protocolo))
                             
-                            print(f"🎯 PROCESSO FINALIZADO: {protocolo}")
-                            print(f"🎯 FIM_ANALISE: {fim_analise}")
-                            print(f"🎯 DIAS ÚTEIS: {dias_uteis_analise}")
+                            logger.debug("PROCESSO FINALIZADO: %s", protocolo)
+                            logger.debug("FIM_ANALISE: %s", fim_analise)
+                            logger.debug("DIAS ÚTEIS: %s", dias_uteis_analise)
                         else:
                             # Fallback caso não encontre inicio_analise (não deve acontecer)
-                            cur.execute("UPDATE analise SET situacao_analise = 'FINALIZADA', responsavel_analise = %s WHERE processo_protocolo = %s", 
-                                    (cpf_tecnico, protocolo))
-                            print(f"⚠️ Finalizado sem inicio_analise para {protocolo}")
+                            executar(cur, SQL_FINALIZAR_ANALISE_SEM_INICIO, (cpf_tecnico, protocolo))
+                            logger.warning("Finalizado sem inicio_analise para %s", protocolo)
                     
                     else:
                         # Só atualiza o responsável se não for finalizar
-                        cur.execute("UPDATE analise SET responsavel_analise = %s WHERE processo_protocolo = %s", 
-                                (cpf_tecnico, protocolo))
+                        executar(cur, SQL_ATRIBUIR_RESPONSAVEL, (cpf_tecnico, protocolo))
                     
                     # Campos da análise
                     situacao_analise = formulario.get("situacao_analise", "NÃO FINALIZADA")
@@ -718,171 +854,37 @@ def preencher_tecnico(protocolo):
                         cur.execute(f"UPDATE analise SET {campos_sql_analise} WHERE processo_protocolo = %s", 
                                 valores_analise_para_atualizar)
 
-                conn.commit()
-                print("✅ Atualização concluída com sucesso!")
-
-                # BLOCO DE FINALIZAÇÃO - CORRETAMENTE IDENTADO
+                # BLOCO DE FINALIZAÇÃO: o PDF é gerado pelo worker da fila
+                # (fila_pdf.py), que lê os dados já gravados por este commit
                 if acao_finalizar:
-                    print("🎯 MODO FINALIZAR ATIVADO - Gerando PDF...")
-                    
-                    nome_arquivo = f"{protocolo}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-                    caminho_pdf = os.path.join("PDFS", nome_arquivo)
-                    os.makedirs("PDFS", exist_ok=True)
+                    with conn.cursor() as cur:
+                        id_job = enfileirar_pdf(cur, protocolo, session.get("setor"), TIPO_EDICAO)
+                    logger.info("PDF do protocolo %s enfileirado (job %s)", protocolo, id_job)
+
+                conn.commit()
+                logger.info("Atualização concluída com sucesso!")
 
-                    try:
-                        from relatorio import gerar_pdf_segundo_preenchimento
-                        
-                        # 1. Gerar PDF principal (como antes)
-                        gerar_pdf_segundo_preenchimento(protocolo, caminho_pdf)
-                        print(f"📄 PDF principal gerado: {caminho_pdf}")
-                        
-                        # 2. ✅ MESCLAR COM RELATÓRIO DE ANÁLISE (se existir)
-                        caminho_pdf_final = mesclar_com_relatorio_analise(caminho_pdf, protocolo)
-                        
-                        # 3. Registrar no banco o PDF FINAL (mesclado ou não)
-                        with conn.cursor() as cur:
-                            cur.execute("""
-                                INSERT INTO pdf_gerados (processo_protocolo, setor_nome, caminho_pdf, data_geracao)
-                                VALUES (%s, %s, %s, %s)
-                            """, (protocolo, session.get("setor"), caminho_pdf_final, datetime.now()))
-                            
-                        print(f"✅ PDF final registrado no banco: {caminho_pdf_final}")
-                        
-                    except Exception as e_pdf:
-                        print(f"❌ Erro ao gerar PDF: {e_pdf}")
-                        
                 # 🎯 MENSAGEM DE SUCESSO CONDICIONAL
                 if acao_finalizar:
-                    flash(f"✅ Processo {protocolo} finalizado com sucesso! PDF gerado.", "success")
+                    flash(f"✅ Processo {protocolo} finalizado com sucesso! PDF em geração.", "success")
                 else:
                     flash(f"✅ Processo {protocolo} salvo com sucesso!", "success")
 
-                return redirect(url_for("dplam.ambiente"))
+                return redirect(url_for(".ambiente"))
 
         except Exception as e:
-            try:
-                conn.rollback()
-                print("🔄 Rollback executado devido a erro anterior")
-            except:
-                pass
-            
-            print(f"❌ Erro na atualização: {e}")
+            # O rollback já foi feito ao sair do `with get_db_connection()`
+            logger.exception("Erro na atualização")
             flash(f"❌ Erro ao atualizar processo: {e}", "error")
             return f"Erro ao atualizar processo: {e}", 500
         
-    # Buscar listas para selects (pode colocar em função para reutilizar)
+    # Listas para selects (cache em memória, ver referencias.py)
+    ref = obter_referencias()
+
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT tipo_solicitacao_resposta FROM solicitacao_resposta")
-            solicitacao_resposta = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT nome_tipo_tramitacao FROM tipo_tramitacao")
-            tramitacao = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT nome_tipologia FROM tipologia")
-            tipologia = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT nome_municipio FROM municipio")
-            municipio = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT cpf_tecnico, nome_tecnico, setor_tecnico FROM tecnico")
-            tecnico = cur.fetchall()
-
-            cur.execute("SELECT DISTINCT tipo_prioridade FROM prioridade WHERE tipo_prioridade IS NOT NULL")
-            prioridade = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT nivel_complexidade FROM complexidade WHERE nivel_complexidade IS NOT NULL")
-            complexidade = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT nome_apa FROM apa WHERE nome_apa IS NOT NULL")
-            apa = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT nome_utp FROM utp WHERE nome_utp IS NOT NULL")
-            utp = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT curva_inundacao FROM curva_inundacao WHERE curva_inundacao IS NOT NULL")
-            curva_inundacao = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT faixa_servidao FROM faixa_servidao WHERE faixa_servidao IS NOT NULL")
-            faixa_servidao = [row[0] for row in cur.fetchall()]
-
-            cur.execute("SELECT DISTINCT classificacao_metropolitana FROM sistema_viario WHERE classificacao_metropolitana IS NOT NULL")
-            sistema_viario = [row[0] for row in cur.fetchall()]
-            
-            # Junto com as outras queries de listas
-            cur.execute("SELECT id_zona_urbana, sigla_zona_urbana FROM zona_urbana")
-            zonas_urbanas = cur.fetchall()  # [(id, nome), (id, nome), ...]
-
-            cur.execute("SELECT id_macrozona, sigla_macrozona FROM macrozona_municipal")  
-            macrozonas = cur.fetchall()  # [(id, nome), (id, nome), ...]
-                    
-            
              # GET - recuperar dados do banco para preencher formulário
-            cur.execute("""
-             SELECT 
-                p.protocolo, 
-                p.observacoes, 
-                p.pasta_numero, 
-                p.solicitacao_requerente, 
-                p.resposta_departamento,
-                p.tramitacao, 
-                p.tipologia, 
-                im.municipio_nome AS municipio, 
-                p.situacao_localizacao,
-                p.responsavel_localizacao,
-                a.responsavel_analise, 
-                p.inicio_localizacao, 
-                p.fim_localizacao,
-                p.nome_ou_loteamento_do_condominio_a_ser_aprovado, 
-                p.interesse_social,
-                r.nome_requerente, 
-                r.tipo_requerente, 
-                r.cpf_cnpj_requerente,
-                CASE 
-                        WHEN LENGTH(REPLACE(REPLACE(r.cpf_cnpj_requerente, '.', ''), '-', '')) = 11 
-                        THEN r.cpf_cnpj_requerente
-                        ELSE NULL 
-                    END AS cpf_requerente,
-                    CASE 
-                        WHEN LENGTH(REPLACE(REPLACE(REPLACE(REPLACE(r.cpf_cnpj_requerente, '.', ''), '-', ''), '/', ''), '.', '')) = 14 
-                        THEN r.cpf_cnpj_requerente
-                        ELSE NULL 
-                    END AS cnpj_requerente,       
-                pr.nome_proprietario, 
-                pr.cpf_cnpj_proprietario,     
-                p.imovel_matricula,
-                i.area,                  
-                i.localidade_imovel,        
-                i.latitude,              
-                i.longitude,                
-                a.prioridade, 
-                a.complexidade,
-                za.nome_zona_apa as zona_apa,
-                zu.nome_zona_utp as zona_utp,
-                za.apa as apa,                    -- Nome da APA
-                zu.utp as utp,                    -- Nome da UTP
-                i.curva_inundacao,
-                i.faixa_servidao, 
-                i.classificacao_viaria AS sistema_viario,
-                a.situacao_analise,
-                p.perimetro_urbano,
-                zu2.sigla_zona_urbana as zona_urbana,
-                mm.sigla_macrozona as macrozona_municipal
-            FROM processo p
-            JOIN analise a ON a.processo_protocolo = p.protocolo
-            LEFT JOIN imovel_municipio im ON p.imovel_matricula = im.imovel_matricula
-            LEFT JOIN requerente r ON p.requerente = r.id_requerente
-            LEFT JOIN proprietario_imovel pi ON p.imovel_matricula = pi.imovel_matricula
-            LEFT JOIN proprietario pr ON pi.proprietario_id = pr.id_proprietario
-            LEFT JOIN imovel i ON p.imovel_matricula = i.matricula_imovel
-            LEFT JOIN zona_apa za ON i.zona_apa = za.id_zona_apa
-            LEFT JOIN zona_utp zu ON i.zona_utp = zu.id_zona_utp
-            LEFT JOIN imovel_zona_macrozona izm ON i.matricula_imovel = izm.imovel_matricula
-            LEFT JOIN zona_urbana zu2 ON izm.zona_urbana_id = zu2.id_zona_urbana
-            LEFT JOIN macrozona_municipal mm ON izm.macrozona_id = mm.id_macrozona
-            WHERE p.protocolo = %s;
-
-            """, (protocolo,))
+            executar(cur, SQL_FORMULARIO_EDICAO, (protocolo,))
             
             row = cur.fetchone()
             if not row:
@@ -907,27 +909,27 @@ def preencher_tecnico(protocolo):
     tem_relatorio = obter_relatorio_analise(protocolo) is not None
                 
     return render_template(
-        "dplam/preencher_tecnico.html",
+        "setor/preencher_tecnico.html",
         processo=processo,
-        solicitacao_resposta=solicitacao_resposta,
-        tramitacao=tramitacao,
-        tipologia=tipologia,
-        municipio=municipio,
-        tecnico=tecnico,
-        prioridade=prioridade,
-        complexidade=complexidade,
+        solicitacao_resposta=ref["solicitacao_resposta"],
+        tramitacao=ref["tramitacao"],
+        tipologia=ref["tipologia"],
+        municipio=ref["municipio"],
+        tecnico=ref["tecnico"],
+        prioridade=ref["prioridade"],
+        complexidade=ref["complexidade"],
         enums={
-            'apa': apa,
-            'utp': utp,
-            'manancial' : ['SUPERFICIAL', 'SUBTERRÂNEA', 'SUPERFICIAL-SUBTERRÂNEA']
+            'apa': ref["apa"],
+            'utp': ref["utp"],
+            'manancial' : MANANCIAL
         },
-        curva_inundacao=curva_inundacao,
-        faixa_servidao=faixa_servidao,
-        sistema_viario=sistema_viario,
+        curva_inundacao=ref["curva_inundacao_tecnico"],
+        faixa_servidao=ref["faixa_servidao_tecnico"],
+        sistema_viario=ref["sistema_viario"],
         imovel_municipio = imovel_municipio,
-        situacoes_localizacao=['LOCALIZADA', 'NÃO PRECISA LOCALIZAR'],
-        zonas_urbanas=zonas_urbanas,
-        macrozonas=macrozonas,
+        situacoes_localizacao=SITUACOES_LOCALIZACAO,
+        zonas_urbanas=ref["zonas_urbanas"],
+        macrozonas=ref["macrozonas"],
         tem_relatorio=tem_relatorio
     )
 
@@ -948,10 +950,10 @@ def encaminhar_processo(protocolo, setor_destino):
                 row = cur.fetchone()
                 if not row:
                     flash("Processo não encontrado", "error")
-                    return redirect(url_for("dplam.ambiente"))
+                    return redirect(url_for(".ambiente"))
                 
                 setor_origem = row[0]
-                print(f"🔍 DEBUG: Processo {protocolo} saindo de {setor_origem} para {setor_destino}")
+                logger.debug("Processo %s saindo de %s para %s", protocolo, setor_origem, setor_destino)
 
                 # 2️⃣ REGISTRAR NO HISTÓRICO
                 cur.execute("""
@@ -984,11 +986,10 @@ def encaminhar_processo(protocolo, setor_destino):
                 conn.commit()
                 
                 flash(f"✅ Processo {protocolo} encaminhado para {setor_destino}", "success")
-                print(f"🎉 SUCESSO: Processo {protocolo} de {setor_origem} para {setor_destino}")
+                logger.info("SUCESSO: Processo %s de %s para %s", protocolo, setor_origem, setor_destino)
 
     except Exception as e:
-        conn.rollback()
         flash(f"❌ Erro ao encaminhar processo: {str(e)}", "error")
-        print(f"❌ Erro: {str(e)}")
+        logger.exception("Erro ao encaminhar processo %s", protocolo)
 
-    return redirect(url_for("dplam.ambiente"))
\ No newline at end of file
+    return redirect(url_for(".ambiente"))
\ No newline at end of file
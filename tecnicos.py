@@ -0,0 +1,73 @@
+# tecnicos.py
+# Diretório de técnicos (CPF -> nome, setor -> técnicos) em memória
+#
+# Montado a partir da lista "tecnico" do cache de referências: segue o mesmo
+# TTL (REFERENCIAS_TTL) e é invalidado junto com ele pelo NOTIFY disparado
+# por alterações na tabela tecnico (migrations/001_notificar_referencias.sql).
+# Serve só para exibição: o login confere o técnico no banco
+# (conferir_tecnico), já que sem ESCUTAR_NOTIFICACOES o cache pode estar
+# até REFERENCIAS_TTL segundos atrasado.
+import threading
+
+from db import get_db_connection
+from referencias import invalidar_referencias, obter_referencias
+
+# (referências de origem, por_cpf, por_setor) — trocado de uma vez só
+_diretorio = (None, None, None)
+_lock = threading.Lock()
+
+
+def _obter_diretorio():
+    global _diretorio
+    ref = obter_referencias()
+    atual = _diretorio
+    if atual[0] is ref:
+        return atual[1], atual[2]
+
+    with _lock:
+        if _diretorio[0] is not ref:
+            por_cpf, por_setor = {}, {}
+            for cpf, nome, setor in ref["tecnico"]:
+                por_cpf[cpf] = nome
+                por_setor.setdefault(setor, []).append((cpf, nome))
+            _diretorio = (ref, por_cpf, por_setor)
+        return _diretorio[1], _diretorio[2]
+
+
+def nome_tecnico(cpf, padrao="Desconhecido"):
+    """Nome do técnico pelo CPF, sem ir ao banco."""
+    por_cpf, _ = _obter_diretorio()
+    return por_cpf.get(cpf, padrao) if cpf else padrao
+
+
+def nomes_tecnicos(cpfs):
+    """{cpf: nome} dos CPFs conhecidos entre os informados."""
+    por_cpf, _ = _obter_diretorio()
+    return {cpf: por_cpf[cpf] for cpf in cpfs if cpf in por_cpf}
+
+
+def tecnicos_do_setor(setor):
+    """Lista de (cpf, nome) dos técnicos do setor."""
+    _, por_setor = _obter_diretorio()
+    return list(por_setor.get(setor, []))
+
+
+def conferir_tecnico(cpf, setor):
+    """
+    Nome do técnico se o CPF está hoje no setor, consultando o banco; None
+    caso contrário. Se o cache discordar, ele é invalidado para a lista da
+    tela de login se atualizar também.
+    """
+    if not cpf:
+        return None
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT nome_tecnico FROM tecnico WHERE cpf_tecnico = %s AND setor_tecnico = %s",
+                (cpf, setor),
+            )
+            row = cur.fetchone()
+    nome = row[0] if row else None
+    if dict(tecnicos_do_setor(setor)).get(cpf) != nome:
+        invalidar_referencias()
+    return nome
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from consultas_lentas import _redigir_parametros, _redigir_plano
+
+
+def test_cpf_sem_pontuacao_posicional():
+    assert _redigir_parametros(("12345678901", "AB")) == ["[REDIGIDO]", "'AB'"]
+
+
+def test_cpf_e_cnpj_pontuados_e_cnpj_cru():
+    params = ["123.456.789-01", "12.345.678/0001-90", "12345678000190"]
+    assert _redigir_parametros(params) == ["[REDIGIDO]"] * 3
+
+
+def test_lista_de_cpfs_dentro_de_parametro():
+    assert _redigir_parametros((["12345678901", "10987654321"], 5)) == [["[REDIGIDO]", "[REDIGIDO]"], "5"]
+
+
+def test_dict_pelo_nome_do_campo():
+    params = {"responsavel_analise": "12345678901", "cpf_cnpj_requerente": "123",
+              "cpf_cnpj_proprietario": None, "protocolo": "2024-0001"}
+    assert _redigir_parametros(params) == {
+        "responsavel_analise": "[REDIGIDO]",
+        "cpf_cnpj_requerente": "[REDIGIDO]",
+        "cpf_cnpj_proprietario": "None",
+        "protocolo": "'2024-0001'",
+    }
+
+
+def test_outros_numeros_ficam():
+    assert _redigir_parametros((1234567890, "123456789012")) == ["1234567890", "'123456789012'"]
+
+
+def test_literal_no_plano():
+    plano = "Filter: ((responsavel_analise)::text = '12345678901'::text)"
+    assert "12345678901" not in _redigir_plano(plano)
@@ -0,0 +1,100 @@
+# verificar_indices.py
+# Confere com EXPLAIN se as consultas da aplicação usam os índices das
+# migrações (004, 005, 007): `flask verificar-indices`
+#
+# As consultas são as do próprio código (painel.py, captura.py, preparadas
+# do preencher_tecnico), executadas por um cursor que só faz EXPLAIN.
+import click
+
+from captura import SQL_ATUALIZAR_HISTORICO
+from db import get_db_connection
+from painel import listar_disponiveis, listar_meus, ultimos_pdfs
+from preparadas import executar
+from setores.routes import SQL_ATRIBUIR_RESPONSAVEL, SQL_ZONA_APA_ID, SQL_ZONA_UTP_ID
+
+AMOSTRA = "VERIFICAR"
+
+
+class _CursorExplain:
+    """Cursor que troca cada execute por EXPLAIN (FORMAT JSON) e guarda os planos."""
+
+    connection = None  # preparadas.executar usa o SQL em texto
+
+    def __init__(self, cur):
+        self._cur = cur
+        self.planos = []
+
+    def execute(self, sql, params=None):
+        self._cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        self.planos.append(self._cur.fetchone()[0][0]["Plan"])
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+
+# (descrição, função que roda a consulta com o cursor, índice esperado)
+VERIFICACOES = [
+    ("zona APA por apa",
+     lambda cur: executar(cur, SQL_ZONA_APA_ID, (AMOSTRA, AMOSTRA)), "idx_zona_apa_apa"),
+    ("zona UTP por utp",
+     lambda cur: executar(cur, SQL_ZONA_UTP_ID, (AMOSTRA, AMOSTRA)), "idx_zona_utp_utp"),
+    ("painel: disponíveis do setor",
+     lambda cur: listar_disponiveis(cur, AMOSTRA), "idx_processo_setor_protocolo"),
+    ("painel: capturados pelo técnico",
+     lambda cur: listar_meus(cur, AMOSTRA), "idx_analise_responsavel_protocolo"),
+    ("painel: último PDF por protocolo",
+     lambda cur: ultimos_pdfs(cur, [AMOSTRA]), "idx_pdf_gerados_protocolo_data"),
+    ("captura: último encaminhamento",
+     lambda cur: cur.execute(SQL_ATUALIZAR_HISTORICO, (AMOSTRA, [AMOSTRA])), "idx_historico_protocolo_data"),
+    ("análise por protocolo",
+     lambda cur: executar(cur, SQL_ATRIBUIR_RESPONSAVEL, (AMOSTRA, AMOSTRA)), "idx_analise_processo"),
+]
+
+
+def indices_do_plano(plano):
+    """Nomes dos índices usados em qualquer nó do plano."""
+    nomes = set()
+    pendentes = [plano]
+    while pendentes:
+        no = pendentes.pop()
+        if "Index Name" in no:
+            nomes.add(no["Index Name"])
+        pendentes.extend(no.get("Plans", []))
+    return nomes
+
+
+def verificar(plano_real=False):
+    """Lista de (descrição, índice esperado, índices usados, ok)."""
+    resultados = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if not plano_real:
+                # Em bases pequenas o planejador prefere seq scan mesmo com
+                # índice; desligado, dá para ver se o índice é utilizável
+                cur.execute("SET LOCAL enable_seqscan = off")
+            for descricao, consulta, esperado in VERIFICACOES:
+                explain = _CursorExplain(cur)
+                consulta(explain)
+                usados = set().union(*(indices_do_plano(p) for p in explain.planos))
+                resultados.append((descricao, esperado, sorted(usados), esperado in usados))
+        conn.rollback()
+    return resultados
+
+
+@click.command("verificar-indices")
+@click.option("--plano-real", is_flag=True,
+              help="Não desliga o seq scan (mostra o plano que a base atual escolheria).")
+def comando_verificar_indices(plano_real):
+    """Confere com EXPLAIN se as consultas da aplicação usam os índices esperados."""
+    falhas = 0
+    for descricao, esperado, usados, ok in verificar(plano_real):
+        if ok:
+            click.echo(f"✅ {descricao}: {esperado}")
+        else:
+            falhas += 1
+            click.echo(f"❌ {descricao}: esperado {esperado}, usou {', '.join(usados) or 'nenhum índice'}")
+    if falhas:
+        raise SystemExit(1)